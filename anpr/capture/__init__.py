@@ -0,0 +1 @@
+# /anpr/capture/__init__.py
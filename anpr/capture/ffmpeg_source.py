@@ -0,0 +1,344 @@
+# /anpr/capture/ffmpeg_source.py
+"""Источник кадров через процесс ffmpeg с выводом сырых кадров в pipe.
+
+В отличие от ``cv2.VideoCapture`` ffmpeg позволяет управлять стоимостью
+декодирования: масштабировать кадр на стороне декодера, выбирать формат пикселей
+и в режиме ожидания декодировать только ключевые кадры (``-skip_frame nokey``).
+Класс повторяет интерфейс ``cv2.VideoCapture`` (``read``/``grab``/``retrieve``/
+``get``/``release``), поэтому подключается к :class:`FrameGrabber` без изменений.
+"""
+
+from __future__ import annotations
+
+import re
+import subprocess
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+PIX_FMT_CHANNELS = {"bgr24": 3, "gray": 1}
+_OUTPUT_SIZE_RE = re.compile(r"Video: rawvideo.*?, (\d{2,5})x(\d{2,5})")
+_OUTPUT_FPS_RE = re.compile(r"([\d.]+) fps")
+
+
+@dataclass
+class FFmpegCaptureConfig:
+    """Параметры процесса ffmpeg для канала.
+
+    ``width``/``height`` задают масштабирование в декодере (0 — сохранить
+    пропорции или исходный размер), ``pix_fmt`` — ``bgr24`` или ``gray``.
+    ``idle_keyframes`` включает декодирование только ключевых кадров, пока канал
+    ждёт движения. Переключение режима перезапускает ffmpeg и переподключает
+    RTSP, поэтому в ключевые кадры канал уходит только после ``idle_delay_seconds``
+    без движения, а в полный режим возвращается сразу. Пока идут только ключевые
+    кадры (один на GOP, обычно раз в 2–4 с), задержка включения распознавания
+    не меньше интервала ключевых кадров. ``realtime`` читает локальный файл
+    в темпе его FPS (``-re``). ``buffers`` — размер пула кадров; если все кадры
+    пула ещё удерживаются стадиями, пул растёт не больше чем до ``2 * buffers``,
+    дальше кадр читается в отдельный массив вне пула.
+    """
+
+    ffmpeg_path: str = "ffmpeg"
+    width: int = 0
+    height: int = 0
+    pix_fmt: str = "bgr24"
+    idle_keyframes: bool = False
+    idle_delay_seconds: float = 10.0
+    realtime: bool = True
+    rtsp_transport: str = "tcp"
+    open_timeout_seconds: float = 10.0
+    buffers: int = 4
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "FFmpegCaptureConfig":
+        ffmpeg_conf = config or {}
+        pix_fmt = str(ffmpeg_conf.get("pix_fmt") or "bgr24").lower()
+        return cls(
+            ffmpeg_path=str(ffmpeg_conf.get("path") or "ffmpeg"),
+            width=max(0, int(ffmpeg_conf.get("width", 0))),
+            height=max(0, int(ffmpeg_conf.get("height", 0))),
+            pix_fmt=pix_fmt if pix_fmt in PIX_FMT_CHANNELS else "bgr24",
+            idle_keyframes=bool(ffmpeg_conf.get("idle_keyframes", False)),
+            idle_delay_seconds=max(0.0, float(ffmpeg_conf.get("idle_delay_seconds", 10.0))),
+            realtime=bool(ffmpeg_conf.get("realtime", True)),
+            rtsp_transport=str(ffmpeg_conf.get("rtsp_transport") or "tcp"),
+            open_timeout_seconds=max(1.0, float(ffmpeg_conf.get("open_timeout_seconds", 10.0))),
+            buffers=max(2, int(ffmpeg_conf.get("buffers", 4))),
+        )
+
+
+class _StderrProbe:
+    """Размер и FPS выхода одного процесса ffmpeg из его stderr.
+
+    У каждого процесса своя проба: поток чтения stderr убитого процесса
+    (перезапуск при смене режима) не трогает состояние следующего.
+    """
+
+    def __init__(self) -> None:
+        self.ready = threading.Event()
+        self.width = 0
+        self.height = 0
+        self.fps = 0.0
+        self.lines: List[str] = []
+
+
+class _FrameLease:
+    """Владелец кадра, выданного из буфера пула.
+
+    Массив кадра и все его срезы (ROI, кроп номера) ссылаются на аренду через
+    ``base``, поэтому буфер свободен, когда слабая ссылка на аренду умерла.
+    """
+
+    def __init__(self, buffer: np.ndarray) -> None:
+        self.buffer = buffer
+        self.__array_interface__ = buffer.__array_interface__
+
+
+class FFmpegCapture:
+    """Чтение кадров ffmpeg в пул заранее выделенных буферов.
+
+    Каждый кадр выдаётся через аренду буфера (:class:`_FrameLease`). Буфер, кадр
+    которого ещё используется кодом канала (кадр в обработке, ROI-срез),
+    повторно не заполняется: ``grab`` берёт следующий свободный буфер пула и
+    добавляет новый, только если заняты все.
+    """
+
+    def __init__(self, source: str, config: Optional[FFmpegCaptureConfig] = None) -> None:
+        self.source = source
+        self.config = config or FFmpegCaptureConfig()
+        self.is_file = not re.match(r"^[a-z][a-z0-9+.-]*://", source, re.IGNORECASE)
+        self.idle = False
+        self._requested_idle = False
+        self._idle_requested_at: Optional[float] = None
+        self.width = 0
+        self.height = 0
+        self.fps = 0.0
+        self._channels = PIX_FMT_CHANNELS[self.config.pix_fmt]
+        self._process: Optional[subprocess.Popen] = None
+        self._stderr_thread: Optional[threading.Thread] = None
+        self._buffers: List[np.ndarray] = []
+        self._leases: List[Optional[weakref.ref]] = []
+        self._next_buffer = 0
+        self._grabbed: Optional[np.ndarray] = None
+        self.pool_overflows = 0
+        self._overflow_logged_at = 0.0
+        self._started_at = 0.0
+        self._start_offset = 0.0
+        self._opened = self._start()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def _command(self) -> List[str]:
+        command = [self.config.ffmpeg_path, "-hide_banner", "-nostats", "-nostdin"]
+        if self.is_file:
+            if self.config.realtime:
+                # Локальный файл читается в темпе реального времени, как поток камеры.
+                command += ["-re"]
+            if self._start_offset > 0:
+                command += ["-ss", f"{self._start_offset:.3f}"]
+        elif self.source.lower().startswith("rtsp://"):
+            command += ["-rtsp_transport", self.config.rtsp_transport]
+        if self.idle:
+            command += ["-skip_frame", "nokey"]
+        command += ["-i", self.source, "-an", "-sn", "-vsync", "passthrough"]
+        if self.config.width or self.config.height:
+            width = self.config.width or -2
+            height = self.config.height or -2
+            command += ["-vf", f"scale={width}:{height}"]
+        command += ["-pix_fmt", self.config.pix_fmt, "-f", "rawvideo", "pipe:1"]
+        return command
+
+    @staticmethod
+    def _drain_stderr(stream, probe: _StderrProbe) -> None:
+        in_output = False
+        try:
+            for raw_line in iter(stream.readline, b""):
+                line = raw_line.decode("utf-8", errors="replace").rstrip()
+                probe.lines = (probe.lines + [line])[-20:]
+                if line.startswith("Output #0"):
+                    in_output = True
+                if in_output and not probe.ready.is_set():
+                    match = _OUTPUT_SIZE_RE.search(line)
+                    if match:
+                        fps = _OUTPUT_FPS_RE.search(line)
+                        probe.fps = float(fps.group(1)) if fps else 0.0
+                        probe.width, probe.height = int(match.group(1)), int(match.group(2))
+                        probe.ready.set()
+        except (OSError, ValueError):
+            # stderr закрыт при остановке процесса.
+            pass
+        probe.ready.set()
+
+    def _start(self) -> bool:
+        self.width = self.height = 0
+        try:
+            self._process = subprocess.Popen(
+                self._command(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0,
+            )
+        except OSError as exc:
+            logger.warning("Не удалось запустить ffmpeg (%s): %s", self.config.ffmpeg_path, exc)
+            self._process = None
+            return False
+
+        probe = _StderrProbe()
+        self._stderr_thread = threading.Thread(
+            target=self._drain_stderr, args=(self._process.stderr, probe), name="ffmpeg-stderr", daemon=True
+        )
+        self._stderr_thread.start()
+        probe.ready.wait(self.config.open_timeout_seconds)
+        if not probe.width or not probe.height:
+            logger.warning("ffmpeg не открыл источник %s: %s", self.source, " | ".join(probe.lines[-3:]))
+            self._stop_process()
+            return False
+        self.width, self.height, self.fps = probe.width, probe.height, probe.fps
+
+        shape: Tuple[int, ...] = (self.height, self.width, self._channels)
+        if self._channels == 1:
+            shape = (self.height, self.width)
+        if not self._buffers or self._buffers[0].shape != shape:
+            self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(max(2, self.config.buffers))]
+            self._leases = [None] * len(self._buffers)
+        self._started_at = time.monotonic()
+        return True
+
+    def _stop_process(self) -> None:
+        process, self._process = self._process, None
+        if process is None:
+            return
+        process.kill()
+        try:
+            process.wait(timeout=2.0)
+        except subprocess.TimeoutExpired:
+            pass
+        if process.stdout:
+            process.stdout.close()
+        thread, self._stderr_thread = self._stderr_thread, None
+        if thread is not None:
+            # После kill stderr закрывается со стороны ffmpeg, поток чтения доходит до EOF.
+            thread.join(timeout=2.0)
+        if process.stderr:
+            process.stderr.close()
+
+    def set_idle(self, idle: bool) -> None:
+        """Запрашивает режим только ключевых кадров.
+
+        Режим ключевых кадров включается, только если запрос держится
+        ``idle_delay_seconds``; отмена запроса действует сразу. Процесс ffmpeg
+        перезапускается в потоке, который читает кадры, при следующем ``grab``,
+        чтобы не закрывать pipe посреди чтения.
+        """
+
+        if not self.config.idle_keyframes:
+            return
+        if not idle:
+            self._idle_requested_at = None
+            self._requested_idle = False
+            return
+        now = time.monotonic()
+        if self._idle_requested_at is None:
+            self._idle_requested_at = now
+        if now - self._idle_requested_at >= self.config.idle_delay_seconds:
+            self._requested_idle = True
+
+    def _apply_idle(self) -> None:
+        if self.is_file:
+            self._start_offset += time.monotonic() - self._started_at
+        self._stop_process()
+        self.idle = self._requested_idle
+        self._opened = self._start()
+        logger.debug("ffmpeg %s: режим %s", self.source, "ключевые кадры" if self.idle else "все кадры")
+
+    def isOpened(self) -> bool:  # noqa: N802
+        return self._opened
+
+    def _free_buffer(self) -> Optional[int]:
+        """Индекс буфера пула, кадр которого больше никем не используется.
+
+        ``None`` — пул достиг предела, кадр читается в массив вне пула.
+        """
+
+        self._grabbed = None
+        for offset in range(len(self._buffers)):
+            index = (self._next_buffer + offset) % len(self._buffers)
+            lease = self._leases[index]
+            if lease is None or lease() is None:
+                self._next_buffer = (index + 1) % len(self._buffers)
+                return index
+        if len(self._buffers) < 2 * max(2, self.config.buffers):
+            self._buffers.append(np.empty_like(self._buffers[0]))
+            self._leases.append(None)
+            return len(self._buffers) - 1
+        self.pool_overflows += 1
+        now = time.monotonic()
+        if now - self._overflow_logged_at >= 60.0:
+            self._overflow_logged_at = now
+            logger.warning(
+                "ffmpeg %s: все %d буферов пула заняты, кадр читается вне пула (всего %d)",
+                self.source,
+                len(self._buffers),
+                self.pool_overflows,
+            )
+        return None
+
+    def grab(self) -> bool:
+        if self._requested_idle != self.idle and self._process is not None:
+            self._apply_idle()
+        process = self._process
+        if process is None or process.stdout is None:
+            return False
+        index = self._free_buffer()
+        if index is None:
+            buffer = np.empty_like(self._buffers[0])
+        else:
+            buffer = self._buffers[index]
+        view = memoryview(buffer.reshape(-1))
+        filled = 0
+        while filled < len(view):
+            count = process.stdout.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        if index is None:
+            self._grabbed = buffer
+            return True
+        lease = _FrameLease(buffer)
+        self._leases[index] = weakref.ref(lease)
+        self._grabbed = np.asarray(lease)
+        return True
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._grabbed is None:
+            return False, None
+        return True, self._grabbed
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def release(self) -> None:
+        self._stop_process()
+        self._opened = False
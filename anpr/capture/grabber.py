@@ -0,0 +1,301 @@
+# /anpr/capture/grabber.py
+"""Фоновое чтение источника в буфер последнего кадра.
+
+Поток захвата читает камеру непрерывно и всегда держит только самый свежий кадр,
+поэтому внутренний буфер OpenCV не копится, пока канал занят инференсом.
+Необработанные кадры, перезаписанные новыми, учитываются как пропущенные.
+
+:class:`DemandGrabber` вызывает ``grab()`` для каждого кадра, а ``retrieve()``
+(цветовое преобразование и копирование) — только для кадров, которые нужны
+детектору движения, YOLO, трекеру или превью по расписанию :class:`DecodeSchedule`.
+Основной поток двухпоточного канала декодируется по :class:`TrackGate` — только
+пока на подпотоке есть треки.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import FrozenSet, Optional, Tuple
+
+import numpy as np
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+PURPOSE_MOTION = "motion"
+PURPOSE_DETECT = "detect"
+PURPOSE_TRACK = "track"
+PURPOSE_PREVIEW = "preview"
+PURPOSE_CROP = "crop"
+
+GRABBER_JOIN_TIMEOUT_SECONDS = 2.0
+
+
+@dataclass
+class CapturedFrame:
+    """Кадр источника с моментом захвата по ``time.monotonic``.
+
+    ``purposes`` — для каких стадий кадр декодирован; ``None`` означает, что кадр
+    прочитан целиком и годится для любой стадии.
+    """
+
+    image: np.ndarray
+    timestamp: float
+    index: int
+    purposes: Optional[FrozenSet[str]] = None
+
+
+class RateMeter:
+    """Частота событий в секунду по скользящему окну."""
+
+    def __init__(self, window_seconds: float = 2.0) -> None:
+        self.window = max(0.1, window_seconds)
+        self._count = 0
+        self._started = time.monotonic()
+        self._rate = 0.0
+
+    def tick(self, count: int = 1) -> None:
+        self._count += count
+        now = time.monotonic()
+        elapsed = now - self._started
+        if elapsed >= self.window:
+            self._rate = self._count / elapsed
+            self._count = 0
+            self._started = now
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+
+class FrameGrabber:
+    """Поток, читающий ``capture`` в слот последнего кадра.
+
+    ``pace_fps`` ограничивает скорость чтения для локальных файлов, которые иначе
+    декодировались бы быстрее реального времени.
+
+    Источник освобождается только когда поток чтения уже не внутри ``read()``:
+    если поток завис на чтении (пропал сигнал RTSP), ``release`` не ждёт его,
+    а источник освобождает сам поток, выйдя из чтения.
+    """
+
+    def __init__(self, capture, name: str = "grabber", pace_fps: float = 0.0) -> None:
+        self.capture = capture
+        self.name = name
+        self.pace_interval = 1.0 / pace_fps if pace_fps > 0 else 0.0
+        self.captured = 0
+        self.decoded = 0
+        self.dropped = 0
+        self.capture_rate = RateMeter()
+        self.last_read_failed = False
+        self._latest: Optional[CapturedFrame] = None
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._release_on_exit = False
+        self._released = False
+        self._release_lock = threading.Lock()
+
+    def start(self) -> "FrameGrabber":
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> bool:
+        """Останавливает поток; ``False`` — поток не вышел из чтения за отведённое время."""
+
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout=GRABBER_JOIN_TIMEOUT_SECONDS)
+        if thread.is_alive():
+            return False
+        self._thread = None
+        return True
+
+    def release(self) -> None:
+        """Останавливает поток и освобождает источник."""
+
+        self._release_on_exit = True
+        if self.stop():
+            self._release_capture()
+            return
+        logger.warning(
+            "Поток чтения %s не завершился за %.0f с; источник будет освобождён после выхода из чтения",
+            self.name,
+            GRABBER_JOIN_TIMEOUT_SECONDS,
+        )
+
+    def _release_capture(self) -> None:
+        with self._release_lock:
+            if self._released:
+                return
+            self._released = True
+        self.capture.release()
+
+    def _read(self) -> Tuple[bool, Optional[np.ndarray], Optional[FrozenSet[str]]]:
+        """Читает следующий кадр: ``(успех, изображение или None, назначение)``."""
+
+        ret, image = self.capture.read()
+        return ret and image is not None, image, None
+
+    def _run(self) -> None:
+        try:
+            self._read_loop()
+        finally:
+            if self._release_on_exit:
+                self._release_capture()
+
+    def _read_loop(self) -> None:
+        next_due = time.monotonic()
+        while self._running:
+            if self.pace_interval:
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_due = max(next_due + self.pace_interval, time.monotonic() - self.pace_interval)
+            try:
+                ok, image, purposes = self._read()
+            except Exception:  # noqa: BLE001
+                logger.exception("Ошибка чтения источника (%s)", self.name)
+                ok, image, purposes = False, None, None
+
+            if not ok:
+                with self._condition:
+                    self.last_read_failed = True
+                    self._condition.notify_all()
+                time.sleep(0.05)
+                continue
+
+            self.captured += 1
+            self.capture_rate.tick()
+            if image is None:
+                # Кадр только захвачен, никому из потребителей он не нужен.
+                self.last_read_failed = False
+                continue
+            self._publish(image, purposes)
+
+    def _publish(self, image: np.ndarray, purposes: Optional[FrozenSet[str]]) -> None:
+        with self._condition:
+            self.last_read_failed = False
+            if self._latest is not None:
+                self.dropped += 1
+                if purposes is not None and self._latest.purposes is not None:
+                    # Более свежий кадр забирает назначения непрочитанного.
+                    purposes = purposes | self._latest.purposes
+            self._latest = CapturedFrame(image, time.monotonic(), self.captured - 1, purposes)
+            self.decoded += 1
+            self._condition.notify_all()
+
+    def read(self, timeout: float = 0.5) -> Optional[CapturedFrame]:
+        """Забирает самый свежий ещё не прочитанный кадр или ``None`` по таймауту/ошибке чтения."""
+
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._latest is None and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.last_read_failed:
+                    return None
+                self._condition.wait(remaining)
+            frame, self._latest = self._latest, None
+            return frame
+
+
+class DecodeSchedule:
+    """Расписание декодирования по шагам канала.
+
+    Индексы кадров считаются по захвату: движение анализируется на каждом
+    ``motion_stride``-м кадре (только в режиме ``motion``), YOLO — на каждом
+    ``detector_stride``-м, пока есть движение, промежуточные кадры декодируются
+    только при активных треках, превью — не чаще ``preview_fps`` (0 — каждый
+    кадр, как и в рабочем цикле канала) и только пока плитка канала видна. Флаги ``motion_active``, ``tracks_active`` и
+    ``preview_enabled`` выставляет рабочий цикл канала.
+    """
+
+    def __init__(
+        self,
+        motion_stride: int,
+        detector_stride: int,
+        preview_fps: float,
+        motion_mode: bool,
+        decode_tracked_frames: bool = True,
+    ) -> None:
+        self.motion_stride = max(1, motion_stride)
+        self.detector_stride = max(1, detector_stride)
+        self.preview_interval = 1.0 / preview_fps if preview_fps > 0 else 0.0
+        self.motion_mode = motion_mode
+        self.decode_tracked_frames = decode_tracked_frames
+        self.motion_active = not motion_mode
+        self.tracks_active = False
+        self.preview_enabled = True
+        self._last_preview = 0.0
+        self._detect_rearmed = False
+
+    def rearm_detector(self) -> None:
+        """Следующий кадр при движении декодируется для детектора: прежний кадр детектора потерян."""
+
+        self._detect_rearmed = True
+
+    def purposes(self, index: int, now: float) -> FrozenSet[str]:
+        needed = set()
+        if self.motion_mode and index % self.motion_stride == 0:
+            needed.add(PURPOSE_MOTION)
+        if self.motion_active or not self.motion_mode:
+            if index % self.detector_stride == 0 or self._detect_rearmed:
+                self._detect_rearmed = False
+                needed.add(PURPOSE_DETECT)
+            elif self.tracks_active and self.decode_tracked_frames:
+                needed.add(PURPOSE_TRACK)
+        if self.preview_enabled and now - self._last_preview >= self.preview_interval:
+            needed.add(PURPOSE_PREVIEW)
+            self._last_preview = now
+        return frozenset(needed)
+
+
+class DemandGrabber(FrameGrabber):
+    """Захват через ``grab()`` с ``retrieve()`` только для кадров из расписания."""
+
+    def __init__(self, capture, schedule: DecodeSchedule, name: str = "grabber", pace_fps: float = 0.0) -> None:
+        super().__init__(capture, name=name, pace_fps=pace_fps)
+        self.schedule = schedule
+
+    def _read(self) -> Tuple[bool, Optional[np.ndarray], Optional[FrozenSet[str]]]:
+        if not self.capture.grab():
+            return False, None, None
+        purposes = self.schedule.purposes(self.captured, time.monotonic())
+        if not purposes:
+            return True, None, None
+        ret, image = self.capture.retrieve()
+        return ret and image is not None, image, purposes
+
+
+class TrackGate:
+    """Расписание основного потока при двухпоточном канале.
+
+    Кадры основного потока нужны только для кропов номеров, поэтому декодируются,
+    пока на подпотоке есть треки и ещё ``hold_seconds`` после их пропадания, чтобы короткие
+    разрывы трека не переключали декодер туда-обратно.
+    """
+
+    def __init__(self, hold_seconds: float = 2.0) -> None:
+        self.hold_seconds = max(0.0, hold_seconds)
+        self._tracking = False
+        self._released_at = float("-inf")
+
+    def set_tracking(self, tracking: bool) -> None:
+        if self._tracking and not tracking:
+            self._released_at = time.monotonic()
+        self._tracking = tracking
+
+    def is_open(self, now: float) -> bool:
+        return self._tracking or now - self._released_at < self.hold_seconds
+
+    def purposes(self, index: int, now: float) -> FrozenSet[str]:
+        return frozenset((PURPOSE_CROP,)) if self.is_open(now) else frozenset()
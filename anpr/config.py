@@ -16,6 +16,14 @@ class ModelConfig:
 
     YOLO_MODEL_PATH: str = "models/yolo/best.pt"
     OCR_MODEL_PATH: str = "models/ocr_crnn/crnn_ocr_model_int8_fx.pth"
+    # Архивы TorchScript уже сконвертированной INT8-модели, ключ — хэш весов.
+    OCR_CACHE_DIR: str = "models/ocr_crnn/.cache"
+
+    # Экспортированные модели для ONNX Runtime / OpenVINO (см. anpr_export.py).
+    YOLO_ONNX_PATH: str = "models/yolo/best.onnx"
+    YOLO_OPENVINO_PATH: str = "models/yolo/best_openvino_model"
+    OCR_ONNX_PATH: str = "models/ocr_crnn/crnn_ocr.onnx"
+    OCR_OPENVINO_PATH: str = "models/ocr_crnn/crnn_ocr_openvino/crnn_ocr.xml"
 
     OCR_IMG_HEIGHT: int = 32
     OCR_IMG_WIDTH: int = 128
@@ -28,3 +36,17 @@ class ModelConfig:
 
     DEVICE: torch.device = torch.device("cpu")
 
+    @classmethod
+    def yolo_model_path(cls, backend: str) -> str:
+        return {
+            "onnxruntime": cls.YOLO_ONNX_PATH,
+            "openvino": cls.YOLO_OPENVINO_PATH,
+        }.get(backend, cls.YOLO_MODEL_PATH)
+
+    @classmethod
+    def ocr_model_path(cls, backend: str) -> str:
+        return {
+            "onnxruntime": cls.OCR_ONNX_PATH,
+            "openvino": cls.OCR_OPENVINO_PATH,
+        }.get(backend, cls.OCR_MODEL_PATH)
+
@@ -0,0 +1,206 @@
+# /anpr/detection/detector_service.py
+"""Общий для всех каналов детектор YOLO с динамическим батчингом."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from anpr.detection.tracking import TRACKER_NATIVE, SortTracker, create_tracker
+from anpr.detection.yolo_detector import (
+    RESIZE_LETTERBOX,
+    YOLODetector,
+    boxes_to_detections,
+    resize_for_detector,
+    restore_boxes,
+)
+from anpr.inference.batching import MicroBatcher
+from anpr.inference.scheduler import ChannelShare, RequestShed
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class DetectorServiceConfig:
+    """Параметры пакетного инференса детектора."""
+
+    max_batch_size: int = 8
+    max_wait_ms: float = 10.0
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "DetectorServiceConfig":
+        detector_conf = config or {}
+        return cls(
+            max_batch_size=max(1, int(detector_conf.get("max_batch_size", 8))),
+            max_wait_ms=max(0.0, float(detector_conf.get("max_wait_ms", 10))),
+        )
+
+
+class DetectorService:
+    """Один экземпляр весов YOLO, обслуживающий ROI всех каналов пакетами."""
+
+    def __init__(
+        self, detector: YOLODetector, config: DetectorServiceConfig, request_queue=None, thread_init=None
+    ) -> None:
+        self.detector = detector
+        self.config = config
+        # Элемент очереди — кадр и размер входа; кадры с разным imgsz не смешиваются в пакете.
+        self._batcher: MicroBatcher[Tuple[np.ndarray, Optional[int]], np.ndarray] = MicroBatcher(
+            self._predict_batch,
+            max_batch_size=config.max_batch_size,
+            max_wait_ms=config.max_wait_ms,
+            name="yolo-batcher",
+            key_fn=lambda item: item[1],
+            request_queue=request_queue,
+            thread_init=thread_init,
+        )
+        logger.info(
+            "Общий сервис детекции запущен (batch=%d, wait=%.1f мс)",
+            config.max_batch_size,
+            config.max_wait_ms,
+        )
+
+    def _predict_batch(self, items: Sequence[Tuple[np.ndarray, Optional[int]]]) -> List[np.ndarray]:
+        return self.detector.predict_raw([frame for frame, _ in items], items[0][1])
+
+    def predict(self, frame: np.ndarray, imgsz: Optional[int] = None, share: Optional[ChannelShare] = None) -> np.ndarray:
+        """Возвращает сырые боксы ``(N, 6)`` для кадра, дожидаясь общего пакета."""
+
+        return self._batcher.process((frame, imgsz), share)
+
+    def predict_many(
+        self, frames: Sequence[np.ndarray], imgsz: Optional[int] = None, share: Optional[ChannelShare] = None
+    ) -> List[np.ndarray]:
+        """Отправляет несколько кадров разом, чтобы они попали в один пакет.
+
+        Если планировщик сбросил хотя бы один кадр, выбрасывается :class:`RequestShed`.
+        """
+
+        futures = [self._batcher.submit((frame, imgsz), share) for frame in frames]
+        return [future.result() for future in futures]
+
+    @property
+    def stats(self):
+        return self._batcher.stats
+
+    def close(self) -> None:
+        self._batcher.close()
+
+
+class ChannelDetector:
+    """Клиент общего детектора с собственным трекером канала.
+
+    Повторяет интерфейс :class:`YOLODetector` (``detect``/``track``), поэтому
+    рабочий поток канала не зависит от того, где выполняется прямой проход.
+    Если ByteTrack падает, канал переходит на встроенный :class:`SortTracker`
+    и продолжает выдавать ``track_id``. Кадр, сброшенный планировщиком инференса,
+    обрабатывается как пропущенный детектором: возвращаются экстраполированные треки.
+    """
+
+    def __init__(
+        self,
+        service: DetectorService,
+        tracker_factory: Optional[Callable[[], Any]] = None,
+        tracker: str = TRACKER_NATIVE,
+        input_size: int = 0,
+        resize_mode: str = RESIZE_LETTERBOX,
+        share: Optional[ChannelShare] = None,
+    ) -> None:
+        self.service = service
+        self.share = share
+        self.input_size = max(0, int(input_size))
+        self.resize_mode = resize_mode
+        self._tracker_factory = tracker_factory or (lambda: create_tracker(tracker))
+        self._tracker: Optional[Any] = None
+        self.roi_pixels = 0
+        self.detector_pixels = 0
+
+    def _predict(self, frames: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """Прогон кадров через общий сервис; при ``input_size`` кадры уменьшаются здесь же.
+
+        Боксы возвращаются в координатах исходных кадров, поэтому трекер и кропы для
+        OCR работают с полным разрешением независимо от размера входа детектора.
+        """
+
+        # Источник ffmpeg с pix_fmt=gray отдаёт одноканальные кадры, YOLO ждёт BGR.
+        frames = [cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) if frame.ndim == 2 else frame for frame in frames]
+        if not self.input_size:
+            return self.service.predict_many(frames, share=self.share)
+        prepared = [resize_for_detector(frame, self.input_size, self.resize_mode) for frame in frames]
+        raws = self.service.predict_many([image for image, _ in prepared], self.input_size, self.share)
+        return [
+            restore_boxes(raw, transform, frame.shape)
+            for raw, (_, transform), frame in zip(raws, prepared, frames)
+        ]
+
+    def detect(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        return boxes_to_detections(self._predict([frame])[0])
+
+    def _track_internal(self, frame: np.ndarray, raw: np.ndarray) -> List[Dict[str, Any]]:
+        if self._tracker is None:
+            self._tracker = self._tracker_factory()
+        return self._tracker.update(raw, frame)
+
+    def _fallback_to_native(self) -> None:
+        self._tracker_factory = SortTracker
+        self._tracker = SortTracker()
+
+    def track(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        self.roi_pixels += frame.shape[0] * frame.shape[1]
+        self.detector_pixels += frame.shape[0] * frame.shape[1]
+        try:
+            raw = self._predict([frame])[0]
+        except RequestShed:
+            return self.predict_tracks(frame.shape)
+        return self._track_raw(frame, raw)
+
+    def track_regions(
+        self, frame: np.ndarray, regions: Sequence[Tuple[int, int, int, int]]
+    ) -> List[Dict[str, Any]]:
+        """Детекция только внутри областей ``(x1, y1, x2, y2)`` кадра, трекинг — в координатах кадра.
+
+        Кропы областей уходят в общий сервис одним пакетом, боксы смещаются обратно
+        на начало своей области.
+        """
+
+        self.roi_pixels += frame.shape[0] * frame.shape[1]
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+        self.detector_pixels += sum(crop.shape[0] * crop.shape[1] for crop in crops)
+        try:
+            raws = self._predict(crops)
+        except RequestShed:
+            return self.predict_tracks(frame.shape)
+        shifted = []
+        for (x1, y1, _, _), raw in zip(regions, raws):
+            raw = np.array(raw, dtype=np.float32).reshape(-1, 6)
+            raw[:, [0, 2]] += x1
+            raw[:, [1, 3]] += y1
+            shifted.append(raw)
+        raw = np.concatenate(shifted) if shifted else np.zeros((0, 6), dtype=np.float32)
+        return self._track_raw(frame, raw)
+
+    def _track_raw(self, frame: np.ndarray, raw: np.ndarray) -> List[Dict[str, Any]]:
+        try:
+            return self._track_internal(frame, raw)
+        except Exception as exc:
+            if isinstance(self._tracker, SortTracker):
+                logger.exception("Ошибка встроенного трекера, кадр обработан без track_id")
+                return boxes_to_detections(raw)
+            if isinstance(exc, ModuleNotFoundError):
+                logger.warning("ByteTrack недоступен: отсутствуют зависимости, используем встроенный трекер")
+            else:
+                logger.exception("Ошибка ByteTrack, переключаемся на встроенный трекер")
+            self._fallback_to_native()
+            return self._tracker.update(raw, frame)
+
+    def predict_tracks(self, frame_shape) -> List[Dict[str, Any]]:
+        """Экстраполированные боксы треков для кадра, на котором детектор не запускался."""
+
+        predict = getattr(self._tracker, "predict", None)
+        if predict is None:
+            return []
+        return predict(frame_shape)
@@ -2,10 +2,14 @@
 # /anpr/detection/motion_detector.py
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import cv2
+import numpy as np
+
+BACKGROUND_MOG2 = "mog2"
+BACKGROUND_AVERAGE = "average"
 
 
 @dataclass
@@ -14,54 +18,190 @@ class MotionDetectorConfig:
     frame_stride: int = 1
     activation_frames: int = 3
     release_frames: int = 6
+    analysis_width: int = 320
+    background: str = BACKGROUND_MOG2
+    learning_rate: float = 0.02
+    diff_threshold: int = 25
+    grid_rows: int = 6
+    grid_cols: int = 8
+    cell_min_area: float = 0.05
+    masked_cells: List[Sequence[int]] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, channel_conf: Dict[str, Any]) -> "MotionDetectorConfig":
+        return cls(
+            threshold=float(channel_conf.get("motion_threshold", 0.01)),
+            frame_stride=int(channel_conf.get("motion_frame_stride", 1)),
+            activation_frames=int(channel_conf.get("motion_activation_frames", 3)),
+            release_frames=int(channel_conf.get("motion_release_frames", 6)),
+            analysis_width=max(32, int(channel_conf.get("motion_analysis_width", 320))),
+            background=str(channel_conf.get("motion_background") or BACKGROUND_MOG2).lower(),
+            learning_rate=min(1.0, max(0.0, float(channel_conf.get("motion_learning_rate", 0.02)))),
+            diff_threshold=int(channel_conf.get("motion_diff_threshold", 25)),
+            grid_rows=max(1, int(channel_conf.get("motion_grid_rows", 6))),
+            grid_cols=max(1, int(channel_conf.get("motion_grid_cols", 8))),
+            cell_min_area=min(1.0, max(0.0, float(channel_conf.get("motion_cell_min_area", 0.05)))),
+            masked_cells=list(channel_conf.get("motion_masked_cells") or []),
+        )
 
 
 class MotionDetector:
-    """Простой детектор движения с учётом частоты обработки и устойчивостью к шуму."""
+    """Детектор движения по уменьшенному кадру с фоновой моделью и сеткой ячеек.
+
+    Кадр ROI уменьшается до ``analysis_width`` по ширине, передний план
+    выделяется MOG2 или экспоненциальным средним фона. Маска сводится к сетке
+    ``grid_rows``×``grid_cols``: ячейка активна, если доля движущихся пикселей в
+    ней не меньше ``cell_min_area``. Ячейки из ``masked_cells`` (дождь, деревья,
+    мигающие вывески) не учитываются.
+    """
 
     def __init__(self, config: MotionDetectorConfig) -> None:
         self.config = config
-        self._previous_frame: Optional[cv2.Mat] = None
         self._frame_index: int = 0
         self._motion_frames: int = 0
         self._static_frames: int = 0
         self._motion_active: bool = False
+        self._analysis_shape: Optional[tuple] = None
+        self._subtractor = None
+        self._background: Optional[np.ndarray] = None
+        self._cell_mask = np.ones((config.grid_rows, config.grid_cols), dtype=bool)
+        for cell in config.masked_cells:
+            row, col = int(cell[0]), int(cell[1])
+            if 0 <= row < config.grid_rows and 0 <= col < config.grid_cols:
+                self._cell_mask[row, col] = False
+        self.active_cells = np.zeros_like(self._cell_mask)
+
+    @property
+    def active(self) -> bool:
+        return self._motion_active
 
     def _should_analyze(self) -> bool:
         self._frame_index += 1
         stride = max(1, int(self.config.frame_stride))
         return self._frame_index % stride == 0
 
-    def update(self, frame: cv2.Mat) -> bool:
-        """Обновляет состояние детектора и возвращает, активно ли движение."""
+    def _downscale(self, frame: cv2.Mat) -> np.ndarray:
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.config.analysis_width / float(width))
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (3, 3), 0)
+
+    def _reset_background(self, shape: tuple) -> None:
+        self._analysis_shape = shape
+        self._background = None
+        self._subtractor = None
+        if self.config.background == BACKGROUND_MOG2:
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=500, varThreshold=16, detectShadows=False
+            )
+
+    def _foreground(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        if self._subtractor is not None:
+            return self._subtractor.apply(gray, learningRate=self.config.learning_rate)
+
+        if self._background is None:
+            self._background = gray.astype(np.float32)
+            return None
+        cv2.accumulateWeighted(gray, self._background, self.config.learning_rate)
+        delta = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        _, mask = cv2.threshold(delta, self.config.diff_threshold, 255, cv2.THRESH_BINARY)
+        return mask
+
+    def _update_cells(self, mask: np.ndarray) -> float:
+        # INTER_AREA усредняет маску по ячейкам сетки за один проход.
+        coverage = cv2.resize(
+            mask.astype(np.float32) / 255.0,
+            (self.config.grid_cols, self.config.grid_rows),
+            interpolation=cv2.INTER_AREA,
+        )
+        self.active_cells = (coverage >= self.config.cell_min_area) & self._cell_mask
+        if not self._cell_mask.any():
+            return 0.0
+        return float(coverage[self._cell_mask].mean())
+
+    @staticmethod
+    def _merge_overlapping(rects: List[List[int]]) -> List[List[int]]:
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(rects)):
+                for j in range(i + 1, len(rects)):
+                    a, b = rects[i], rects[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        rects[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                        del rects[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return rects
+
+    def motion_regions(self, frame_shape, padding_cells: int = 1) -> List[Tuple[int, int, int, int]]:
+        """Прямоугольники ``(x1, y1, x2, y2)`` в координатах кадра, покрывающие активные ячейки.
+
+        Соседние ячейки объединяются в одну область, каждая область расширяется на
+        ``padding_cells`` ячеек, пересекающиеся области сливаются.
+        """
+
+        if not self.active_cells.any():
+            return []
+        grid = self.active_cells.astype(np.uint8)
+        if padding_cells > 0:
+            kernel = np.ones((2 * padding_cells + 1, 2 * padding_cells + 1), dtype=np.uint8)
+            grid = cv2.dilate(grid, kernel)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(grid, connectivity=8)
+
+        height, width = frame_shape[:2]
+        cell_w = width / float(self.config.grid_cols)
+        cell_h = height / float(self.config.grid_rows)
+        rects = []
+        for label in range(1, count):
+            col, row, cols, rows = stats[label, :4]
+            rects.append(
+                [
+                    int(col * cell_w),
+                    int(row * cell_h),
+                    min(width, int(round((col + cols) * cell_w))),
+                    min(height, int(round((row + rows) * cell_h))),
+                ]
+            )
+        return [tuple(rect) for rect in self._merge_overlapping(rects)]
+
+    def update(self, frame: cv2.Mat, keyframes_only: bool = False) -> bool:
+        """Обновляет состояние детектора и возвращает, активно ли движение.
+
+        ``keyframes_only`` — источник отдаёт только ключевые кадры (раз в несколько
+        секунд): каждый кадр анализируется, и движение включается по первому
+        кадру с движением, без ``frame_stride`` и ``activation_frames``.
+        """
 
         if frame.size == 0:
             return False
 
-        if not self._should_analyze():
+        if not self._should_analyze() and not keyframes_only:
             return self._motion_active
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        gray = self._downscale(frame)
+        if gray.shape != self._analysis_shape:
+            self._reset_background(gray.shape)
 
-        if self._previous_frame is None:
-            self._previous_frame = gray
+        mask = self._foreground(gray)
+        if mask is None:
             return False
 
-        frame_delta = cv2.absdiff(self._previous_frame, gray)
-        self._previous_frame = gray
-
-        _, thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)
-        motion_ratio = cv2.countNonZero(thresh) / float(gray.size)
+        motion_ratio = self._update_cells(mask)
 
-        if motion_ratio > self.config.threshold:
+        if motion_ratio > self.config.threshold and self.active_cells.any():
             self._motion_frames += 1
             self._static_frames = 0
         else:
             self._static_frames += 1
             self._motion_frames = 0
 
-        if not self._motion_active and self._motion_frames >= self.config.activation_frames:
+        activation_frames = 1 if keyframes_only else self.config.activation_frames
+        if not self._motion_active and self._motion_frames >= activation_frames:
             self._motion_active = True
 
         if self._motion_active and self._static_frames >= self.config.release_frames:
@@ -0,0 +1,242 @@
+# /anpr/detection/tracking.py
+"""Трекеры номерных знаков, работающие поверх результатов детекции.
+
+При общем детекторе трекер больше не живёт внутри модели ultralytics: у каждого
+канала свой экземпляр, поэтому состояние треков разных камер не смешивается.
+Встроенный :class:`SortTracker` не зависит от ultralytics и умеет
+экстраполировать боксы на кадрах, где детектор пропущен.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from anpr.config import ModelConfig
+
+
+TRACKER_BYTETRACK = "bytetrack"
+TRACKER_NATIVE = "native"
+SUPPORTED_TRACKERS = (TRACKER_NATIVE, TRACKER_BYTETRACK)
+
+
+class ByteTrackAdapter:
+    """Отдельный экземпляр ByteTrack из ultralytics для одного канала."""
+
+    def __init__(self, config_name: str = "bytetrack.yaml", frame_rate: int = 30) -> None:
+        from ultralytics.engine.results import Boxes
+        from ultralytics.trackers.byte_tracker import BYTETracker
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+
+        try:
+            from ultralytics.utils import YAML
+
+            tracker_args = YAML.load(check_yaml(config_name))
+        except ImportError:
+            from ultralytics.utils import yaml_load
+
+            tracker_args = yaml_load(check_yaml(config_name))
+
+        self._boxes_cls = Boxes
+        self._tracker = BYTETracker(args=IterableSimpleNamespace(**tracker_args), frame_rate=frame_rate)
+
+    def update(self, raw: np.ndarray, frame: np.ndarray) -> List[Dict[str, Any]]:
+        """Обновляет треки по массиву ``[x1, y1, x2, y2, conf, cls]`` и возвращает детекции с ``track_id``."""
+
+        boxes = self._boxes_cls(np.asarray(raw, dtype=np.float32).reshape(-1, 6), frame.shape[:2])
+        tracks = self._tracker.update(boxes, frame)
+        results: List[Dict[str, Any]] = []
+        for track in tracks:
+            x1, y1, x2, y2, track_id, conf = track[:6]
+            if conf >= ModelConfig.DETECTION_CONFIDENCE_THRESHOLD:
+                results.append(
+                    {
+                        "bbox": [int(x1), int(y1), int(x2), int(y2)],
+                        "confidence": float(conf),
+                        "track_id": int(track_id),
+                    }
+                )
+        return results
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Попарный IoU боксов ``[x1, y1, x2, y2]``: матрица ``(len(a), len(b))``."""
+
+    if boxes_a.size == 0 or boxes_b.size == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :4]
+    b = boxes_b[None, :, :4]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+class _KalmanBoxTrack:
+    """Трек с фильтром Калмана постоянной скорости в координатах ``[cx, cy, w, h]``."""
+
+    _motion = np.eye(8, dtype=np.float64)
+    _motion[:4, 4:] = np.eye(4)
+    _observation = np.eye(4, 8, dtype=np.float64)
+
+    def __init__(self, track_id: int, box: np.ndarray, confidence: float) -> None:
+        self.track_id = track_id
+        self.confidence = confidence
+        self.hits = 1
+        self.time_since_update = 0
+        self.state = np.zeros(8, dtype=np.float64)
+        self.state[:4] = self._to_xywh(box)
+        self.covariance = np.diag(self._noise(1 / 10, 1 / 8) ** 2)
+
+    @staticmethod
+    def _to_xywh(box: np.ndarray) -> np.ndarray:
+        x1, y1, x2, y2 = box[:4]
+        return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float64)
+
+    @property
+    def box(self) -> np.ndarray:
+        cx, cy, w, h = self.state[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dtype=np.float64)
+
+    def _noise(self, position: float, velocity: float) -> np.ndarray:
+        height = max(1.0, self.state[3])
+        return np.array([position * height] * 4 + [velocity * height] * 4)
+
+    def predict(self) -> None:
+        if self.state[2] + self.state[6] <= 1 or self.state[3] + self.state[7] <= 1:
+            self.state[6:8] = 0.0
+        self.state = self._motion @ self.state
+        q = np.diag(self._noise(1 / 20, 1 / 160) ** 2)
+        self.covariance = self._motion @ self.covariance @ self._motion.T + q
+        self.time_since_update += 1
+
+    def update(self, box: np.ndarray, confidence: float) -> None:
+        r = np.diag(self._noise(1 / 20, 0)[:4] ** 2)
+        projected_cov = self._observation @ self.covariance @ self._observation.T + r
+        gain = self.covariance @ self._observation.T @ np.linalg.inv(projected_cov)
+        innovation = self._to_xywh(box) - self._observation @ self.state
+        self.state = self.state + gain @ innovation
+        self.covariance = (np.eye(8) - gain @ self._observation) @ self.covariance
+        self.confidence = confidence
+        self.hits += 1
+        self.time_since_update = 0
+
+
+class SortTracker:
+    """Лёгкий трекер в духе SORT: IoU-ассоциация и прогноз постоянной скорости.
+
+    Трекер сам выдаёт ``track_id`` и работает поверх обычного ``detect``. Между
+    запусками детектора :meth:`predict` экстраполирует боксы активных треков,
+    чтобы OCR мог брать кропы и на промежуточных кадрах.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_age: int = 30,
+        min_hits: int = 1,
+        max_predict_frames: int = 10,
+    ) -> None:
+        self.iou_threshold = iou_threshold
+        self.max_age = max(1, max_age)
+        self.min_hits = max(1, min_hits)
+        self.max_predict_frames = max(0, max_predict_frames)
+        self._tracks: List[_KalmanBoxTrack] = []
+        self._next_id = 1
+
+    @property
+    def active_tracks(self) -> int:
+        return sum(1 for track in self._tracks if track.hits >= self.min_hits)
+
+    def _associate(self, predicted: np.ndarray, detections: np.ndarray) -> List[tuple]:
+        ious = iou_matrix(predicted, detections)
+        matches: List[tuple] = []
+        if ious.size == 0:
+            return matches
+        # Жадное сопоставление по убыванию IoU: треков с номерами в кадре единицы.
+        order = np.dstack(np.unravel_index(np.argsort(-ious, axis=None), ious.shape))[0]
+        used_tracks: set = set()
+        used_dets: set = set()
+        for track_idx, det_idx in order:
+            if ious[track_idx, det_idx] < self.iou_threshold:
+                break
+            if track_idx in used_tracks or det_idx in used_dets:
+                continue
+            used_tracks.add(track_idx)
+            used_dets.add(det_idx)
+            matches.append((int(track_idx), int(det_idx)))
+        return matches
+
+    @staticmethod
+    def _clip(box: np.ndarray, frame_shape) -> List[int]:
+        x1, y1, x2, y2 = box
+        if frame_shape is not None:
+            height, width = frame_shape[:2]
+            x1, x2 = np.clip([x1, x2], 0, width)
+            y1, y2 = np.clip([y1, y2], 0, height)
+        return [int(x1), int(y1), int(x2), int(y2)]
+
+    def update(self, raw: np.ndarray, frame: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Обновляет треки по массиву ``[x1, y1, x2, y2, conf, ...]`` и возвращает детекции с ``track_id``."""
+
+        raw = np.asarray(raw, dtype=np.float64).reshape(-1, 6)
+        detections = raw[raw[:, 4] >= ModelConfig.DETECTION_CONFIDENCE_THRESHOLD]
+
+        for track in self._tracks:
+            track.predict()
+        predicted = np.array([track.box for track in self._tracks]).reshape(-1, 4)
+
+        matches = self._associate(predicted, detections)
+        matched_dets = {det_idx for _, det_idx in matches}
+        for track_idx, det_idx in matches:
+            self._tracks[track_idx].update(detections[det_idx], float(detections[det_idx, 4]))
+
+        for det_idx, det in enumerate(detections):
+            if det_idx not in matched_dets:
+                self._tracks.append(_KalmanBoxTrack(self._next_id, det, float(det[4])))
+                self._next_id += 1
+
+        self._tracks = [track for track in self._tracks if track.time_since_update <= self.max_age]
+
+        frame_shape = frame.shape if frame is not None else None
+        return [
+            {
+                "bbox": self._clip(track.box, frame_shape),
+                "confidence": float(track.confidence),
+                "track_id": track.track_id,
+            }
+            for track in self._tracks
+            if track.time_since_update == 0 and track.hits >= self.min_hits
+        ]
+
+    def predict(self, frame_shape=None) -> List[Dict[str, Any]]:
+        """Продвигает треки на один кадр без детекций и возвращает экстраполированные боксы."""
+
+        results: List[Dict[str, Any]] = []
+        for track in self._tracks:
+            track.predict()
+            if track.hits >= self.min_hits and track.time_since_update <= self.max_predict_frames:
+                bbox = self._clip(track.box, frame_shape)
+                if bbox[2] > bbox[0] and bbox[3] > bbox[1]:
+                    results.append(
+                        {
+                            "bbox": bbox,
+                            "confidence": float(track.confidence),
+                            "track_id": track.track_id,
+                            "predicted": True,
+                        }
+                    )
+        self._tracks = [track for track in self._tracks if track.time_since_update <= self.max_age]
+        return results
+
+
+def create_tracker(kind: str = TRACKER_NATIVE):
+    """Создаёт трекер канала по имени из настроек; неизвестное имя трактуется как ``native``."""
+
+    if (kind or "").strip().lower() == TRACKER_BYTETRACK:
+        return ByteTrackAdapter()
+    return SortTracker()
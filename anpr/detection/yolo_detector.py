@@ -3,35 +3,99 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import cv2
 import numpy as np
 from ultralytics import YOLO
 
 from anpr.config import ModelConfig
+from anpr.detection.tracking import SortTracker
 from logging_manager import get_logger
 
 logger = get_logger(__name__)
 
 
+def boxes_to_detections(raw: np.ndarray, threshold: float = ModelConfig.DETECTION_CONFIDENCE_THRESHOLD) -> List[Dict[str, Any]]:
+    """Преобразует массив ``[x1, y1, x2, y2, conf, cls]`` в словари детекций с порогом уверенности."""
+
+    results: List[Dict[str, Any]] = []
+    for det in raw:
+        x1, y1, x2, y2, conf = det[:5]
+        if conf >= threshold:
+            results.append({"bbox": [int(x1), int(y1), int(x2), int(y2)], "confidence": float(conf)})
+    return results
+
+
+RESIZE_LETTERBOX = "letterbox"
+RESIZE_STRETCH = "stretch"
+
+# Масштаб по x/y и отступы по x/y, которыми кадр приведён ко входу детектора.
+InputTransform = Tuple[float, float, int, int]
+
+
+def resize_for_detector(
+    image: np.ndarray, size: int, mode: str = RESIZE_LETTERBOX
+) -> Tuple[np.ndarray, InputTransform]:
+    """Приводит кадр к квадратному входу ``size``×``size`` одним ресайзом.
+
+    ``letterbox`` сохраняет пропорции (без увеличения) и дополняет кадр серыми
+    полями, ``stretch`` растягивает его на весь вход.
+    """
+
+    height, width = image.shape[:2]
+    if mode == RESIZE_STRETCH:
+        scale_x, scale_y = size / float(width), size / float(height)
+        interpolation = cv2.INTER_AREA if scale_x * scale_y < 1.0 else cv2.INTER_LINEAR
+        return cv2.resize(image, (size, size), interpolation=interpolation), (scale_x, scale_y, 0, 0)
+
+    scale = min(1.0, size / float(width), size / float(height))
+    new_w, new_h = max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size) + image.shape[2:], 114, dtype=image.dtype)
+    canvas[pad_y : pad_y + new_h, pad_x : pad_x + new_w] = resized
+    return canvas, (scale, scale, pad_x, pad_y)
+
+
+def restore_boxes(raw: np.ndarray, transform: InputTransform, shape: Tuple[int, ...]) -> np.ndarray:
+    """Переводит боксы ``[x1, y1, x2, y2, ...]`` со входа детектора обратно в координаты кадра ``shape``."""
+
+    scale_x, scale_y, pad_x, pad_y = transform
+    restored = np.array(raw, dtype=np.float32).reshape(-1, 6)
+    restored[:, [0, 2]] = np.clip((restored[:, [0, 2]] - pad_x) / scale_x, 0, shape[1])
+    restored[:, [1, 3]] = np.clip((restored[:, [1, 3]] - pad_y) / scale_y, 0, shape[0])
+    return restored
+
+
 class YOLODetector:
-    """Детектор с безопасным откатом к обычной детекции при ошибках трекера."""
+    """Детектор с безопасным откатом на встроенный трекер при ошибках ByteTrack."""
 
     def __init__(self, model_path: str, device) -> None:
-        self.model = YOLO(model_path)
-        self.model.to(device)
+        self.model = YOLO(model_path, task="detect")
+        if model_path.endswith(".pt"):
+            # Экспортированные ONNX/OpenVINO-модели исполняются своей средой на CPU.
+            self.model.to(device)
         self.device = device
         self._tracking_supported = True
+        self._fallback_tracker: Optional[SortTracker] = None
         logger.info("Детектор YOLO успешно загружен (model=%s, device=%s)", model_path, device)
 
+    def predict_raw(self, frames: Sequence[np.ndarray], imgsz: Optional[int] = None) -> List[np.ndarray]:
+        """Пакетный прогон без порога: массив ``(N, 6)`` ``[x1, y1, x2, y2, conf, cls]`` на каждый кадр.
+
+        ``imgsz`` задаёт размер входа сети; без него используется размер, с которым
+        модель обучалась или экспортировалась.
+        """
+
+        if not frames:
+            return []
+        options = {"imgsz": imgsz} if imgsz else {}
+        detections = self.model.predict(list(frames), verbose=False, device=self.device, **options)
+        return [det.boxes.data.cpu().numpy() for det in detections]
+
     def detect(self, frame: np.ndarray) -> List[Dict[str, Any]]:
-        detections = self.model.predict(frame, verbose=False, device=self.device)
-        results: List[Dict[str, Any]] = []
-        for det in detections[0].boxes.data:
-            x1, y1, x2, y2, conf, _ = det.cpu().numpy()
-            if conf >= ModelConfig.DETECTION_CONFIDENCE_THRESHOLD:
-                results.append({"bbox": [int(x1), int(y1), int(x2), int(y2)], "confidence": float(conf)})
-        return results
+        return boxes_to_detections(self.predict_raw([frame])[0])
 
     def _track_internal(self, frame: np.ndarray) -> List[Dict[str, Any]]:
         detections = self.model.track(frame, persist=True, verbose=False, device=self.device)
@@ -54,18 +118,22 @@ class YOLODetector:
                 )
         return results
 
+    def _track_native(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        if self._fallback_tracker is None:
+            self._fallback_tracker = SortTracker()
+        return self._fallback_tracker.update(self.predict_raw([frame])[0], frame)
+
     def track(self, frame: np.ndarray) -> List[Dict[str, Any]]:
         if not self._tracking_supported:
-            return self.detect(frame)
+            return self._track_native(frame)
 
         try:
             return self._track_internal(frame)
         except ModuleNotFoundError:
             self._tracking_supported = False
-            logger.warning("Отключаем трекинг YOLO: отсутствуют зависимости")
-            return self.detect(frame)
+            logger.warning("ByteTrack недоступен: отсутствуют зависимости, используем встроенный трекер")
+            return self._track_native(frame)
         except Exception:
             self._tracking_supported = False
-            logger.exception("Отключаем трекинг YOLO из-за ошибки, переключаемся на detect")
-            return self.detect(frame)
-
+            logger.exception("Ошибка ByteTrack, переключаемся на встроенный трекер")
+            return self._track_native(frame)
@@ -0,0 +1 @@
+# /anpr/inference/__init__.py
@@ -0,0 +1,118 @@
+# /anpr/inference/backends.py
+"""Сменные среды выполнения моделей: PyTorch, ONNX Runtime и OpenVINO (CPU).
+
+Детектор YOLO загружается через ultralytics, который сам умеет исполнять
+экспортированные ONNX/OpenVINO-модели, поэтому для него бэкенд определяет только
+путь к весам. Для CRNN здесь собраны исполнители с единым интерфейсом:
+``runner(batch) -> log_probs`` на массивах NumPy формы ``(N, 1, H, W)`` и ``(T, N, C)``.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import torch
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNXRUNTIME = "onnxruntime"
+BACKEND_OPENVINO = "openvino"
+SUPPORTED_BACKENDS = (BACKEND_TORCH, BACKEND_ONNXRUNTIME, BACKEND_OPENVINO)
+
+_ALIASES = {
+    "pytorch": BACKEND_TORCH,
+    "onnx": BACKEND_ONNXRUNTIME,
+    "ort": BACKEND_ONNXRUNTIME,
+    "ov": BACKEND_OPENVINO,
+}
+
+
+def normalize_backend(name: Optional[str], default: str = BACKEND_TORCH) -> str:
+    """Приводит имя бэкенда из настроек к каноническому виду."""
+
+    if not name:
+        return default
+    normalized = str(name).strip().lower()
+    normalized = _ALIASES.get(normalized, normalized)
+    if normalized not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд инференса: {name}")
+    return normalized
+
+
+def backend_available(backend: str) -> bool:
+    """Проверяет, установлена ли среда выполнения бэкенда."""
+
+    if backend == BACKEND_ONNXRUNTIME:
+        module = "onnxruntime"
+    elif backend == BACKEND_OPENVINO:
+        module = "openvino"
+    else:
+        return True
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+class TorchRunner:
+    """Исполнитель модели PyTorch с интерфейсом NumPy."""
+
+    backend = BACKEND_TORCH
+
+    def __init__(self, model: torch.nn.Module, device: torch.device) -> None:
+        self.model = model
+        self.device = device
+
+    @torch.no_grad()
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self.model(torch.from_numpy(batch).to(self.device)).cpu().numpy()
+
+
+class OnnxRuntimeRunner:
+    """Исполнитель ONNX-модели через ONNX Runtime на CPU."""
+
+    backend = BACKEND_ONNXRUNTIME
+
+    def __init__(self, model_path: str, num_threads: int = 0) -> None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINORunner:
+    """Исполнитель модели OpenVINO IR (или ONNX) на CPU."""
+
+    backend = BACKEND_OPENVINO
+
+    def __init__(self, model_path: str, num_threads: int = 0) -> None:
+        import openvino as ov
+
+        core = ov.Core()
+        config = {"INFERENCE_NUM_THREADS": num_threads} if num_threads > 0 else {}
+        self.compiled = core.compile_model(core.read_model(model_path), "CPU", config)
+        self._output = self.compiled.output(0)
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled(batch)[self._output]
+
+
+def create_runner(backend: str, model_path: str, num_threads: int = 0):
+    """Создаёт исполнитель экспортированной модели для ONNX Runtime или OpenVINO."""
+
+    if backend == BACKEND_ONNXRUNTIME:
+        return OnnxRuntimeRunner(model_path, num_threads)
+    if backend == BACKEND_OPENVINO:
+        return OpenVINORunner(model_path, num_threads)
+    raise ValueError(f"Бэкенд {backend} не использует экспортированные модели")
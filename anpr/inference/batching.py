@@ -0,0 +1,207 @@
+# /anpr/inference/batching.py
+"""Сбор запросов инференса из разных потоков в пакеты.
+
+Каналы работают в собственных потоках и вызывают модель по одному кадру. Пакетный
+сборщик копит такие запросы до достижения размера пакета или истечения дедлайна
+ожидания и выполняет один общий прямой проход.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, List, Optional, Sequence, TypeVar
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class BatchStats:
+    """Счётчики пакетного сборщика."""
+
+    batches: int = 0
+    items: int = 0
+    max_batch: int = 0
+
+    @property
+    def mean_batch(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+
+@dataclass
+class _Request(Generic[T]):
+    item: T
+    key: Hashable
+    future: Future
+    share: Any = None
+    enqueued_at: float = 0.0
+
+
+class MicroBatcher(Generic[T, R]):
+    """Фоновый поток, объединяющий одиночные запросы в пакеты.
+
+    ``handler`` получает список элементов одного ключа группировки и обязан вернуть
+    список результатов той же длины. Ключ позволяет не смешивать в одном пакете
+    запросы, которые модель не может обработать вместе (например, разный размер входа).
+    ``request_queue`` подменяет FIFO-очередь, например, на
+    :class:`~anpr.inference.scheduler.SchedulingQueue` с приоритетами каналов.
+    Очередь с ``keyed = True`` сама выдаёт запросы нужной группы (``get(key=...)``),
+    поэтому запросы других групп не покидают её и сохраняют приоритет, сброс
+    по бюджету задержки и учёт глубины.
+    ``thread_init`` вызывается в потоке сборщика до первого пакета (число потоков
+    torch, привязка к ядрам).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Sequence[T]], List[R]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "micro-batcher",
+        key_fn: Optional[Callable[[T], Hashable]] = None,
+        request_queue: Optional[Any] = None,
+        thread_init: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.handler = handler
+        self.thread_init = thread_init
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.key_fn = key_fn
+        self.stats = BatchStats()
+        self._queue: "queue.Queue[_Request[T]]" = request_queue if request_queue is not None else queue.Queue()
+        self._pending: List[_Request[T]] = []
+        self._keyed = bool(getattr(self._queue, "keyed", False))
+        self._closed = False
+        self._drain_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item: T, share: Any = None) -> Future:
+        """Ставит элемент в очередь и возвращает future с его результатом.
+
+        ``share`` — доля канала для очереди с приоритетами; FIFO-очередь его не использует.
+        """
+
+        if self._closed:
+            raise RuntimeError(f"{self.name} остановлен")
+        self._ensure_thread()
+        future: Future = Future()
+        key = self.key_fn(item) if self.key_fn else None
+        self._queue.put(_Request(item, key, future, share, time.monotonic()))
+        return future
+
+    def process(self, item: T, share: Any = None) -> R:
+        """Блокирующий вызов для одного элемента."""
+
+        return self.submit(item, share).result()
+
+    def close(self) -> None:
+        """Останавливает поток; запросы, не попавшие в пакет, завершаются исключением.
+
+        Если поток ещё выполняет пакет, оставшиеся запросы он завершит сам после пакета.
+        """
+
+        self._closed = True
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=1.0)
+        if thread is None or not thread.is_alive():
+            self._fail_outstanding()
+
+    def _fail_outstanding(self) -> None:
+        with self._drain_lock:
+            requests, self._pending = self._pending, []
+            if hasattr(self._queue, "drain"):
+                requests.extend(self._queue.drain())
+            while True:
+                try:
+                    requests.append(self._queue.get(timeout=0))
+                except queue.Empty:
+                    break
+        for request in requests:
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError(f"{self.name} остановлен"))
+        if requests:
+            logger.info("%s: при остановке отменено запросов: %d", self.name, len(requests))
+
+    def _next_request(self, timeout: Optional[float]) -> Optional[_Request[T]]:
+        if self._pending:
+            return self._pending.pop(0)
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _collect(self, first: _Request[T]) -> List[_Request[T]]:
+        batch = [first]
+        for request in list(self._pending):
+            if len(batch) >= self.max_batch_size:
+                break
+            if request.key == first.key:
+                self._pending.remove(request)
+                batch.append(request)
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                if self._keyed:
+                    request = self._queue.get(timeout=remaining, key=first.key)
+                else:
+                    request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request.key != first.key:
+                # Запрос другой группы ждёт следующего пакета, порядок сохраняется.
+                self._pending.append(request)
+                continue
+            batch.append(request)
+        return batch
+
+    def _run(self) -> None:
+        if self.thread_init is not None:
+            self.thread_init()
+        while not self._closed:
+            first = self._next_request(0.2)
+            if first is None:
+                continue
+            batch = self._collect(first)
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.handler([request.item for request in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self.name}: обработчик вернул {len(results)} результатов для {len(batch)} запросов"
+                    )
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Ошибка пакетного инференса (%s)", self.name)
+                for request in batch:
+                    request.future.set_exception(exc)
+                continue
+
+            self.stats.batches += 1
+            self.stats.items += len(batch)
+            self.stats.max_batch = max(self.stats.max_batch, len(batch))
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+        self._fail_outstanding()
@@ -0,0 +1,198 @@
+# /anpr/inference/export.py
+"""Экспорт детектора и CRNN для ONNX Runtime / OpenVINO и проверка паритета с PyTorch."""
+
+from __future__ import annotations
+
+import os
+import shutil
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from anpr.config import ModelConfig
+from anpr.inference.backends import BACKEND_ONNXRUNTIME, BACKEND_OPENVINO, TorchRunner, create_runner
+from anpr.recognition.crnn import CRNN
+from anpr.recognition.crnn_recognizer import CRNNRecognizer, build_quantized_crnn
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+ONNX_OPSET = 17
+
+
+@dataclass
+class ParityReport:
+    """Итог сравнения экспортированной модели с PyTorch."""
+
+    samples: int
+    max_abs_diff: float
+    agreement: float
+    passed: bool
+
+    def summary(self) -> str:
+        status = "OK" if self.passed else "РАСХОЖДЕНИЕ"
+        return (
+            f"{status}: образцов={self.samples}, max |Δ|={self.max_abs_diff:.4f}, "
+            f"совпадение={self.agreement * 100:.1f}%"
+        )
+
+
+def dequantize_crnn(quantized: nn.Module) -> CRNN:
+    """Восстанавливает float-CRNN из INT8-графа FX.
+
+    ONNX-экспортёр не поддерживает часть квантованных операций графа FX, поэтому
+    экспортируются деквантованные веса. BatchNorm при квантизации слит со свёрткой,
+    так что в float-модели он заменяется тождественным преобразованием.
+    """
+
+    model = CRNN(len(ModelConfig.OCR_ALPHABET) + 1).eval()
+    with torch.no_grad():
+        for name, module in model.named_modules():
+            if isinstance(module, (nn.Conv2d, nn.Linear)):
+                source = quantized.get_submodule(name)
+                module.weight.copy_(source.weight().dequantize())
+                bias = source.bias()
+                if bias is not None:
+                    module.bias.copy_(bias)
+            elif isinstance(module, nn.BatchNorm2d):
+                module.weight.fill_(1.0)
+                module.bias.zero_()
+                module.running_mean.zero_()
+                module.running_var.fill_(1.0 - module.eps)
+        model.rnn.load_state_dict(quantized.get_submodule("rnn").state_dict())
+    return model
+
+
+def export_ocr_onnx(model_path: str = ModelConfig.OCR_MODEL_PATH, onnx_path: str = ModelConfig.OCR_ONNX_PATH) -> str:
+    # Деквантизации нужны модули графа FX, архив TorchScript для этого не подходит.
+    quantized = build_quantized_crnn(model_path, torch.device("cpu"))
+    model = dequantize_crnn(quantized)
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    example = torch.zeros(1, 1, ModelConfig.OCR_IMG_HEIGHT, ModelConfig.OCR_IMG_WIDTH)
+    torch.onnx.export(
+        model,
+        (example,),
+        onnx_path,
+        opset_version=ONNX_OPSET,
+        input_names=["input"],
+        output_names=["log_probs"],
+        dynamic_axes={"input": {0: "batch"}, "log_probs": {1: "batch"}},
+        dynamo=False,
+    )
+    logger.info("CRNN экспортирована в ONNX: %s", onnx_path)
+    return onnx_path
+
+
+def export_ocr_openvino(
+    onnx_path: str = ModelConfig.OCR_ONNX_PATH, xml_path: str = ModelConfig.OCR_OPENVINO_PATH
+) -> str:
+    import openvino as ov
+
+    if not os.path.exists(onnx_path):
+        export_ocr_onnx(onnx_path=onnx_path)
+    os.makedirs(os.path.dirname(xml_path) or ".", exist_ok=True)
+    ov.save_model(ov.convert_model(onnx_path), xml_path)
+    logger.info("CRNN экспортирована в OpenVINO IR: %s", xml_path)
+    return xml_path
+
+
+def export_detector(fmt: str, model_path: str = ModelConfig.YOLO_MODEL_PATH, imgsz: int = 640) -> str:
+    """Экспортирует YOLO средствами ultralytics с динамическим размером пакета."""
+
+    from ultralytics import YOLO
+
+    exported = YOLO(model_path).export(format=fmt, dynamic=True, imgsz=imgsz)
+    target = ModelConfig.yolo_model_path(BACKEND_ONNXRUNTIME if fmt == "onnx" else BACKEND_OPENVINO)
+    if os.path.abspath(str(exported)) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        shutil.move(str(exported), target)
+    logger.info("Детектор YOLO экспортирован (%s): %s", fmt, target)
+    return target
+
+
+def check_ocr_parity(
+    backend: str,
+    crops: Sequence[np.ndarray],
+    model_path: str = ModelConfig.OCR_MODEL_PATH,
+    tolerance: float = 0.98,
+    prob_tolerance: float = 0.02,
+) -> ParityReport:
+    """Сравнивает выход и распознанный текст экспортированной CRNN с INT8-моделью PyTorch.
+
+    Экспортированная модель исполняется во float, а эталон — в INT8, поэтому
+    вероятности расходятся в пределах шума квантизации активаций. Проверка
+    пройдена, если вероятности совпадают в пределах ``prob_tolerance`` или
+    текст совпадает не менее чем на ``tolerance`` кропов.
+    """
+
+    reference = CRNNRecognizer(model_path, torch.device("cpu"))
+    exported_path = ModelConfig.ocr_model_path(backend)
+    candidate = CRNNRecognizer(exported_path, torch.device("cpu"), backend=backend)
+
+    batch = reference.preprocessor.fill(crops).copy()
+    reference_out = TorchRunner(reference.model, torch.device("cpu"))(batch)
+    candidate_out = create_runner(backend, exported_path)(batch)
+    max_abs_diff = float(np.abs(np.exp(reference_out) - np.exp(candidate_out)).max()) if len(crops) else 0.0
+
+    reference_texts = [text for text, _ in reference._decode_batch(reference_out)]
+    candidate_texts = [text for text, _ in candidate._decode_batch(candidate_out)]
+    agreement = (
+        sum(a == b for a, b in zip(reference_texts, candidate_texts)) / len(crops) if len(crops) else 1.0
+    )
+    passed = max_abs_diff <= prob_tolerance or agreement >= tolerance
+    return ParityReport(len(crops), max_abs_diff, agreement, passed)
+
+
+def _match_boxes(reference: np.ndarray, candidate: np.ndarray) -> List[float]:
+    """Для каждого эталонного бокса возвращает IoU с лучшим боксом кандидата."""
+
+    ious: List[float] = []
+    for ref_box in reference[:, :4]:
+        if candidate.size == 0:
+            ious.append(0.0)
+            continue
+        x1 = np.maximum(ref_box[0], candidate[:, 0])
+        y1 = np.maximum(ref_box[1], candidate[:, 1])
+        x2 = np.minimum(ref_box[2], candidate[:, 2])
+        y2 = np.minimum(ref_box[3], candidate[:, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        ref_area = (ref_box[2] - ref_box[0]) * (ref_box[3] - ref_box[1])
+        cand_area = (candidate[:, 2] - candidate[:, 0]) * (candidate[:, 3] - candidate[:, 1])
+        ious.append(float((inter / np.maximum(ref_area + cand_area - inter, 1e-6)).max()))
+    return ious
+
+
+def check_detector_parity(
+    backend: str,
+    frames: Sequence[np.ndarray],
+    iou_threshold: float = 0.9,
+    tolerance: float = 0.95,
+) -> ParityReport:
+    """Сравнивает боксы экспортированного детектора с PyTorch по IoU и уверенности."""
+
+    from anpr.detection.yolo_detector import YOLODetector
+
+    reference = YOLODetector(ModelConfig.YOLO_MODEL_PATH, torch.device("cpu"))
+    candidate = YOLODetector(ModelConfig.yolo_model_path(backend), torch.device("cpu"))
+    threshold = ModelConfig.DETECTION_CONFIDENCE_THRESHOLD
+
+    matched = 0
+    total = 0
+    max_conf_diff = 0.0
+    for frame in frames:
+        ref_raw = reference.predict_raw([frame])[0]
+        cand_raw = candidate.predict_raw([frame])[0]
+        ref_raw = ref_raw[ref_raw[:, 4] >= threshold]
+        cand_raw = cand_raw[cand_raw[:, 4] >= threshold * 0.8]
+        ious = _match_boxes(ref_raw, cand_raw)
+        total += len(ious)
+        matched += sum(iou >= iou_threshold for iou in ious)
+        if ref_raw.size and cand_raw.size:
+            max_conf_diff = max(max_conf_diff, float(abs(ref_raw[:, 4].max() - cand_raw[:, 4].max())))
+
+    agreement = matched / total if total else 1.0
+    return ParityReport(len(frames), max_conf_diff, agreement, agreement >= tolerance)
@@ -0,0 +1,243 @@
+# /anpr/inference/resources.py
+"""План ядер CPU для инференса: потоки torch/OpenCV и привязка к ядрам.
+
+Бюджет ядер (``runtime.resources``) делится так: ``reserve_cores`` остаются
+захвату, декодированию и GUI, остальные ядра расходятся между детектором и
+OCR в пропорции ``detector_share``. Число intra-op потоков роли равно числу её
+ядер, поэтому детектор и OCR вместе не занимают больше ядер, чем есть. В режиме
+процессов ядра инференса сначала делятся между процессами каналов.
+
+План активируется в процессе через :func:`activate_plan`, а потоки пакетной обработки
+применяют свою часть при старте через :func:`enter_role`.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import cv2
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+ROLE_DETECTOR = "detector"
+ROLE_OCR = "ocr"
+
+
+@dataclass
+class ResourceBudgetConfig:
+    """Параметры раздела ``runtime.resources``.
+
+    ``cores`` — сколько ядер отдать приложению (0 — все доступные процессу),
+    ``pin_affinity`` — привязывать потоки детектора/OCR и процессы каналов к
+    назначенным ядрам, ``interop_threads`` — потоки inter-op torch.
+    """
+
+    enabled: bool = True
+    cores: int = 0
+    reserve_cores: int = 1
+    detector_share: float = 0.75
+    pin_affinity: bool = False
+    interop_threads: int = 1
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "ResourceBudgetConfig":
+        resources_conf = config or {}
+        return cls(
+            enabled=bool(resources_conf.get("enabled", True)),
+            cores=max(0, int(resources_conf.get("cores", 0))),
+            reserve_cores=max(0, int(resources_conf.get("reserve_cores", 1))),
+            detector_share=min(0.95, max(0.05, float(resources_conf.get("detector_share", 0.75)))),
+            pin_affinity=bool(resources_conf.get("pin_affinity", False)),
+            interop_threads=max(1, int(resources_conf.get("interop_threads", 1))),
+        )
+
+
+@dataclass
+class ThreadAssignment:
+    """Потоки intra-op и ядра одной роли; пустой список ядер — без привязки."""
+
+    threads: int
+    cores: List[int] = field(default_factory=list)
+
+
+@dataclass
+class ResourcePlan:
+    """План одного процесса: ядра ролей и размеры пулов torch/OpenCV."""
+
+    cores: List[int]
+    reserved: List[int]
+    detector: ThreadAssignment
+    ocr: ThreadAssignment
+    opencv_threads: int
+    interop_threads: int
+    pin_affinity: bool = False
+
+    def role(self, role: str) -> ThreadAssignment:
+        return self.detector if role == ROLE_DETECTOR else self.ocr
+
+    def describe(self) -> str:
+        def cores_text(cores: List[int]) -> str:
+            return format_cores(cores) if cores else "-"
+
+        return (
+            f"ядра {cores_text(self.cores)} (резерв {cores_text(self.reserved)}); "
+            f"детектор: потоков {self.detector.threads}, ядра {cores_text(self.detector.cores)}; "
+            f"OCR: потоков {self.ocr.threads}, ядра {cores_text(self.ocr.cores)}; "
+            f"OpenCV {self.opencv_threads}, inter-op {self.interop_threads}, "
+            f"привязка {'вкл' if self.pin_affinity else 'выкл'}"
+        )
+
+
+@dataclass
+class ProcessAssignment:
+    """Ядра процесса каналов в режиме ``processes``."""
+
+    names: List[str]
+    cores: List[int]
+    threads: int
+
+
+def format_cores(cores: List[int]) -> str:
+    """``[0, 1, 2, 5]`` → ``"0-2,5"``."""
+
+    ranges: List[str] = []
+    start = prev = None
+    for core in sorted(cores):
+        if start is None:
+            start = prev = core
+        elif core == prev + 1:
+            prev = core
+        else:
+            ranges.append(f"{start}-{prev}" if prev != start else f"{start}")
+            start = prev = core
+    if start is not None:
+        ranges.append(f"{start}-{prev}" if prev != start else f"{start}")
+    return ",".join(ranges)
+
+
+def available_cores() -> List[int]:
+    """Ядра, на которых процессу разрешено работать."""
+
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _budget_cores(config: ResourceBudgetConfig, cores: Optional[List[int]]) -> List[int]:
+    cores = list(cores) if cores else available_cores()
+    if config.cores:
+        cores = cores[: config.cores]
+    return cores
+
+
+def plan_threads(
+    channels: int,
+    config: ResourceBudgetConfig,
+    cores: Optional[List[int]] = None,
+    torch_threads: int = 0,
+    opencv_threads: int = 0,
+) -> ResourcePlan:
+    """План процесса с ``channels`` каналами на ядрах ``cores`` (по умолчанию — весь бюджет).
+
+    ``torch_threads``/``opencv_threads`` больше нуля задают число потоков явно.
+    """
+
+    cores = _budget_cores(config, cores)
+    reserve = min(config.reserve_cores, len(cores) - 1)
+    reserved = cores[:reserve]
+    inference = cores[reserve:]
+    if len(inference) >= 2:
+        detector_count = min(len(inference) - 1, max(1, int(math.ceil(len(inference) * config.detector_share))))
+        detector_cores, ocr_cores = inference[:detector_count], inference[detector_count:]
+    else:
+        detector_cores = ocr_cores = inference
+    return ResourcePlan(
+        cores=cores,
+        reserved=reserved,
+        detector=ThreadAssignment(torch_threads or len(detector_cores), detector_cores),
+        ocr=ThreadAssignment(torch_threads or len(ocr_cores), ocr_cores),
+        opencv_threads=opencv_threads or max(1, len(cores) // max(1, channels)),
+        interop_threads=config.interop_threads,
+        pin_affinity=config.pin_affinity,
+    )
+
+
+def plan_processes(
+    groups: List[List[str]], config: ResourceBudgetConfig, threads_per_process: int = 0
+) -> List[ProcessAssignment]:
+    """Делит ядра между процессами каналов поровну, резерв остаётся GUI.
+
+    Если процессов больше, чем ядер, процессы делят ядра по кругу.
+    """
+
+    cores = _budget_cores(config, None)
+    reserve = min(config.reserve_cores, len(cores) - 1)
+    inference = cores[reserve:]
+    count = max(1, len(groups))
+    per_process = max(1, len(inference) // count)
+    assignments: List[ProcessAssignment] = []
+    for index, names in enumerate(groups):
+        start = (index * per_process) % len(inference)
+        slice_cores = [inference[(start + offset) % len(inference)] for offset in range(per_process)]
+        assignments.append(ProcessAssignment(list(names), slice_cores, threads_per_process or len(slice_cores)))
+    return assignments
+
+
+_ACTIVE_PLAN: Optional[ResourcePlan] = None
+
+
+def activate_plan(plan: ResourcePlan) -> None:
+    """Делает план текущим для процесса и применяет общие ограничения потоков."""
+
+    global _ACTIVE_PLAN
+    _ACTIVE_PLAN = plan
+    cv2.setNumThreads(plan.opencv_threads)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(max(plan.detector.threads, plan.ocr.threads))
+    try:
+        torch.set_num_interop_threads(plan.interop_threads)
+    except RuntimeError:
+        # Пул inter-op уже создан (план применяется повторно): размер менять поздно.
+        pass
+
+
+def active_plan() -> Optional[ResourcePlan]:
+    return _ACTIVE_PLAN
+
+
+def role_threads(role: str) -> int:
+    """Число потоков роли по текущему плану; 0 — решает среда выполнения."""
+
+    return _ACTIVE_PLAN.role(role).threads if _ACTIVE_PLAN is not None else 0
+
+
+def enter_role(role: str) -> None:
+    """Применяет план роли к вызывающему потоку.
+
+    torch хранит число intra-op потоков для каждого потока отдельно, а потоки
+    OpenMP наследуют привязку создавшего их потока.
+    """
+
+    plan = _ACTIVE_PLAN
+    if plan is None:
+        return
+    assignment = plan.role(role)
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    if torch is not None:
+        torch.set_num_threads(assignment.threads)
+    if plan.pin_affinity and assignment.cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, assignment.cores)
+        except OSError as exc:
+            logger.warning("Не удалось привязать поток %s к ядрам %s: %s", role, assignment.cores, exc)
@@ -0,0 +1,316 @@
+# /anpr/inference/scheduler.py
+"""Общая очередь инференса с приоритетами каналов и сбросом нагрузки.
+
+:class:`SchedulingQueue` заменяет FIFO-очередь :class:`MicroBatcher`: запросы
+каналов с приоритетом ``high`` (въезды, шлагбаумы) выдаются раньше остальных и
+не сбрасываются по бюджету задержки, внутри приоритета каналы делят модель пропорционально
+``weight`` (взвешенная справедливая очередь по виртуальному времени окончания).
+Очередь ограничена ``max_queue``: при переполнении сбрасывается самый старый
+запрос канала, дальше всех превысившего свою долю (если в очереди только
+запросы ``high`` — самый старый из них), а обычный запрос,
+прождавший дольше ``latency_budget_ms``,
+сбрасывается при выдаче. Сброшенный запрос завершается исключением
+:class:`RequestShed`.
+
+Планировщик и его очереди общие для потоков одного процесса. В режиме
+``runtime.mode: "processes"`` у каждого процесса каналов свой планировщик, и
+приоритеты с весами делят модель только между каналами одного процесса.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+_PRIORITY_CLASS = {PRIORITY_HIGH: 0, PRIORITY_NORMAL: 1}
+
+STAGE_DETECTOR = "detector"
+STAGE_OCR = "ocr"
+
+STATS_LOG_INTERVAL_SECONDS = 60.0
+
+
+class RequestShed(Exception):
+    """Запрос снят планировщиком из-за перегрузки или истёкшего бюджета задержки."""
+
+
+@dataclass
+class InferenceSchedulerConfig:
+    """Параметры раздела ``inference.scheduler``."""
+
+    enabled: bool = True
+    latency_budget_ms: float = 250.0
+    max_queue: int = 32
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "InferenceSchedulerConfig":
+        scheduler_conf = config or {}
+        return cls(
+            enabled=bool(scheduler_conf.get("enabled", True)),
+            latency_budget_ms=max(0.0, float(scheduler_conf.get("latency_budget_ms", 250))),
+            max_queue=max(1, int(scheduler_conf.get("max_queue", 32))),
+        )
+
+
+@dataclass
+class ChannelShare:
+    """Доля канала в общей очереди и его счётчик сброшенных запросов."""
+
+    name: str
+    weight: float = 1.0
+    priority: str = PRIORITY_NORMAL
+    shed: int = 0
+
+    @classmethod
+    def from_channel(cls, name: str, weight: Any = 1.0, priority: Any = PRIORITY_NORMAL) -> "ChannelShare":
+        priority = str(priority or PRIORITY_NORMAL).strip().lower()
+        return cls(
+            name=name,
+            weight=max(0.01, float(weight if weight is not None else 1.0)),
+            priority=priority if priority in _PRIORITY_CLASS else PRIORITY_NORMAL,
+        )
+
+    @property
+    def high(self) -> bool:
+        return self.priority == PRIORITY_HIGH
+
+
+_DEFAULT_SHARE = ChannelShare("-")
+
+# Ключ ``get`` по умолчанию: подходит запрос любой группы.
+ANY_KEY = object()
+
+
+@dataclass
+class SchedulerStats:
+    """Счётчики очереди одной стадии инференса."""
+
+    submitted: int = 0
+    dispatched: int = 0
+    shed_overflow: int = 0
+    shed_stale: int = 0
+    depth: int = 0
+    max_depth: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    shed_by_channel: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def shed(self) -> int:
+        return self.shed_overflow + self.shed_stale
+
+    @property
+    def mean_wait_ms(self) -> float:
+        return self.wait_total / self.dispatched * 1000 if self.dispatched else 0.0
+
+
+class SchedulingQueue:
+    """Очередь с интерфейсом ``put``/``get`` как у :class:`queue.Queue`.
+
+    Элементы — запросы :class:`MicroBatcher` с полями ``share``, ``enqueued_at``,
+    ``future`` и ``key``. ``get(key=...)`` выдаёт лучший по приоритету запрос
+    указанной группы пакета, остальные остаются в очереди со своим местом.
+    """
+
+    keyed = True
+
+    def __init__(self, config: InferenceSchedulerConfig, name: str) -> None:
+        self.config = config
+        self.name = name
+        self.budget = config.latency_budget_ms / 1000.0
+        self.stats = SchedulerStats()
+        self._heap: List[Tuple[int, float, int, Any]] = []
+        self._counter = itertools.count()
+        # Виртуальное время своё у каждого приоритета: выдача запросов высокого
+        # приоритета не сдвигает очередь обычных каналов.
+        self._virtual_time = [0.0] * len(_PRIORITY_CLASS)
+        self._last_finish: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._last_log = time.monotonic()
+
+    def _log_stats(self) -> None:
+        stats = self.stats
+        logger.info(
+            "Очередь %s: глубина=%d (макс. %d), ожидание %.1f мс (макс. %.1f мс), "
+            "выдано=%d, сброшено=%d (переполнение=%d, бюджет=%d)",
+            self.name,
+            stats.depth,
+            stats.max_depth,
+            stats.mean_wait_ms,
+            stats.wait_max * 1000,
+            stats.dispatched,
+            stats.shed,
+            stats.shed_overflow,
+            stats.shed_stale,
+        )
+        if stats.shed_by_channel:
+            logger.info(
+                "Очередь %s: сброшено по каналам: %s",
+                self.name,
+                ", ".join(f"{name}={count}" for name, count in sorted(stats.shed_by_channel.items())),
+            )
+
+    def _shed(self, request, stale: bool) -> None:
+        share = request.share or _DEFAULT_SHARE
+        share.shed += 1
+        if stale:
+            self.stats.shed_stale += 1
+        else:
+            self.stats.shed_overflow += 1
+        self.stats.shed_by_channel[share.name] = self.stats.shed_by_channel.get(share.name, 0) + 1
+        request.future.set_exception(RequestShed(f"{self.name}: запрос канала {share.name} сброшен"))
+
+    def _evict_oldest_normal(self) -> bool:
+        """Сбрасывает самый старый запрос канала, дальше всех ушедшего вперёд по виртуальному времени.
+
+        Такой канал сильнее других превысил свою долю, поэтому теряет кадр первым;
+        сброшенный запрос не расходует его долю.
+        """
+
+        normal = [index for index, entry in enumerate(self._heap) if entry[0] != _PRIORITY_CLASS[PRIORITY_HIGH]]
+        if not normal:
+            return False
+        leader = max(normal, key=lambda i: self._heap[i][1])
+        share = self._heap[leader][3].share or _DEFAULT_SHARE
+        victims = [i for i in normal if (self._heap[i][3].share or _DEFAULT_SHARE).name == share.name]
+        index = min(victims, key=lambda i: self._heap[i][3].enqueued_at)
+        entry = self._heap.pop(index)
+        heapq.heapify(self._heap)
+        self._last_finish[share.name] = self._last_finish.get(share.name, 0.0) - 1.0 / share.weight
+        self._shed(entry[3], stale=False)
+        return True
+
+    def _evict_oldest_high(self) -> None:
+        """Сбрасывает самый старый запрос высокого приоритета: очередь занята только ими."""
+
+        index = min(range(len(self._heap)), key=lambda i: self._heap[i][3].enqueued_at)
+        entry = self._heap.pop(index)
+        heapq.heapify(self._heap)
+        share = entry[3].share or _DEFAULT_SHARE
+        self._last_finish[share.name] = self._last_finish.get(share.name, 0.0) - 1.0 / share.weight
+        self._shed(entry[3], stale=False)
+
+    def put(self, request) -> None:
+        """Ставит запрос в очередь; глубина очереди никогда не превышает ``max_queue``.
+
+        В полной очереди первым теряет кадр обычный канал, превысивший долю.
+        Если в очереди только запросы высокого приоритета, новый обычный запрос
+        сбрасывается, а новый высокий вытесняет самый старый высокий — кроме
+        случая, когда новый сам уже вышел за бюджет задержки.
+        """
+
+        share = request.share or _DEFAULT_SHARE
+        with self._condition:
+            self.stats.submitted += 1
+            if len(self._heap) >= self.config.max_queue and not self._evict_oldest_normal():
+                stale = bool(self.budget) and time.monotonic() - request.enqueued_at > self.budget
+                if not share.high or stale:
+                    self._shed(request, stale=False)
+                    return
+                self._evict_oldest_high()
+            priority = _PRIORITY_CLASS[share.priority]
+            start = max(self._virtual_time[priority], self._last_finish.get(share.name, 0.0))
+            finish = start + 1.0 / share.weight
+            self._last_finish[share.name] = finish
+            heapq.heappush(self._heap, (priority, finish, next(self._counter), request))
+            self.stats.depth = len(self._heap)
+            self.stats.max_depth = max(self.stats.max_depth, self.stats.depth)
+            self._condition.notify()
+
+    def _best_index(self, key) -> Optional[int]:
+        if key is ANY_KEY:
+            return 0 if self._heap else None
+        matching = [index for index, entry in enumerate(self._heap) if entry[3].key == key]
+        if not matching:
+            return None
+        return min(matching, key=lambda index: self._heap[index][:3])
+
+    def _pop(self, index: int):
+        if index == 0:
+            return heapq.heappop(self._heap)
+        entry = self._heap.pop(index)
+        heapq.heapify(self._heap)
+        return entry
+
+    def get(self, timeout: Optional[float] = None, key=ANY_KEY):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                index = self._best_index(key)
+                while index is None:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise queue.Empty
+                    self._condition.wait(remaining)
+                    index = self._best_index(key)
+                priority, finish, _, request = self._pop(index)
+                self.stats.depth = len(self._heap)
+                start = finish - 1.0 / (request.share or _DEFAULT_SHARE).weight
+                self._virtual_time[priority] = max(self._virtual_time[priority], start)
+                waited = time.monotonic() - request.enqueued_at
+                if self.budget and waited > self.budget and priority != _PRIORITY_CLASS[PRIORITY_HIGH]:
+                    self._shed(request, stale=True)
+                    continue
+                self.stats.dispatched += 1
+                self.stats.wait_total += waited
+                self.stats.wait_max = max(self.stats.wait_max, waited)
+                now = time.monotonic()
+                if now - self._last_log >= STATS_LOG_INTERVAL_SECONDS:
+                    self._last_log = now
+                    self._log_stats()
+                return request
+
+    def drain(self) -> List[Any]:
+        """Забирает все запросы без выдачи и сброса (остановка пакетного сборщика)."""
+
+        with self._condition:
+            requests = [entry[3] for entry in self._heap]
+            self._heap.clear()
+            self.stats.depth = 0
+            return requests
+
+
+class InferenceScheduler:
+    """Очереди стадий ``detector`` и ``ocr`` с общими настройками.
+
+    Очередь своя для каждой пары стадии и бэкенда: её читает ровно один поток
+    пакетного инференса.
+    """
+
+    def __init__(self, config: InferenceSchedulerConfig) -> None:
+        self.config = config
+        self.queues: Dict[str, SchedulingQueue] = {}
+        self._lock = threading.Lock()
+        logger.info(
+            "Планировщик инференса включён (бюджет=%.0f мс, очередь=%d)",
+            config.latency_budget_ms,
+            config.max_queue,
+        )
+
+    def queue(self, stage: str, backend: str) -> SchedulingQueue:
+        name = f"{stage}/{backend}"
+        with self._lock:
+            if name not in self.queues:
+                self.queues[name] = SchedulingQueue(self.config, name)
+            return self.queues[name]
+
+    def snapshot(self) -> Dict[str, float]:
+        """Суммарная глубина очередей, наибольшее среднее ожидание и число сброшенных запросов."""
+
+        queues = list(self.queues.values())
+        return {
+            "queue_depth": sum(stage_queue.stats.depth for stage_queue in queues),
+            "queue_wait_ms": max((stage_queue.stats.mean_wait_ms for stage_queue in queues), default=0.0),
+            "shed": sum(stage_queue.stats.shed for stage_queue in queues),
+        }
@@ -5,38 +5,73 @@ from __future__ import annotations
 
 import time
 from collections import Counter
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import cv2
 import numpy as np
 
 from anpr.config import ModelConfig
+from anpr.pipeline.crop_quality import CropQualityConfig, CropSelector
+from anpr.pipeline.ocr_scheduler import OCRBudgetConfig, OCRScheduler
 from anpr.recognition.crnn_recognizer import CRNNRecognizer
+from anpr.recognition.ocr_batcher import BatchedRecognizer, ChannelRecognizer
+from anpr.recognition.preprocessing import OCRPreprocessor
 
 
 class TrackAggregator:
-    """Агрегирует результаты распознавания в рамках одного трека."""
+    """Агрегирует результаты распознавания в рамках одного трека.
 
-    def __init__(self, best_shots: int):
+    Номер выдаётся по кворуму из ``best_shots`` чтений либо раньше, если
+    последние ``early_consensus`` чтений совпали. Трек, выданный по раннему
+    консенсусу, второй раз не выдаётся, даже если кворум сойдётся на другом тексте.
+    Чтение хранится вместе с номером кропа из ``CropSelector``, чтобы чтение
+    кропа, вытесненного из лучших, можно было снять с голосования.
+    """
+
+    def __init__(self, best_shots: int, early_consensus: int = 0):
         self.best_shots = max(1, best_shots)
-        self.track_texts: Dict[int, List[str]] = {}
+        self.early_consensus = min(max(0, early_consensus), self.best_shots)
+        self.track_texts: Dict[int, List[Tuple[Optional[int], str]]] = {}
         self.last_emitted: Dict[int, str] = {}
+        self.last_emit_early = False
+        self._emitted_early: Set[int] = set()
+
+    def forget(self, track_id: int) -> None:
+        self.track_texts.pop(track_id, None)
+        self.last_emitted.pop(track_id, None)
+        self._emitted_early.discard(track_id)
+
+    def discard(self, track_id: int, entry_id: int) -> None:
+        bucket = self.track_texts.get(track_id)
+        if bucket:
+            bucket[:] = [item for item in bucket if item[0] != entry_id]
 
-    def add_result(self, track_id: int, text: str) -> str:
+    def add_result(self, track_id: int, text: str, entry_id: Optional[int] = None) -> str:
         if not text:
             return ""
 
-        bucket = self.track_texts.setdefault(track_id, [])
-        bucket.append(text)
-        if len(bucket) > self.best_shots:
-            bucket.pop(0)
+        if track_id in self._emitted_early:
+            return ""
+
+        entries = self.track_texts.setdefault(track_id, [])
+        entries.append((entry_id, text))
+        if len(entries) > self.best_shots:
+            entries.pop(0)
 
+        bucket = [item_text for _, item_text in entries]
         counts = Counter(bucket)
         consensus, freq = counts.most_common(1)[0]
         quorum = max(1, (self.best_shots + 1) // 2)
         has_quorum = len(bucket) >= self.best_shots and freq >= quorum
-        if has_quorum and self.last_emitted.get(track_id) != consensus:
+        k = self.early_consensus
+        early = not has_quorum and k > 0 and len(bucket) >= k and len(set(bucket[-k:])) == 1
+        if early:
+            consensus = bucket[-1]
+        if (has_quorum or early) and self.last_emitted.get(track_id) != consensus:
             self.last_emitted[track_id] = consensus
+            self.last_emit_early = early
+            if early:
+                self._emitted_early.add(track_id)
             return consensus
         return ""
 
@@ -46,13 +81,18 @@ class ANPRPipeline:
 
     def __init__(
         self,
-        recognizer: CRNNRecognizer,
+        recognizer: Union[CRNNRecognizer, BatchedRecognizer, ChannelRecognizer],
         best_shots: int,
         cooldown_seconds: int = 0,
         min_confidence: float = ModelConfig.OCR_CONFIDENCE_THRESHOLD,
+        ocr_budget: Optional[OCRBudgetConfig] = None,
+        crop_quality: Optional[CropQualityConfig] = None,
     ) -> None:
         self.recognizer = recognizer
-        self.aggregator = TrackAggregator(best_shots)
+        self.ocr_scheduler = OCRScheduler(ocr_budget)
+        self.crop_selector = CropSelector(crop_quality, min_top_n=best_shots)
+        early_consensus = self.ocr_scheduler.config.early_consensus if self.ocr_scheduler.config.enabled else 0
+        self.aggregator = TrackAggregator(best_shots, early_consensus)
         self.cooldown_seconds = max(0, cooldown_seconds)
         self.min_confidence = max(0.0, min(1.0, min_confidence))
         self._last_seen: Dict[str, float] = {}
@@ -94,49 +134,115 @@ class ANPRPipeline:
         return cv2.warpPerspective(image, M, (maxWidth, maxHeight))
 
     def _preprocess_plate(self, plate_image: np.ndarray) -> np.ndarray:
-        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        """Выравнивает кроп по контуру номера и возвращает его в оттенках серого.
+
+        Серое изображение сразу идёт на вход OCR, поэтому яркость считается так же,
+        как в препроцессоре распознавателя, и повторно не вычисляется.
+        """
+
+        gray = OCRPreprocessor.to_gray(plate_image)
         blurred = cv2.GaussianBlur(gray, (5, 5), 0)
         _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         if not contours:
-            return plate_image
+            return gray
         contours = sorted(contours, key=cv2.contourArea, reverse=True)
         for contour in contours:
             peri = cv2.arcLength(contour, True)
             approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
             if len(approx) == 4:
-                return self._four_point_transform(plate_image, approx.reshape(4, 2))
-        return plate_image
+                return self._four_point_transform(gray, approx.reshape(4, 2))
+        return gray
+
+    def _apply_reading(
+        self, detection: Dict[str, Any], current_text: str, confidence: float, entry_id: Optional[int] = None
+    ) -> None:
+        if confidence < self.min_confidence:
+            detection["text"] = "Нечитаемо"
+            detection["unreadable"] = True
+            detection["confidence"] = confidence
+            return
+
+        if "track_id" in detection:
+            track_id = detection["track_id"]
+            detection["text"] = self.aggregator.add_result(track_id, current_text, entry_id)
+            settled = self.aggregator.last_emitted.get(track_id)
+            if settled:
+                early = bool(detection["text"]) and self.aggregator.last_emit_early
+                self.ocr_scheduler.settle(track_id, settled, detection["bbox"], early=early)
+        else:
+            detection["text"] = current_text
 
-    def process_frame(self, frame: np.ndarray, detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        detection["confidence"] = confidence
+
+        if self.cooldown_seconds > 0 and detection.get("text"):
+            if self._on_cooldown(detection["text"]):
+                detection["text"] = ""
+            else:
+                self._touch_plate(detection["text"])
+
+    @property
+    def ocr_stats(self):
+        return self.ocr_scheduler.stats
+
+    @property
+    def crop_stats(self):
+        return self.crop_selector.stats
+
+    def process_frame(
+        self, frame: np.ndarray, detections: List[Dict[str, Any]], frame_index: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """OCR детекций кадра.
+
+        ``frame_index`` — номер кадра в потоке канала: канал вызывает пайплайн только
+        для кадров с детекциями, и срок жизни треков считается по всем кадрам.
+        """
+
+        for track_id in self.ocr_scheduler.next_frame(frame_index):
+            self.aggregator.forget(track_id)
+            self.crop_selector.forget(track_id)
+
+        pending: List[Tuple[Dict[str, Any], np.ndarray, Optional[int]]] = []
+        evicted: Set[int] = set()
         for detection in detections:
+            track_id = detection.get("track_id")
+            # Распознанные треки перепроверяются редко, остальные кадры обходятся без CRNN.
+            if not self.ocr_scheduler.should_run(track_id, detection["bbox"]):
+                continue
             x1, y1, x2, y2 = detection["bbox"]
             roi = frame[y1:y2, x1:x2]
 
             if roi.size > 0:
-                processed_plate = self._preprocess_plate(roi)
+                gray = OCRPreprocessor.to_gray(roi)
+                # Перепроверка распознанного трека проходит только жёсткие пороги качества,
+                # без конкуренции с лучшими кропами трека.
+                selector_key = None if self.ocr_scheduler.is_settled(track_id) else track_id
+                if not self.crop_selector.admit(selector_key, gray, detection.get("confidence", 0.0)):
+                    continue
+                evicted_entry = self.crop_selector.last_evicted
+                if evicted_entry is not None:
+                    # Вытесненный из лучших кроп больше не голосует за номер трека.
+                    evicted.add(evicted_entry)
+                    self.aggregator.discard(track_id, evicted_entry)
+                processed_plate = self._preprocess_plate(gray)
 
                 if processed_plate.size > 0:
-                    current_text, confidence = self.recognizer.recognize(processed_plate)
-
-                    if confidence < self.min_confidence:
-                        detection["text"] = "Нечитаемо"
-                        detection["unreadable"] = True
-                        detection["confidence"] = confidence
-                        continue
-
-                    if "track_id" in detection:
-                        detection["text"] = self.aggregator.add_result(detection["track_id"], current_text)
-                    else:
-                        detection["text"] = current_text
-
-                    detection["confidence"] = confidence
-
-                    if self.cooldown_seconds > 0 and detection.get("text"):
-                        if self._on_cooldown(detection["text"]):
-                            detection["text"] = ""
-                        else:
-                            self._touch_plate(detection["text"])
+                    pending.append((detection, processed_plate, self.crop_selector.last_entry))
+
+        if not pending:
+            return detections
+
+        # Все кропы кадра распознаются одним пакетом.
+        self.ocr_scheduler.stats.ocr_calls += len(pending)
+        readings = self.recognizer.recognize_batch([plate for _, plate, _ in pending])
+        for (detection, _, entry_id), reading in zip(pending, readings):
+            if reading is None:
+                # Кроп сброшен планировщиком инференса при перегрузке.
+                continue
+            if entry_id in evicted:
+                # Кроп вытеснен более качественным кропом того же трека в этом же кадре.
+                continue
+            self._apply_reading(detection, *reading, entry_id=entry_id)
         return detections
 
 
@@ -0,0 +1,160 @@
+# /anpr/pipeline/crop_quality.py
+"""Оценка качества кропов номера перед OCR."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CropQualityConfig:
+    """Пороги и веса оценки кропа.
+
+    Кроп отбрасывается без OCR, если он меньше ``min_width``×``min_height``,
+    размыт (дисперсия Лапласиана ниже ``min_sharpness``), неконтрастен или его
+    пропорции выходят за ``min_aspect``..``max_aspect``. Прошедшие кропы получают
+    оценку 0..1; у трека хранится ``top_n`` лучших, и OCR запускается только
+    для кропа, попавшего в этот список. Оценка сравнивает высоту, резкость и
+    контраст с ``height_ref``, ``sharpness_ref`` и ``contrast_ref``, пропорции —
+    с ``target_aspect``. По умолчанию отбор выключен: пороги отсекают мелкие и
+    узкие номера, которые раньше распознавались.
+    """
+
+    enabled: bool = False
+    top_n: int = 5
+    min_width: int = 40
+    min_height: int = 10
+    min_sharpness: float = 15.0
+    min_contrast: float = 12.0
+    min_aspect: float = 1.5
+    max_aspect: float = 8.0
+    target_aspect: float = 4.6
+    sharpness_ref: float = 150.0
+    contrast_ref: float = 60.0
+    height_ref: int = 32
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "CropQualityConfig":
+        quality_conf = config or {}
+        return cls(
+            enabled=bool(quality_conf.get("enabled", False)),
+            top_n=max(1, int(quality_conf.get("top_n", 5))),
+            min_width=max(1, int(quality_conf.get("min_width", 40))),
+            min_height=max(1, int(quality_conf.get("min_height", 10))),
+            min_sharpness=max(0.0, float(quality_conf.get("min_sharpness", 15.0))),
+            min_contrast=max(0.0, float(quality_conf.get("min_contrast", 12.0))),
+            min_aspect=max(0.1, float(quality_conf.get("min_aspect", 1.5))),
+            max_aspect=max(0.1, float(quality_conf.get("max_aspect", 8.0))),
+            target_aspect=max(0.1, float(quality_conf.get("target_aspect", 4.6))),
+            sharpness_ref=max(1.0, float(quality_conf.get("sharpness_ref", 150.0))),
+            contrast_ref=max(1.0, float(quality_conf.get("contrast_ref", 60.0))),
+            height_ref=max(1, int(quality_conf.get("height_ref", 32))),
+        )
+
+
+@dataclass
+class CropQualityStats:
+    """Счётчики отбора кропов канала."""
+
+    processed: int = 0
+    rejected: int = 0
+    not_best: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.rejected + self.not_best
+
+
+# Веса компонентов оценки: размер, резкость, контраст, пропорции, уверенность детектора.
+_WEIGHTS = (0.2, 0.3, 0.15, 0.15, 0.2)
+
+
+def score_crop(gray: np.ndarray, confidence: float, config: CropQualityConfig) -> Optional[float]:
+    """Оценивает серый кроп номера; ``None`` означает, что кроп не годится для OCR."""
+
+    height, width = gray.shape[:2]
+    if width < config.min_width or height < config.min_height:
+        return None
+    aspect = width / height
+    if not config.min_aspect <= aspect <= config.max_aspect:
+        return None
+
+    contrast = float(gray.std())
+    if contrast < config.min_contrast:
+        return None
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    if sharpness < config.min_sharpness:
+        return None
+
+    components = (
+        min(1.0, height / config.height_ref),
+        min(1.0, sharpness / config.sharpness_ref),
+        min(1.0, contrast / config.contrast_ref),
+        math.exp(-abs(math.log(aspect / config.target_aspect))),
+        min(1.0, max(0.0, confidence)),
+    )
+    return float(sum(weight * value for weight, value in zip(_WEIGHTS, components)))
+
+
+class CropSelector:
+    """Хранит для каждого трека кучу из ``top_n`` лучших оценок и решает, нужен ли OCR.
+
+    ``min_top_n`` — сколько кропов трека пропускается на OCR не меньше, чем
+    нужно агрегатору для кворума (``best_shots``); иначе трек с одинаковыми по
+    качеству кропами никогда не наберёт кворум.
+
+    После ``admit`` в ``last_entry`` лежит номер принятого кропа трека, а в
+    ``last_evicted`` — номер кропа, вытесненного им из списка лучших: чтение
+    вытесненного кропа больше не должно голосовать в агрегаторе.
+    """
+
+    def __init__(self, config: Optional[CropQualityConfig] = None, min_top_n: int = 1) -> None:
+        self.config = config or CropQualityConfig()
+        self.top_n = max(self.config.top_n, min_top_n)
+        self.stats = CropQualityStats()
+        self._heaps: Dict[int, List[Tuple[float, int]]] = {}
+        self._counter = itertools.count()
+        self.last_entry: Optional[int] = None
+        self.last_evicted: Optional[int] = None
+
+    def forget(self, track_id: int) -> None:
+        self._heaps.pop(track_id, None)
+
+    def admit(self, track_id: Optional[int], gray: np.ndarray, confidence: float) -> bool:
+        self.last_entry = self.last_evicted = None
+        if not self.config.enabled:
+            self.stats.processed += 1
+            return True
+
+        score = score_crop(gray, confidence, self.config)
+        if score is None:
+            self.stats.rejected += 1
+            logger.debug("Кроп трека %s %dx%d отброшен по порогам качества", track_id, gray.shape[1], gray.shape[0])
+            return False
+        if track_id is None:
+            self.stats.processed += 1
+            return True
+
+        heap = self._heaps.setdefault(track_id, [])
+        entry = (score, next(self._counter))
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, entry)
+        elif score > heap[0][0]:
+            self.last_evicted = heapq.heapreplace(heap, entry)[1]
+        else:
+            self.stats.not_best += 1
+            return False
+        self.last_entry = entry[1]
+        self.stats.processed += 1
+        return True
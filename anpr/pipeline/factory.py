@@ -2,48 +2,205 @@
 # /anpr/pipeline/factory.py
 from __future__ import annotations
 
-from typing import Tuple
+import os
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
 import threading
 
 from anpr.config import ModelConfig
-from anpr.detection.yolo_detector import YOLODetector
+from anpr.detection.detector_service import ChannelDetector, DetectorService, DetectorServiceConfig
+from anpr.detection.tracking import TRACKER_NATIVE
+from anpr.detection.yolo_detector import RESIZE_LETTERBOX, YOLODetector
+from anpr.inference.backends import BACKEND_TORCH, backend_available, normalize_backend
+from anpr.inference.resources import ROLE_DETECTOR, ROLE_OCR, enter_role, role_threads
+from anpr.inference.scheduler import (
+    PRIORITY_NORMAL,
+    STAGE_DETECTOR,
+    STAGE_OCR,
+    ChannelShare,
+    InferenceScheduler,
+    InferenceSchedulerConfig,
+)
 from anpr.pipeline.anpr_pipeline import ANPRPipeline
+from anpr.pipeline.crop_quality import CropQualityConfig
+from anpr.pipeline.ocr_scheduler import OCRBudgetConfig
 from anpr.recognition.crnn_recognizer import CRNNRecognizer
+from anpr.recognition.ocr_batcher import BatchedRecognizer, ChannelRecognizer, OCRBatchConfig
+from logging_manager import get_logger
 
+logger = get_logger(__name__)
 
 _RECOGNIZER_LOCK = threading.Lock()
-_RECOGNIZER_SINGLETON: CRNNRecognizer | None = None
+_RECOGNIZERS: Dict[str, CRNNRecognizer] = {}
+_BATCHED_RECOGNIZERS: Dict[str, BatchedRecognizer] = {}
 
+_DETECTOR_LOCK = threading.Lock()
+_DETECTOR_SERVICES: Dict[str, DetectorService] = {}
 
-def _get_shared_recognizer() -> CRNNRecognizer:
-    """Lazily initializes a single OCR recognizer instance for all pipelines.
+_SCHEDULER_LOCK = threading.Lock()
+_SCHEDULER: Optional[InferenceScheduler] = None
 
-    CRNN quantization with ``prepare_fx`` is not thread-safe, so creating the
-    recognizer concurrently for multiple channels can crash. By guarding
-    initialization with a lock and reusing the instance across pipelines, we
-    avoid the race while keeping inference stateless and reusable.
+
+def get_inference_scheduler(config: Optional[InferenceSchedulerConfig] = None) -> Optional[InferenceScheduler]:
+    """Returns the process-wide inference scheduler, creating it from ``config`` on first use.
+
+    ``None`` means the scheduler is disabled and the shared queues stay FIFO.
+    Channel priorities and weights only arbitrate between channels of the same
+    process: in ``runtime.mode: "processes"`` every channel process has its own
+    scheduler.
+    """
+
+    global _SCHEDULER
+    if _SCHEDULER is None and config is not None and config.enabled:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = InferenceScheduler(config)
+    return _SCHEDULER
+
+
+def _scheduler_queue(stage: str, backend: str):
+    scheduler = get_inference_scheduler()
+    return scheduler.queue(stage, backend) if scheduler is not None else None
+
+
+def _resolve_backend(requested: Optional[str], model_path_for) -> str:
+    """Returns the requested backend, or ``torch`` when its runtime or exported model is missing."""
+
+    try:
+        backend = normalize_backend(requested)
+    except ValueError:
+        logger.warning("Неизвестный бэкенд инференса %r, используем torch", requested)
+        return BACKEND_TORCH
+    if backend == BACKEND_TORCH:
+        return backend
+    if not backend_available(backend):
+        logger.warning("Среда выполнения %s не установлена, используем torch", backend)
+        return BACKEND_TORCH
+    model_path = model_path_for(backend)
+    if not os.path.exists(model_path):
+        logger.warning("Нет экспортированной модели %s для бэкенда %s, используем torch", model_path, backend)
+        return BACKEND_TORCH
+    return backend
+
+
+def _get_shared_recognizer(backend: str = BACKEND_TORCH) -> CRNNRecognizer:
+    """Lazily initializes a single OCR recognizer instance per backend for all pipelines.
+
+    The int8 model is normally loaded from the compiled TorchScript cache. On a
+    cache miss CRNN quantization falls back to ``prepare_fx``, which is not
+    thread-safe, so creating the recognizer concurrently for multiple channels
+    can crash. By guarding initialization with a lock and reusing the instance
+    across pipelines, we avoid the race while keeping inference stateless and
+    reusable.
     """
 
-    global _RECOGNIZER_SINGLETON
+    recognizer = _RECOGNIZERS.get(backend)
+    if recognizer is None:
+        with _RECOGNIZER_LOCK:
+            recognizer = _RECOGNIZERS.get(backend)
+            if recognizer is None:
+                recognizer = CRNNRecognizer(
+                    ModelConfig.ocr_model_path(backend),
+                    ModelConfig.DEVICE,
+                    backend=backend,
+                    num_threads=role_threads(ROLE_OCR),
+                )
+                _RECOGNIZERS[backend] = recognizer
+    return recognizer
+
+
+def _get_batched_recognizer(config: OCRBatchConfig, backend: str = BACKEND_TORCH) -> BatchedRecognizer:
+    """Returns the OCR queue that coalesces crops from all channels into batches."""
 
-    if _RECOGNIZER_SINGLETON is None:
+    recognizer = _get_shared_recognizer(backend)
+    batched = _BATCHED_RECOGNIZERS.get(backend)
+    if batched is None:
         with _RECOGNIZER_LOCK:
-            if _RECOGNIZER_SINGLETON is None:
-                _RECOGNIZER_SINGLETON = CRNNRecognizer(
-                    ModelConfig.OCR_MODEL_PATH, ModelConfig.DEVICE
+            batched = _BATCHED_RECOGNIZERS.get(backend)
+            if batched is None:
+                batched = BatchedRecognizer(
+                    recognizer, config, _scheduler_queue(STAGE_OCR, backend), partial(enter_role, ROLE_OCR)
+                )
+                _BATCHED_RECOGNIZERS[backend] = batched
+    return batched
+
+
+def _get_shared_detector_service(config: DetectorServiceConfig, backend: str = BACKEND_TORCH) -> DetectorService:
+    """Lazily creates the YOLO service shared by every channel using ``backend``.
+
+    One set of weights serves all cameras: channel requests are collected into
+    batches by the service thread, while tracker state stays in each channel's
+    :class:`ChannelDetector`.
+    """
+
+    service = _DETECTOR_SERVICES.get(backend)
+    if service is None:
+        with _DETECTOR_LOCK:
+            service = _DETECTOR_SERVICES.get(backend)
+            if service is None:
+                detector = YOLODetector(ModelConfig.yolo_model_path(backend), ModelConfig.DEVICE)
+                service = DetectorService(
+                    detector, config, _scheduler_queue(STAGE_DETECTOR, backend), partial(enter_role, ROLE_DETECTOR)
                 )
-    return _RECOGNIZER_SINGLETON
+                _DETECTOR_SERVICES[backend] = service
+    return service
+
 
+def build_components(
+    best_shots: int,
+    cooldown_seconds: int,
+    min_confidence: float,
+    inference_conf: Optional[Dict[str, Any]] = None,
+    detector_backend: Optional[str] = None,
+    ocr_backend: Optional[str] = None,
+    tracker: str = TRACKER_NATIVE,
+    detector_input_size: int = 0,
+    detector_resize: str = RESIZE_LETTERBOX,
+    ocr_budget: Optional[OCRBudgetConfig] = None,
+    crop_quality: Optional[CropQualityConfig] = None,
+    channel_name: str = "",
+    inference_weight: float = 1.0,
+    inference_priority: str = PRIORITY_NORMAL,
+) -> Tuple[ANPRPipeline, ChannelDetector]:
+    """Создаёт компоненты канала: клиент общего детектора, общую очередь OCR и собственную агрегацию.
 
-def build_components(best_shots: int, cooldown_seconds: int, min_confidence: float) -> Tuple[ANPRPipeline, YOLODetector]:
-    """Создаёт независимые компоненты пайплайна (детектор, OCR и агрегация)."""
+    Бэкенды канала (``detector_backend``/``ocr_backend``) переопределяют глобальные
+    ``inference.backend`` из настроек. ``tracker`` выбирает трекер канала
+    (``native`` или ``bytetrack``). При ``detector_input_size`` ROI уменьшается до
+    этого размера (``letterbox``/``stretch``) перед детектором, а кропы для OCR
+    по-прежнему берутся из полного кадра. ``ocr_budget`` задаёт политику OCR для треков,
+    ``crop_quality`` — отбор кропов перед распознаванием. ``inference_weight`` и
+    ``inference_priority`` определяют долю канала в общем планировщике инференса.
+    """
 
-    detector = YOLODetector(ModelConfig.YOLO_MODEL_PATH, ModelConfig.DEVICE)
-    recognizer = _get_shared_recognizer()
+    inference_conf = inference_conf or {}
+    scheduler = get_inference_scheduler(InferenceSchedulerConfig.from_dict(inference_conf.get("scheduler")))
+    share = ChannelShare.from_channel(channel_name, inference_weight, inference_priority)
+    backend_conf = inference_conf.get("backend") or {}
+    detector_backend = _resolve_backend(
+        detector_backend or backend_conf.get("detector"), ModelConfig.yolo_model_path
+    )
+    ocr_backend = _resolve_backend(ocr_backend or backend_conf.get("ocr"), ModelConfig.ocr_model_path)
+
+    service = _get_shared_detector_service(
+        DetectorServiceConfig.from_dict(inference_conf.get("detector")), detector_backend
+    )
+    detector = ChannelDetector(
+        service,
+        tracker=tracker,
+        input_size=detector_input_size,
+        resize_mode=detector_resize,
+        share=share if scheduler is not None else None,
+    )
+    recognizer = _get_batched_recognizer(OCRBatchConfig.from_dict(inference_conf.get("ocr")), ocr_backend)
+    if scheduler is not None:
+        recognizer = ChannelRecognizer(recognizer, share)
     pipeline = ANPRPipeline(
         recognizer,
         best_shots,
         cooldown_seconds,
         min_confidence=min_confidence,
+        ocr_budget=ocr_budget,
+        crop_quality=crop_quality,
     )
     return pipeline, detector
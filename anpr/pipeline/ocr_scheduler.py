@@ -0,0 +1,129 @@
+# /anpr/pipeline/ocr_scheduler.py
+"""Бюджет OCR на трек: ранний консенсус и пропуск уже распознанных треков."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from anpr.detection.tracking import iou_matrix
+
+
+@dataclass
+class OCRBudgetConfig:
+    """Политика запуска OCR для треков канала.
+
+    ``early_consensus`` — сколько подряд совпавших уверенных чтений достаточно
+    для выдачи номера до набора ``best_shots`` (0 — отключено). После выдачи
+    трек считается распознанным: OCR повторяется раз в ``recheck_interval_frames``
+    кадров или когда IoU бокса с последним распознанным падает ниже ``recheck_iou``.
+    """
+
+    enabled: bool = True
+    early_consensus: int = 3
+    recheck_interval_frames: int = 25
+    recheck_iou: float = 0.5
+    track_ttl_frames: int = 300
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "OCRBudgetConfig":
+        budget_conf = config or {}
+        return cls(
+            enabled=bool(budget_conf.get("enabled", True)),
+            early_consensus=max(0, int(budget_conf.get("early_consensus", 3))),
+            recheck_interval_frames=max(0, int(budget_conf.get("recheck_interval_frames", 25))),
+            recheck_iou=min(1.0, max(0.0, float(budget_conf.get("recheck_iou", 0.5)))),
+            track_ttl_frames=max(1, int(budget_conf.get("track_ttl_frames", 300))),
+        )
+
+
+@dataclass
+class OCRBudgetStats:
+    """Счётчики вызовов OCR канала; ``ocr_calls`` учитывает фактически распознанные кропы."""
+
+    ocr_calls: int = 0
+    ocr_skipped: int = 0
+    early_emits: int = 0
+    rechecks: int = 0
+
+    @property
+    def saved_ratio(self) -> float:
+        total = self.ocr_calls + self.ocr_skipped
+        return self.ocr_skipped / total if total else 0.0
+
+
+@dataclass
+class _TrackBudget:
+    last_seen: int
+    settled_text: str = ""
+    settled_bbox: Optional[np.ndarray] = None
+    frames_since_ocr: int = 0
+
+
+class OCRScheduler:
+    """Решает, нужен ли OCR для детекции трека на текущем кадре."""
+
+    def __init__(self, config: Optional[OCRBudgetConfig] = None) -> None:
+        self.config = config or OCRBudgetConfig()
+        self.stats = OCRBudgetStats()
+        self._tracks: Dict[int, _TrackBudget] = {}
+        self._frame_index = 0
+
+    def next_frame(self, frame_index: Optional[int] = None) -> List[int]:
+        """Сдвигает счётчик кадров и возвращает треки, не появлявшиеся дольше ``track_ttl_frames``.
+
+        ``frame_index`` — номер кадра в потоке, если кадры без детекций сюда не
+        попадают; без него счётчик сдвигается на один кадр.
+        """
+
+        self._frame_index = self._frame_index + 1 if frame_index is None else max(self._frame_index, frame_index)
+        expired = [
+            track_id
+            for track_id, budget in self._tracks.items()
+            if self._frame_index - budget.last_seen > self.config.track_ttl_frames
+        ]
+        for track_id in expired:
+            del self._tracks[track_id]
+        return expired
+
+    def should_run(self, track_id: Optional[int], bbox: Sequence[int]) -> bool:
+        if track_id is None or not self.config.enabled:
+            return True
+
+        budget = self._tracks.setdefault(track_id, _TrackBudget(last_seen=self._frame_index))
+        budget.last_seen = self._frame_index
+        budget.frames_since_ocr += 1
+        if not budget.settled_text:
+            budget.frames_since_ocr = 0
+            return True
+
+        box = np.asarray(bbox, dtype=np.float64).reshape(1, 4)
+        moved = iou_matrix(budget.settled_bbox, box)[0, 0] < self.config.recheck_iou
+        interval = self.config.recheck_interval_frames
+        due = interval > 0 and budget.frames_since_ocr >= interval
+        if moved or due:
+            self.stats.rechecks += 1
+            budget.frames_since_ocr = 0
+            budget.settled_bbox = box
+            return True
+
+        self.stats.ocr_skipped += 1
+        return False
+
+    def is_settled(self, track_id: Optional[int]) -> bool:
+        budget = self._tracks.get(track_id) if track_id is not None else None
+        return bool(budget and budget.settled_text)
+
+    def settle(self, track_id: Optional[int], text: str, bbox: Sequence[int], early: bool = False) -> None:
+        """Помечает трек распознанным: дальнейший OCR идёт только в режиме перепроверки."""
+
+        if track_id is None or not text:
+            return
+        budget = self._tracks.setdefault(track_id, _TrackBudget(last_seen=self._frame_index))
+        if early and not budget.settled_text:
+            self.stats.early_emits += 1
+        budget.settled_text = text
+        budget.settled_bbox = np.asarray(bbox, dtype=np.float64).reshape(1, 4)
+        budget.frames_since_ocr = 0
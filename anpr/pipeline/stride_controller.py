@@ -0,0 +1,128 @@
+# /anpr/pipeline/stride_controller.py
+"""Автоподстройка шага детектора канала по нагрузке и активности треков.
+
+Пока на канале есть треки, детектор запускается с наименьшим допустимым шагом,
+без треков шаг постепенно растёт до ``max_stride``. Нижняя граница сама
+подстраивается по нагрузке. Если задержка инференса превышает
+``target_latency_ms`` или загрузка CPU выше ``cpu_high_percent``, граница
+поднимается. Когда запас по обоим показателям появляется, граница снова опускается.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import psutil
+
+# Сглаживание задержки детектора (экспоненциальное среднее).
+_LATENCY_SMOOTHING = 0.2
+
+
+@dataclass
+class StrideControlConfig:
+    """Границы и пороги автоподстройки ``detector_frame_stride``.
+
+    По умолчанию выключена: включённая автоподстройка заменяет заданный
+    каналу ``detector_frame_stride`` диапазоном ``min_stride``..``max_stride``.
+    """
+
+    enabled: bool = False
+    min_stride: int = 1
+    max_stride: int = 6
+    target_latency_ms: float = 120.0
+    cpu_high_percent: float = 85.0
+    cpu_low_percent: float = 60.0
+    adjust_interval_seconds: float = 2.0
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "StrideControlConfig":
+        stride_conf = config or {}
+        min_stride = max(1, int(stride_conf.get("min_stride", 1)))
+        cpu_high = min(100.0, max(1.0, float(stride_conf.get("cpu_high_percent", 85.0))))
+        return cls(
+            enabled=bool(stride_conf.get("enabled", False)),
+            min_stride=min_stride,
+            max_stride=max(min_stride, int(stride_conf.get("max_stride", 6))),
+            target_latency_ms=max(1.0, float(stride_conf.get("target_latency_ms", 120.0))),
+            cpu_high_percent=cpu_high,
+            cpu_low_percent=min(cpu_high, max(0.0, float(stride_conf.get("cpu_low_percent", 60.0)))),
+            adjust_interval_seconds=max(0.1, float(stride_conf.get("adjust_interval_seconds", 2.0))),
+        )
+
+
+class CpuLoadSampler:
+    """Загрузка CPU системы между соседними вызовами :meth:`sample`.
+
+    Считается по приращениям ``psutil.cpu_times()``, а не через
+    ``psutil.cpu_percent(interval=None)``. Так замеры каналов и строки состояния
+    не сбрасывают общую точку отсчёта друг друга.
+    """
+
+    def __init__(self) -> None:
+        self._last = psutil.cpu_times()
+
+    def sample(self) -> float:
+        times = psutil.cpu_times()
+        last, self._last = self._last, times
+        total = sum(times) - sum(last)
+        idle = (times.idle + getattr(times, "iowait", 0.0)) - (last.idle + getattr(last, "iowait", 0.0))
+        if total <= 0:
+            return 0.0
+        return max(0.0, min(100.0, 100.0 * (1.0 - idle / total)))
+
+
+class StrideController:
+    """Выбирает эффективный шаг детектора канала.
+
+    Рабочий цикл сообщает длительность каждого вызова детектора через
+    :meth:`observe_latency` и вызывает :meth:`update` на каждом кадре с признаком
+    активных треков. :meth:`update` возвращает новый шаг или ``None``, если шаг
+    не изменился.
+    """
+
+    def __init__(self, config: StrideControlConfig, base_stride: int) -> None:
+        self.config = config
+        self.stride = min(config.max_stride, max(config.min_stride, base_stride))
+        # Нижняя граница шага, поднятая нагрузкой.
+        self.floor = config.min_stride
+        self.latency_ms = 0.0
+        self.cpu_percent = 0.0
+        self.changes = 0
+        self._cpu = CpuLoadSampler()
+        self._last_adjust = 0.0
+
+    def observe_latency(self, seconds: float) -> None:
+        latency_ms = seconds * 1000.0
+        if not self.latency_ms:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += _LATENCY_SMOOTHING * (latency_ms - self.latency_ms)
+
+    def _adjust_floor(self) -> None:
+        config = self.config
+        overloaded = self.latency_ms > config.target_latency_ms or self.cpu_percent > config.cpu_high_percent
+        relaxed = self.latency_ms < config.target_latency_ms * 0.5 and self.cpu_percent < config.cpu_low_percent
+        if overloaded:
+            self.floor = min(config.max_stride, self.floor + 1)
+        elif relaxed:
+            self.floor = max(config.min_stride, self.floor - 1)
+
+    def update(self, now: float, tracks_active: bool) -> Optional[int]:
+        if tracks_active:
+            # Появившийся трек сразу получает самый частый детектор, который тянет система.
+            stride = self.floor
+        else:
+            stride = self.stride
+        if now - self._last_adjust >= self.config.adjust_interval_seconds:
+            self._last_adjust = now
+            self.cpu_percent = self._cpu.sample()
+            self._adjust_floor()
+            if not tracks_active:
+                stride = min(self.config.max_stride, stride + 1)
+            stride = max(self.floor, stride)
+        if stride == self.stride:
+            return None
+        self.stride = stride
+        self.changes += 1
+        return stride
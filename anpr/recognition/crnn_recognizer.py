@@ -3,78 +3,114 @@
 
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+import threading
+from typing import Dict, List, Sequence, Tuple
 
+import numpy as np
 import torch
 import torch.ao.quantization.quantize_fx as quantize_fx
 from torch.ao.quantization import QConfigMapping
-from torchvision import transforms
 
 from anpr.config import ModelConfig
+from anpr.inference.backends import BACKEND_TORCH, TorchRunner, create_runner
 from anpr.recognition.crnn import CRNN
+from anpr.recognition.model_cache import load_cached_model, save_cached_model
+from anpr.recognition.preprocessing import OCRPreprocessor
 from logging_manager import get_logger
 
 logger = get_logger(__name__)
 
 
-class CRNNRecognizer:
-    """Подготовка, загрузка и инференс CRNN."""
+def build_quantized_crnn(model_path: str, device: torch.device) -> torch.nn.Module:
+    """Собирает INT8-граф CRNN через ``prepare_fx``/``convert_fx`` и загружает веса."""
 
-    def __init__(self, model_path: str, device: torch.device) -> None:
-        self.device = device
-        self.transform = transforms.Compose(
-            [
-                transforms.ToPILImage(),
-                transforms.Grayscale(),
-                transforms.Resize((ModelConfig.OCR_IMG_HEIGHT, ModelConfig.OCR_IMG_WIDTH)),
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.5], std=[0.5]),
-            ]
-        )
-        self.int_to_char: Dict[int, str] = {i + 1: char for i, char in enumerate(ModelConfig.OCR_ALPHABET)}
-        self.int_to_char[0] = ""
+    num_classes = len(ModelConfig.OCR_ALPHABET) + 1
 
-        num_classes = len(ModelConfig.OCR_ALPHABET) + 1
+    model_to_load = CRNN(num_classes).eval()
+    qconfig_mapping = QConfigMapping().set_global(torch.ao.quantization.get_default_qconfig("fbgemm"))
+    example_inputs = (torch.randn(1, 1, ModelConfig.OCR_IMG_HEIGHT, ModelConfig.OCR_IMG_WIDTH),)
+    model_prepared = quantize_fx.prepare_fx(model_to_load, qconfig_mapping, example_inputs)
+    model_quantized = quantize_fx.convert_fx(model_prepared)
 
-        model_to_load = CRNN(num_classes).eval()
-        qconfig_mapping = QConfigMapping().set_global(torch.ao.quantization.get_default_qconfig("fbgemm"))
-        example_inputs = (torch.randn(1, 1, ModelConfig.OCR_IMG_HEIGHT, ModelConfig.OCR_IMG_WIDTH),)
-        model_prepared = quantize_fx.prepare_fx(model_to_load, qconfig_mapping, example_inputs)
-        model_quantized = quantize_fx.convert_fx(model_prepared)
+    model_quantized.load_state_dict(torch.load(model_path, map_location=device))
+    return model_quantized
 
-        model_quantized.load_state_dict(torch.load(model_path, map_location=device))
-        self.model = model_quantized
-        logger.info("Распознаватель OCR (INT8) успешно загружен (model=%s, device=%s)", model_path, device)
 
-    @torch.no_grad()
-    def recognize(self, plate_image) -> Tuple[str, float]:
-        preprocessed_plate = self.transform(plate_image).unsqueeze(0).to(self.device)
-        preds = self.model(preprocessed_plate)
-        return self._decode_with_confidence(preds)
+def load_quantized_crnn(model_path: str, device: torch.device, use_cache: bool = True) -> torch.nn.Module:
+    """Возвращает INT8-модель CRNN, по возможности из кэша скомпилированных архивов.
 
-    def _decode_with_confidence(self, log_probs: torch.Tensor) -> Tuple[str, float]:
-        probs = log_probs.permute(1, 0, 2)[0]
-        time_steps = probs.size(0)
+    При промахе модель собирается через ``prepare_fx``/``convert_fx`` и сохраняется
+    в кэш для следующих запусков.
+    """
 
-        decoded_chars: List[str] = []
-        char_confidences: List[float] = []
-        last_char_idx = 0
+    if use_cache:
+        cached = load_cached_model(model_path, device)
+        if cached is not None:
+            return cached
 
-        for t in range(time_steps):
-            timestep_log_probs = probs[t]
-            char_idx = int(torch.argmax(timestep_log_probs).item())
-            char_conf = float(torch.exp(torch.max(timestep_log_probs)).item())
+    model = build_quantized_crnn(model_path, device)
+    if use_cache:
+        save_cached_model(model, model_path)
+    return model
 
-            if char_idx != 0 and char_idx != last_char_idx:
-                decoded_chars.append(self.int_to_char.get(char_idx, ""))
-                char_confidences.append(char_conf)
 
-            last_char_idx = char_idx
+class CRNNRecognizer:
+    """Подготовка, загрузка и инференс CRNN.
 
-        text = "".join(decoded_chars)
-        if not char_confidences:
-            return text, 0.0
+    ``backend="torch"`` исполняет исходную INT8-модель; ``"onnxruntime"`` и
+    ``"openvino"`` ожидают в ``model_path`` экспортированную модель (см. ``anpr_export.py``).
+    """
 
-        avg_confidence = sum(char_confidences) / len(char_confidences)
-        return text, avg_confidence
+    def __init__(
+        self, model_path: str, device: torch.device, backend: str = BACKEND_TORCH, num_threads: int = 0
+    ) -> None:
+        self.device = device
+        self.backend = backend
+        self.preprocessor = OCRPreprocessor(ModelConfig.OCR_IMG_HEIGHT, ModelConfig.OCR_IMG_WIDTH)
+        # Буфер препроцессора переиспользуется между вызовами, поэтому прогоны сериализуются.
+        self._lock = threading.Lock()
+        self.int_to_char: Dict[int, str] = {i + 1: char for i, char in enumerate(ModelConfig.OCR_ALPHABET)}
+        self.int_to_char[0] = ""
+        self._index_to_char = np.array([""] + list(ModelConfig.OCR_ALPHABET), dtype=object)
 
+        if backend == BACKEND_TORCH:
+            self.model = load_quantized_crnn(model_path, device)
+            self._runner = TorchRunner(self.model, device)
+            logger.info("Распознаватель OCR (INT8) успешно загружен (model=%s, device=%s)", model_path, device)
+        else:
+            self.model = None
+            self._runner = create_runner(backend, model_path, num_threads)
+            logger.info("Распознаватель OCR загружен (model=%s, backend=%s)", model_path, backend)
+
+    def recognize(self, plate_image) -> Tuple[str, float]:
+        return self.recognize_batch([plate_image])[0]
+
+    def recognize_batch(self, plate_images: Sequence) -> List[Tuple[str, float]]:
+        """Распознаёт несколько кропов (BGR или уже серых) одним прямым проходом."""
+
+        if not plate_images:
+            return []
+        with self._lock:
+            log_probs = self._runner(self.preprocessor.fill(plate_images))
+            return self._decode_batch(log_probs)
+
+    def _decode_batch(self, log_probs: np.ndarray) -> List[Tuple[str, float]]:
+        """Жадное CTC-декодирование всего пакета векторными операциями.
+
+        ``log_probs`` имеет форму ``(T, N, C)``, как на выходе CRNN.
+        """
+
+        probs = np.transpose(np.asarray(log_probs), (1, 0, 2))
+        char_indices = probs.argmax(axis=2)
+        max_log_probs = np.take_along_axis(probs, char_indices[..., None], axis=2)[..., 0]
+        previous = np.pad(char_indices[:, :-1], ((0, 0), (1, 0)))
+        keep = (char_indices != 0) & (char_indices != previous)
+        confidences = np.exp(max_log_probs)
+
+        results: List[Tuple[str, float]] = []
+        for indices, mask, char_confidences in zip(char_indices, keep, confidences):
+            text = "".join(self._index_to_char[indices[mask]])
+            selected = char_confidences[mask]
+            avg_confidence = float(selected.mean()) if selected.size else 0.0
+            results.append((text, avg_confidence))
+        return results
@@ -0,0 +1,73 @@
+# /anpr/recognition/model_cache.py
+"""Кэш скомпилированной INT8-модели CRNN.
+
+``prepare_fx``/``convert_fx`` при каждом старте заново строят квантованный граф.
+Уже сконвертированная модель сохраняется архивом TorchScript, ключом служит хэш
+файла весов: при замене весов кэш автоматически становится неактуальным.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Optional
+
+import torch
+
+from anpr.config import ModelConfig
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+def weights_digest(model_path: str, length: int = 16) -> str:
+    """SHA-256 файла весов (первые ``length`` символов)."""
+
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+def cached_artifact_path(model_path: str, cache_dir: Optional[str] = None) -> str:
+    directory = cache_dir or ModelConfig.OCR_CACHE_DIR
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(directory, f"{stem}.{weights_digest(model_path)}.ts")
+
+
+def load_cached_model(model_path: str, device: torch.device, cache_dir: Optional[str] = None):
+    """Загружает скомпилированную модель, если для текущих весов есть архив."""
+
+    try:
+        artifact = cached_artifact_path(model_path, cache_dir)
+    except OSError:
+        return None
+    if not os.path.exists(artifact):
+        return None
+    try:
+        model = torch.jit.load(artifact, map_location=device)
+    except Exception:  # noqa: BLE001
+        logger.exception("Не удалось загрузить кэш модели OCR %s, пересобираем", artifact)
+        return None
+    logger.info("Модель OCR загружена из кэша %s", artifact)
+    return model.eval()
+
+
+def save_cached_model(model: torch.nn.Module, model_path: str, cache_dir: Optional[str] = None) -> Optional[str]:
+    """Трассирует сконвертированную модель и атомарно сохраняет архив TorchScript."""
+
+    try:
+        artifact = cached_artifact_path(model_path, cache_dir)
+        os.makedirs(os.path.dirname(artifact) or ".", exist_ok=True)
+        example = torch.zeros(1, 1, ModelConfig.OCR_IMG_HEIGHT, ModelConfig.OCR_IMG_WIDTH)
+        with torch.no_grad():
+            scripted = torch.jit.freeze(torch.jit.trace(model, example).eval())
+        tmp_path = f"{artifact}.{os.getpid()}.tmp"
+        torch.jit.save(scripted, tmp_path)
+        os.replace(tmp_path, artifact)
+    except Exception:  # noqa: BLE001
+        logger.exception("Не удалось сохранить кэш модели OCR")
+        return None
+    logger.info("Скомпилированная модель OCR сохранена в кэш %s", artifact)
+    return artifact
@@ -0,0 +1,109 @@
+# /anpr/recognition/ocr_batcher.py
+"""Очередь перед общим CRNN, объединяющая кропы всех каналов."""
+
+from __future__ import annotations
+
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from anpr.inference.batching import MicroBatcher
+from anpr.inference.scheduler import ChannelShare, RequestShed
+from anpr.recognition.crnn_recognizer import CRNNRecognizer
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class OCRBatchConfig:
+    """Параметры пакетного OCR."""
+
+    max_batch_size: int = 16
+    max_wait_ms: float = 5.0
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "OCRBatchConfig":
+        ocr_conf = config or {}
+        return cls(
+            max_batch_size=max(1, int(ocr_conf.get("max_batch_size", 16))),
+            max_wait_ms=max(0.0, float(ocr_conf.get("max_wait_ms", 5))),
+        )
+
+
+class BatchedRecognizer:
+    """Обёртка над :class:`CRNNRecognizer` с тем же интерфейсом.
+
+    Запросы каналов, пришедшие в пределах ``max_wait_ms``, выполняются одним
+    вызовом ``recognize_batch``; кропы одного кадра отправляются в очередь разом
+    и попадают в общий пакет вместе с кропами других каналов.
+    """
+
+    def __init__(
+        self, recognizer: CRNNRecognizer, config: OCRBatchConfig, request_queue=None, thread_init=None
+    ) -> None:
+        self.recognizer = recognizer
+        self.config = config
+        self._batcher: MicroBatcher[np.ndarray, Tuple[str, float]] = MicroBatcher(
+            recognizer.recognize_batch,
+            max_batch_size=config.max_batch_size,
+            max_wait_ms=config.max_wait_ms,
+            name="ocr-batcher",
+            request_queue=request_queue,
+            thread_init=thread_init,
+        )
+        logger.info(
+            "Очередь пакетного OCR запущена (batch=%d, wait=%.1f мс)",
+            config.max_batch_size,
+            config.max_wait_ms,
+        )
+
+    def recognize(self, plate_image: np.ndarray, share: Optional[ChannelShare] = None) -> Tuple[str, float]:
+        return self._batcher.process(plate_image, share)
+
+    def recognize_batch(
+        self, plate_images: Sequence[np.ndarray], share: Optional[ChannelShare] = None
+    ) -> List[Tuple[str, float]]:
+        return [future.result() for future in self.submit_batch(plate_images, share)]
+
+    def submit_batch(self, plate_images: Sequence[np.ndarray], share: Optional[ChannelShare] = None) -> List[Future]:
+        """Ставит кропы в очередь разом, чтобы они попали в один пакет."""
+
+        return [self._batcher.submit(image, share) for image in plate_images]
+
+    @property
+    def stats(self):
+        return self._batcher.stats
+
+    def close(self) -> None:
+        self._batcher.close()
+
+
+class ChannelRecognizer:
+    """Клиент общей очереди OCR от имени канала.
+
+    Запросы несут долю канала для планировщика инференса; кроп, сброшенный
+    планировщиком, возвращается как ``None`` и пайплайном пропускается.
+    """
+
+    def __init__(self, batched: BatchedRecognizer, share: ChannelShare) -> None:
+        self.batched = batched
+        self.share = share
+
+    def recognize(self, plate_image: np.ndarray) -> Optional[Tuple[str, float]]:
+        return self.recognize_batch([plate_image])[0]
+
+    def recognize_batch(self, plate_images: Sequence[np.ndarray]) -> List[Optional[Tuple[str, float]]]:
+        readings: List[Optional[Tuple[str, float]]] = []
+        for future in self.batched.submit_batch(plate_images, self.share):
+            try:
+                readings.append(future.result())
+            except RequestShed:
+                readings.append(None)
+        return readings
+
+    @property
+    def stats(self):
+        return self.batched.stats
@@ -0,0 +1,129 @@
+# /anpr/recognition/preprocessing.py
+"""Подготовка кропов номера ко входу CRNN без промежуточных PIL-изображений.
+
+Раньше каждый кроп проходил ``ToPILImage -> Grayscale -> Resize -> ToTensor ->
+Normalize`` с выделением памяти на каждом шаге. Здесь кроп (BGR или уже серый)
+масштабируется и нормализуется сразу в заранее выделенный буфер ``(N, 1, H, W)``.
+"""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Sequence
+
+import cv2
+import numpy as np
+
+from anpr.config import ModelConfig
+
+_OPENCV_INTERPOLATIONS = {
+    "area": cv2.INTER_AREA,
+    "linear": cv2.INTER_LINEAR,
+}
+
+
+@lru_cache(maxsize=512)
+def _bilinear_weights(in_size: int, out_size: int, transposed: bool = False) -> np.ndarray:
+    """Матрица ``(out_size, in_size)`` сглаживающего билинейного фильтра, как в PIL.
+
+    ``transposed=True`` возвращает непрерывную ``(in_size, out_size)`` копию для
+    умножения справа.
+    """
+
+    scale = in_size / out_size
+    filterscale = max(1.0, scale)
+    support = filterscale
+    weights = np.zeros((out_size, in_size), dtype=np.float32)
+    for out_idx in range(out_size):
+        center = (out_idx + 0.5) * scale
+        xmin = max(0, int(center - support + 0.5))
+        xmax = min(in_size, int(center + support + 0.5))
+        taps = (np.arange(xmin, xmax, dtype=np.float64) - center + 0.5) / filterscale
+        kernel = np.clip(1.0 - np.abs(taps), 0.0, None)
+        total = kernel.sum()
+        if total > 0:
+            weights[out_idx, xmin:xmax] = kernel / total
+    if transposed:
+        weights = np.ascontiguousarray(weights.T)
+    weights.setflags(write=False)
+    return weights
+
+
+class OCRPreprocessor:
+    """Масштабирование и нормализация кропов в переиспользуемый float32-буфер.
+
+    ``interpolation="pil"`` воспроизводит сглаживающий билинейный ресайз PIL
+    (разница с прежним transform в пределах одного уровня яркости);
+    ``"area"``/``"linear"`` используют ``cv2.resize`` и быстрее, но заметнее
+    расходятся с весами, на которых обучалась модель.
+    """
+
+    def __init__(
+        self,
+        height: int = ModelConfig.OCR_IMG_HEIGHT,
+        width: int = ModelConfig.OCR_IMG_WIDTH,
+        capacity: int = 16,
+        interpolation: str = "pil",
+    ) -> None:
+        if interpolation != "pil" and interpolation not in _OPENCV_INTERPOLATIONS:
+            raise ValueError(f"Неизвестный режим интерполяции: {interpolation}")
+        self.height = height
+        self.width = width
+        self.interpolation = interpolation
+        self._buffer = np.empty((max(1, capacity), 1, height, width), dtype=np.float32)
+        self._resized = np.empty((height, width), dtype=np.uint8)
+
+    @staticmethod
+    def to_gray(crop: np.ndarray) -> np.ndarray:
+        """Переводит кроп в оттенки серого так же, как прежний ``ToPILImage().convert("L")``.
+
+        PIL трактует массив OpenCV как RGB, поэтому веса яркости применяются к
+        каналам BGR в обратном порядке; сохраняем это поведение для совместимости
+        с обученной моделью.
+        """
+
+        if crop.ndim == 2:
+            return crop
+        if crop.shape[2] == 1:
+            return crop[:, :, 0]
+        return cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+
+    def _resize(self, gray: np.ndarray) -> np.ndarray:
+        if self.interpolation != "pil":
+            return cv2.resize(
+                gray,
+                (self.width, self.height),
+                dst=self._resized,
+                interpolation=_OPENCV_INTERPOLATIONS[self.interpolation],
+            )
+
+        in_height, in_width = gray.shape
+        horizontal = _bilinear_weights(in_width, self.width, transposed=True)
+        vertical = _bilinear_weights(in_height, self.height)
+        # PIL выполняет горизонтальный проход, затем вертикальный, округляя до uint8 между ними.
+        temp = gray.astype(np.float32) @ horizontal
+        np.clip(np.rint(temp, out=temp), 0, 255, out=temp)
+        result = vertical @ temp
+        np.clip(np.rint(result, out=result), 0, 255, out=result)
+        return result
+
+    def _ensure_capacity(self, count: int) -> None:
+        if count > self._buffer.shape[0]:
+            capacity = 1 << math.ceil(math.log2(count))
+            self._buffer = np.empty((capacity, 1, self.height, self.width), dtype=np.float32)
+
+    def fill(self, crops: Sequence[np.ndarray]) -> np.ndarray:
+        """Записывает кропы в буфер и возвращает представление ``(len(crops), 1, H, W)``.
+
+        Представление действительно до следующего вызова ``fill``.
+        """
+
+        self._ensure_capacity(len(crops))
+        for index, crop in enumerate(crops):
+            resized = self._resize(self.to_gray(crop))
+            target = self._buffer[index, 0]
+            # ToTensor + Normalize(0.5, 0.5): x / 255 * 2 - 1
+            np.multiply(resized, np.float32(2.0 / 255.0), out=target, casting="unsafe")
+            np.subtract(target, np.float32(1.0), out=target)
+        return self._buffer[: len(crops)]
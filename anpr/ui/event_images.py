@@ -0,0 +1,155 @@
+# /anpr/ui/event_images.py
+"""Кадры событий для панели подробностей: LRU по объёму и фоновое чтение с диска.
+
+Событие канала несёт только пути к скриншотам и маленькую JPEG-миниатюру.
+Полные кадры читаются с диска в фоновом потоке, когда событие выбрано, и
+хранятся в :class:`EventImageCache` — LRU по id события с бюджетом в мегабайтах.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+from PyQt5 import QtCore, QtGui
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+EventImages = Tuple[Optional[QtGui.QImage], Optional[QtGui.QImage]]
+
+
+@dataclass
+class EventImageConfig:
+    """Параметры раздела ``ui``: бюджет кэша полных кадров событий."""
+
+    cache_mb: float = 128.0
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "EventImageConfig":
+        ui_conf = config or {}
+        return cls(cache_mb=max(1.0, float(ui_conf.get("event_image_cache_mb", 128))))
+
+
+@dataclass
+class EventImageCacheStats:
+    """Счётчики кэша кадров событий."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    bytes: int = 0
+    entries: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _image_bytes(image: Optional[QtGui.QImage]) -> int:
+    return int(image.sizeInBytes()) if image is not None else 0
+
+
+class EventImageCache:
+    """LRU полных кадров событий, ограниченный суммарным объёмом ``QImage``.
+
+    Работает только в потоке GUI, поэтому без блокировок.
+    """
+
+    def __init__(self, config: EventImageConfig) -> None:
+        self.budget = int(config.cache_mb * 1024 * 1024)
+        self.stats = EventImageCacheStats()
+        self._entries: "OrderedDict[int, Tuple[EventImages, int]]" = OrderedDict()
+
+    def get(self, event_id: int) -> Optional[EventImages]:
+        entry = self._entries.get(event_id)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(event_id)
+        self.stats.hits += 1
+        return entry[0]
+
+    def put(self, event_id: int, images: EventImages) -> None:
+        self.discard(event_id)
+        if all(image is None for image in images):
+            # Файлы не прочитаны (удалены или кадр не записан): следующий выбор попробует снова.
+            return
+        size = sum(_image_bytes(image) for image in images)
+        if size > self.budget:
+            # Кадр больше всего бюджета не кэшируется, иначе вытеснит всё остальное.
+            return
+        self._entries[event_id] = (images, size)
+        self.stats.bytes += size
+        while self.stats.bytes > self.budget:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.stats.bytes -= evicted
+            self.stats.evictions += 1
+        self.stats.entries = len(self._entries)
+
+    def discard(self, event_id: int) -> None:
+        entry = self._entries.pop(event_id, None)
+        if entry is not None:
+            self.stats.bytes -= entry[1]
+            self.stats.entries = len(self._entries)
+
+
+def load_image(path: Optional[str]) -> Optional[QtGui.QImage]:
+    """Читает скриншот с диска в ``QImage`` (RGB)."""
+
+    if not path:
+        return None
+    image = cv2.imread(path)
+    if image is None:
+        return None
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    height, width, _ = rgb.shape
+    return QtGui.QImage(rgb.data, width, height, 3 * width, QtGui.QImage.Format_RGB888).copy()
+
+
+def decode_thumbnail(data: Optional[bytes]) -> Optional[QtGui.QImage]:
+    """Миниатюра события (JPEG) в ``QImage``."""
+
+    if not data:
+        return None
+    image = QtGui.QImage.fromData(data, "JPG")
+    return None if image.isNull() else image
+
+
+class EventImageLoader(QtCore.QObject):
+    """Читает кадры событий в фоновом потоке; результат приходит сигналом ``loaded``.
+
+    Ждать имеет смысл только последнее выбранное событие: запрос, который
+    до начала чтения перебит более новым, пропускается.
+    """
+
+    loaded = QtCore.pyqtSignal(int, object, object)
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="anpr-event-images")
+        self._wanted = 0
+
+    def request(self, event_id: int, frame_path: Optional[str], plate_path: Optional[str]) -> None:
+        self._wanted = event_id
+        self._executor.submit(self._load, event_id, frame_path, plate_path)
+
+    def _load(self, event_id: int, frame_path: Optional[str], plate_path: Optional[str]) -> None:
+        if event_id != self._wanted:
+            return
+        try:
+            frame_image, plate_image = load_image(frame_path), load_image(plate_path)
+        except Exception:  # noqa: BLE001
+            logger.exception("Не удалось прочитать кадры события %d", event_id)
+            return
+        # Сигнал из фонового потока ставится в очередь событий GUI.
+        self.loaded.emit(event_id, frame_image, plate_image)
+
+    def close(self) -> None:
+        self._wanted = 0
+        self._executor.shutdown(wait=True)
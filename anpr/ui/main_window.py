@@ -2,24 +2,41 @@
 # /anpr/ui/main_window.py
 import os
 from datetime import datetime
+from functools import partial
 
 import cv2
 import psutil
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
+from anpr.ui.event_images import EventImageCache, EventImageConfig, EventImageLoader, EventImages, decode_thumbnail
 from anpr.workers.channel_worker import ChannelWorker
+from anpr.workers.engine import ENGINE_STOP_TIMEOUT_MS, ChannelEngine, EngineConfig
+from anpr.workers.process_runtime import (
+    RUNTIME_PROCESSES,
+    STOP_TIMEOUT_MS,
+    ChannelProcessSupervisor,
+    ProcessRuntimeConfig,
+)
+from anpr.workers.preview import LatestFrameSlot, fits_tile
 from logging_manager import get_logger
 from settings_manager import SettingsManager
 from storage import EventDatabase
 
 logger = get_logger(__name__)
 
+# Задержка перед отправкой каналам размеров плиток после изменения раскладки.
+PREVIEW_SYNC_DELAY_MS = 100
+# Период таймера, забирающего последние кадры превью каналов.
+PREVIEW_REFRESH_INTERVAL_MS = 33
+
 
 class ChannelView(QtWidgets.QWidget):
     """Отображает поток канала с подсказками и индикатором движения."""
 
+    resized = QtCore.pyqtSignal()
+
     def __init__(self, name: str) -> None:
         super().__init__()
         self.name = name
@@ -76,6 +93,7 @@ class ChannelView(QtWidgets.QWidget):
         self.last_plate.move(rect.left() + margin, rect.top() + margin)
         status_size = self.status_hint.sizeHint()
         self.status_hint.move(rect.left() + margin, rect.bottom() - status_size.height() - margin)
+        self.resized.emit()
 
     def set_pixmap(self, pixmap: QtGui.QPixmap) -> None:
         self.video_label.setPixmap(pixmap)
@@ -88,6 +106,41 @@ class ChannelView(QtWidgets.QWidget):
         self.last_plate.setText(plate or "—")
         self.last_plate.adjustSize()
 
+    def set_metrics(self, metrics: Dict[str, float]) -> None:
+        self.video_label.setToolTip(
+            "Захват: {capture_fps:.1f} к/с\nОбработка: {processed_fps:.1f} к/с\n"
+            "Возраст кадра: {frame_age_ms:.0f} мс\nПропущено кадров: {dropped_frames}\n"
+            "Декодируется: {decoded_ratio:.0%}\nШаг детектора: {detector_stride}".format(**metrics)
+            + (
+                "\nОчереди стадий: детектор {detect_queue}, OCR {ocr_queue}, запись {persist_queue}; "
+                "не принято детектором: {stage_dropped}".format(**metrics)
+                if "detect_queue" in metrics
+                else ""
+            )
+            + (
+                "\nПревью: перезаписано до показа {preview_overwritten}".format(**metrics)
+                if "preview_overwritten" in metrics
+                else ""
+            )
+            + (
+                "\nСкриншоты: очередь {screenshot_backlog}, сброшено {screenshot_dropped}, "
+                "запись {screenshot_latency_ms:.0f} мс".format(**metrics)
+                if "screenshot_backlog" in metrics
+                else ""
+            )
+            + (
+                "\nОсновной поток: {main_decoded_ratio:.0%}".format(**metrics)
+                if "main_decoded_ratio" in metrics
+                else ""
+            )
+            + (
+                "\nОчередь инференса: {queue_depth:.0f}, ожидание {queue_wait_ms:.0f} мс\n"
+                "Сброшено запросов: {channel_shed} (всего {shed:.0f})".format(**metrics)
+                if "queue_depth" in metrics
+                else ""
+            )
+        )
+
     def set_status(self, text: str) -> None:
         self.status_hint.setVisible(bool(text))
         self.status_hint.setText(text)
@@ -342,10 +395,27 @@ class MainWindow(QtWidgets.QMainWindow):
         self.settings = settings or SettingsManager()
         self.db = EventDatabase(self.settings.get_db_path())
 
-        self.channel_workers: List[ChannelWorker] = []
+        # Движок каналов (один поток asyncio) и/или супервизор процессов каналов.
+        self.channel_workers: List[QtCore.QObject] = []
         self.channel_labels: Dict[str, ChannelView] = {}
-        self.event_images: Dict[int, Tuple[Optional[QtGui.QImage], Optional[QtGui.QImage]]] = {}
+        self.detector_strides: Dict[str, int] = {}
+        # Куда сообщать размер плитки и видимость канала: (ширина, высота, видна).
+        self.preview_targets: Dict[str, Callable[[int, int, bool], None]] = {}
+        self.preview_sync_timer = QtCore.QTimer(self)
+        self.preview_sync_timer.setSingleShot(True)
+        self.preview_sync_timer.setInterval(PREVIEW_SYNC_DELAY_MS)
+        self.preview_sync_timer.timeout.connect(self._sync_preview_targets)
+        # Слоты последних кадров каналов; один таймер показывает кадры всех видимых плиток.
+        self.frame_slots: Dict[str, LatestFrameSlot] = {}
+        self.frame_timer = QtCore.QTimer(self)
+        self.frame_timer.setInterval(PREVIEW_REFRESH_INTERVAL_MS)
+        self.frame_timer.timeout.connect(self._refresh_frames)
+        # События таблицы несут пути и миниатюру; полные кадры — в LRU с бюджетом ui.event_image_cache_mb.
         self.event_cache: Dict[int, Dict] = {}
+        self.event_image_cache = EventImageCache(EventImageConfig.from_dict(self.settings.get_ui_config()))
+        self.event_image_loader = EventImageLoader(self)
+        self.event_image_loader.loaded.connect(self._on_event_images_loaded)
+        self.shown_event_id = 0
 
         self.tabs = QtWidgets.QTabWidget()
         self.tabs.setStyleSheet(
@@ -360,6 +430,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.tabs.addTab(self.observation_tab, "Наблюдение")
         self.tabs.addTab(self.search_tab, "Поиск")
         self.tabs.addTab(self.settings_tab, "Настройки")
+        self.tabs.currentChanged.connect(self._schedule_preview_sync)
 
         self.setCentralWidget(self.tabs)
         self.setStyleSheet("background-color: #49423d;")
@@ -367,6 +438,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self._start_system_monitoring()
         self._refresh_events_table()
         self._start_channels()
+        self.frame_timer.start()
 
     def _build_status_bar(self) -> None:
         status = self.statusBar()
@@ -374,6 +446,12 @@ class MainWindow(QtWidgets.QMainWindow):
         status.setSizeGripEnabled(False)
         self.cpu_label = QtWidgets.QLabel("CPU: —")
         self.ram_label = QtWidgets.QLabel("RAM: —")
+        self.stride_label = QtWidgets.QLabel("")
+        self.stride_label.setToolTip("Текущий шаг детектора по каналам (кадров между запусками YOLO)")
+        self.event_images_label = QtWidgets.QLabel("")
+        self.event_images_label.setToolTip("Кэш полных кадров событий: объём и доля попаданий")
+        status.addPermanentWidget(self.stride_label)
+        status.addPermanentWidget(self.event_images_label)
         status.addPermanentWidget(self.cpu_label)
         status.addPermanentWidget(self.ram_label)
 
@@ -389,6 +467,10 @@ class MainWindow(QtWidgets.QMainWindow):
         ram_percent = psutil.virtual_memory().percent
         self.cpu_label.setText(f"CPU: {cpu_percent:.0f}%")
         self.ram_label.setText(f"RAM: {ram_percent:.0f}%")
+        cache_stats = self.event_image_cache.stats
+        self.event_images_label.setText(
+            f"Кадры событий: {cache_stats.bytes / (1024 * 1024):.0f} МБ, попаданий {cache_stats.hit_ratio:.0%}"
+        )
 
     # ------------------ Наблюдение ------------------
     def _build_observation_tab(self) -> QtWidgets.QWidget:
@@ -493,8 +575,10 @@ class MainWindow(QtWidgets.QMainWindow):
                 if index < len(channels):
                     channel_name = channels[index].get("name", f"Канал {index+1}")
                     self.channel_labels[channel_name] = label
+                    label.resized.connect(self._schedule_preview_sync)
                 self.grid_layout.addWidget(label, row, col)
                 index += 1
+        self._schedule_preview_sync()
 
     def _on_grid_changed(self, grid: str) -> None:
         self.settings.save_grid(grid)
@@ -503,7 +587,16 @@ class MainWindow(QtWidgets.QMainWindow):
     def _start_channels(self) -> None:
         self._stop_workers()
         self.channel_workers = []
+        self.preview_targets = {}
+        self.frame_slots = {}
+        self.detector_strides.clear()
+        self.stride_label.setText("")
         reconnect_conf = self.settings.get_reconnect()
+        inference_conf = self.settings.get_inference_config()
+        runtime_conf = self.settings.get_runtime_config()
+        use_processes = ProcessRuntimeConfig.from_dict(runtime_conf).mode == RUNTIME_PROCESSES
+        process_channels = []
+        thread_channels: List[ChannelWorker] = []
         for channel_conf in self.settings.get_channels():
             source = str(channel_conf.get("source", "")).strip()
             channel_name = channel_conf.get("name", "Канал")
@@ -512,52 +605,111 @@ class MainWindow(QtWidgets.QMainWindow):
                 if label:
                     label.set_status("Нет источника")
                 continue
+            if use_processes:
+                process_channels.append(channel_conf)
+                continue
             worker = ChannelWorker(
                 channel_conf,
                 self.settings.get_db_path(),
                 self.settings.get_screenshot_dir(),
                 reconnect_conf,
+                inference_conf,
             )
-            worker.frame_ready.connect(self._update_frame)
             worker.event_ready.connect(self._handle_event)
             worker.status_ready.connect(self._handle_status)
-            self.channel_workers.append(worker)
-            worker.start()
+            worker.metrics_ready.connect(self._handle_metrics)
+            self.preview_targets[channel_name] = worker.set_preview_target
+            self.frame_slots[channel_name] = worker.frame_slot
+            thread_channels.append(worker)
+
+        if thread_channels:
+            engine = ChannelEngine(thread_channels, EngineConfig.from_dict(runtime_conf))
+            self.channel_workers.append(engine)
+            engine.start()
+
+        if process_channels:
+            supervisor = ChannelProcessSupervisor(
+                process_channels,
+                self.settings.get_db_path(),
+                self.settings.get_screenshot_dir(),
+                reconnect_conf,
+                inference_conf,
+                runtime_conf,
+                parent=self,
+            )
+            supervisor.event_ready.connect(self._handle_event)
+            supervisor.status_ready.connect(self._handle_status)
+            supervisor.metrics_ready.connect(self._handle_metrics)
+            for channel_conf in process_channels:
+                channel_name = channel_conf.get("name", "Канал")
+                self.preview_targets[channel_name] = partial(supervisor.set_preview_target, channel_name)
+            self.channel_workers.append(supervisor)
+            supervisor.start()
+            self.frame_slots.update(supervisor.frame_slots)
+        self._sync_preview_targets()
 
     def _stop_workers(self) -> None:
         for worker in self.channel_workers:
             worker.stop()
-            worker.wait(1000)
+        for worker in self.channel_workers:
+            if isinstance(worker, ChannelProcessSupervisor):
+                worker.wait(STOP_TIMEOUT_MS)
+                worker.deleteLater()
+            else:
+                worker.wait(ENGINE_STOP_TIMEOUT_MS)
         self.channel_workers = []
+        for channel_name, slot in self.frame_slots.items():
+            logger.info(
+                "Превью канала %s: показано кадров %d, перезаписано до показа %d",
+                channel_name,
+                slot.taken,
+                slot.overwritten,
+            )
+        # Слоты процессов читают кольца, закрытые супервизором.
+        self.frame_slots = {}
+
+    def _schedule_preview_sync(self) -> None:
+        # Изменения размеров при раскладке сетки приходят пачкой: отправляем итог один раз.
+        self.preview_sync_timer.start()
+
+    def _sync_preview_targets(self) -> None:
+        """Сообщает каналам размеры их плиток; каналы вне сетки и при скрытом наблюдении не шлют кадры."""
+
+        observing = self.tabs.currentWidget() is self.observation_tab and not self.isMinimized()
+        for channel_name, set_target in self.preview_targets.items():
+            label = self.channel_labels.get(channel_name)
+            if label is None or not observing:
+                set_target(0, 0, False)
+                continue
+            size = label.video_label.contentsRect().size()
+            set_target(size.width(), size.height(), True)
+
+    def _refresh_frames(self) -> None:
+        """Показывает последний кадр каждой видимой плитки; промежуточные кадры уже заменены в слотах."""
+
+        if self.tabs.currentWidget() is not self.observation_tab or self.isMinimized():
+            return
+        for channel_name in self.channel_labels:
+            slot = self.frame_slots.get(channel_name)
+            image = slot.take() if slot is not None else None
+            if image is not None:
+                self._update_frame(channel_name, image)
 
     def _update_frame(self, channel_name: str, image: QtGui.QImage) -> None:
         label = self.channel_labels.get(channel_name)
         if not label:
             return
         target_size = label.video_label.contentsRect().size()
-        pixmap = QtGui.QPixmap.fromImage(image).scaled(
-            target_size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation
-        )
+        pixmap = QtGui.QPixmap.fromImage(image)
+        # Канал уже уменьшил кадр до плитки; масштабируем только при расхождении (плитку только что
+        # изменили или источник меньше плитки).
+        if not fits_tile(image.width(), image.height(), target_size.width(), target_size.height()):
+            pixmap = pixmap.scaled(target_size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
         label.set_pixmap(pixmap)
 
-    @staticmethod
-    def _load_image_from_path(path: Optional[str]) -> Optional[QtGui.QImage]:
-        if not path or not os.path.exists(path):
-            return None
-        image = cv2.imread(path)
-        if image is None:
-            return None
-        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        height, width, _ = rgb.shape
-        bytes_per_line = 3 * width
-        return QtGui.QImage(rgb.data, width, height, bytes_per_line, QtGui.QImage.Format_RGB888).copy()
-
     def _handle_event(self, event: Dict) -> None:
         event_id = int(event.get("id", 0))
-        frame_image = event.get("frame_image")
-        plate_image = event.get("plate_image")
         if event_id:
-            self.event_images[event_id] = (frame_image, plate_image)
             self.event_cache[event_id] = event
         channel_label = self.channel_labels.get(event.get("channel", ""))
         if channel_label:
@@ -569,11 +721,6 @@ class MainWindow(QtWidgets.QMainWindow):
             self._refresh_events_table()
         self._show_event_details(event_id)
 
-    def _cleanup_event_images(self, valid_ids: set[int]) -> None:
-        for stale_id in list(self.event_images.keys()):
-            if stale_id not in valid_ids:
-                self.event_images.pop(stale_id, None)
-
     def _insert_event_row(self, event: Dict, position: Optional[int] = None) -> None:
         row_index = position if position is not None else self.events_table.rowCount()
         self.events_table.insertRow(row_index)
@@ -597,8 +744,6 @@ class MainWindow(QtWidgets.QMainWindow):
             self.events_table.removeRow(last_row)
             if event_id and event_id in self.event_cache:
                 self.event_cache.pop(event_id, None)
-            if event_id and event_id in self.event_images:
-                self.event_images.pop(event_id, None)
 
     def _handle_status(self, channel: str, status: str) -> None:
         label = self.channel_labels.get(channel)
@@ -610,6 +755,20 @@ class MainWindow(QtWidgets.QMainWindow):
                 label.set_status(status)
             label.set_motion_active("обнаружено" in normalized)
 
+    def _handle_metrics(self, channel: str, metrics: Dict) -> None:
+        label = self.channel_labels.get(channel)
+        slot = self.frame_slots.get(channel)
+        if slot is not None:
+            metrics = dict(metrics, preview_overwritten=slot.overwritten)
+        if label:
+            label.set_metrics(metrics)
+        stride = metrics.get("detector_stride")
+        if stride is not None and self.detector_strides.get(channel) != stride:
+            self.detector_strides[channel] = stride
+            self.stride_label.setText(
+                "Шаг детектора: " + ", ".join(f"{name} {value}" for name, value in self.detector_strides.items())
+            )
+
     def _on_event_selected(self) -> None:
         selected = self.events_table.selectedItems()
         if not selected:
@@ -619,31 +778,43 @@ class MainWindow(QtWidgets.QMainWindow):
         self._show_event_details(event_id)
 
     def _show_event_details(self, event_id: int) -> None:
+        """Показывает событие; без полных кадров в кэше — миниатюру, пока кадры читаются в фоне."""
+
         event = self.event_cache.get(event_id)
-        images = self.event_images.get(event_id, (None, None))
-        frame_image, plate_image = images
-        if event:
-            if frame_image is None and event.get("frame_path"):
-                frame_image = self._load_image_from_path(event.get("frame_path"))
-            if plate_image is None and event.get("plate_path"):
-                plate_image = self._load_image_from_path(event.get("plate_path"))
-            self.event_images[event_id] = (frame_image, plate_image)
+        self.shown_event_id = event_id
+        images = self.event_image_cache.get(event_id) if event else None
+        if event and images is None:
+            images = (None, None)
+            if event.get("frame_path") or event.get("plate_path"):
+                self.event_image_loader.request(event_id, event.get("frame_path"), event.get("plate_path"))
+        self._display_event(event, images or (None, None))
+
+    def _display_event(self, event: Optional[Dict], images: EventImages) -> None:
+        """Показывает событие; вместо недоступного полного кадра — миниатюру события."""
+
         display_event = dict(event) if event else None
+        frame_image, plate_image = images
         if display_event:
             display_event["timestamp"] = self._format_timestamp(display_event.get("timestamp", ""))
+            if frame_image is None:
+                frame_image = decode_thumbnail(display_event.get("thumbnail"))
         self.event_detail.set_event(display_event, frame_image, plate_image)
 
+    def _on_event_images_loaded(
+        self, event_id: int, frame_image: Optional[QtGui.QImage], plate_image: Optional[QtGui.QImage]
+    ) -> None:
+        self.event_image_cache.put(event_id, (frame_image, plate_image))
+        if event_id == self.shown_event_id:
+            self._display_event(self.event_cache.get(event_id), (frame_image, plate_image))
+
     def _refresh_events_table(self, select_id: Optional[int] = None) -> None:
         rows = self.db.fetch_recent(limit=200)
         self.events_table.setRowCount(0)
         self.event_cache = {row["id"]: dict(row) for row in rows}
-        valid_ids = set(self.event_cache.keys())
 
         for row_data in rows:
             self._insert_event_row(dict(row_data))
 
-        self._cleanup_event_images(valid_ids)
-
         if select_id:
             for row in range(self.events_table.rowCount()):
                 item = self.events_table.item(row, 0)
@@ -842,8 +1013,21 @@ class MainWindow(QtWidgets.QMainWindow):
         channel_form = QtWidgets.QFormLayout(channel_group)
         self.channel_name_input = QtWidgets.QLineEdit()
         self.channel_source_input = QtWidgets.QLineEdit()
+        self.channel_substream_input = QtWidgets.QLineEdit()
+        self.channel_substream_input.setPlaceholderText("Не используется")
+        self.channel_substream_input.setToolTip(
+            "Поток низкого разрешения для движения, трекинга и превью; основной поток декодируется только для кропов номеров"
+        )
         channel_form.addRow("Название:", self.channel_name_input)
         channel_form.addRow("Источник/RTSP:", self.channel_source_input)
+        channel_form.addRow("Подпоток/RTSP:", self.channel_substream_input)
+        self.preview_fps_input = QtWidgets.QSpinBox()
+        self.preview_fps_input.setRange(0, 30)
+        self.preview_fps_input.setSpecialValueText("без ограничения")
+        self.preview_fps_input.setToolTip(
+            "Сколько кадров в секунду канал отправляет в плитку наблюдения; на распознавание не влияет"
+        )
+        channel_form.addRow("FPS превью:", self.preview_fps_input)
         right_panel.addWidget(channel_group)
 
         recognition_group = QtWidgets.QGroupBox("Распознавание")
@@ -886,6 +1070,41 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         motion_form.addRow("Шаг инференса (кадр):", self.detector_stride_input)
 
+        self.stride_auto_checkbox = QtWidgets.QCheckBox("Автоподстройка шага")
+        self.stride_auto_checkbox.setToolTip(
+            "Шаг падает до минимума, пока есть треки, и растёт до максимума без них; "
+            "при высокой задержке детектора или загрузке CPU минимум поднимается; "
+            "заданный шаг инференса при этом не используется"
+        )
+        motion_form.addRow("", self.stride_auto_checkbox)
+
+        self.stride_min_input = QtWidgets.QSpinBox()
+        self.stride_min_input.setRange(1, 12)
+        self.stride_max_input = QtWidgets.QSpinBox()
+        self.stride_max_input.setRange(1, 30)
+        stride_bounds = QtWidgets.QHBoxLayout()
+        stride_bounds.addWidget(self.stride_min_input)
+        stride_bounds.addWidget(QtWidgets.QLabel("—"))
+        stride_bounds.addWidget(self.stride_max_input)
+        motion_form.addRow("Границы шага:", stride_bounds)
+        self.stride_auto_checkbox.toggled.connect(self.stride_min_input.setEnabled)
+        self.stride_auto_checkbox.toggled.connect(self.stride_max_input.setEnabled)
+        self.stride_auto_checkbox.toggled.connect(lambda checked: self.detector_stride_input.setEnabled(not checked))
+
+        self.inference_priority_input = QtWidgets.QComboBox()
+        self.inference_priority_input.addItem("Обычный", "normal")
+        self.inference_priority_input.addItem("Высокий (въезд)", "high")
+        self.inference_priority_input.setToolTip(
+            "Запросы канала с высоким приоритетом обслуживаются первыми и не сбрасываются при перегрузке"
+        )
+        motion_form.addRow("Приоритет инференса:", self.inference_priority_input)
+
+        self.inference_weight_input = QtWidgets.QDoubleSpinBox()
+        self.inference_weight_input.setRange(0.1, 10.0)
+        self.inference_weight_input.setSingleStep(0.5)
+        self.inference_weight_input.setToolTip("Доля канала в общей очереди детектора и OCR среди каналов того же приоритета")
+        motion_form.addRow("Вес канала:", self.inference_weight_input)
+
         self.motion_threshold_input = QtWidgets.QDoubleSpinBox()
         self.motion_threshold_input.setRange(0.0, 1.0)
         self.motion_threshold_input.setDecimals(3)
@@ -907,6 +1126,18 @@ class MainWindow(QtWidgets.QMainWindow):
         self.motion_release_frames_input.setRange(1, 120)
         self.motion_release_frames_input.setToolTip("Сколько кадров без движения нужно, чтобы остановить распознавание")
         motion_form.addRow("Мин. кадров без движения:", self.motion_release_frames_input)
+
+        self.motion_background_input = QtWidgets.QComboBox()
+        self.motion_background_input.addItem("MOG2", "mog2")
+        self.motion_background_input.addItem("Скользящее среднее", "average")
+        self.motion_background_input.setToolTip("Модель фона, относительно которой ищется движение")
+        motion_form.addRow("Модель фона:", self.motion_background_input)
+
+        self.motion_width_input = QtWidgets.QSpinBox()
+        self.motion_width_input.setRange(64, 1920)
+        self.motion_width_input.setSingleStep(32)
+        self.motion_width_input.setToolTip("Ширина уменьшенного кадра для анализа движения, пикселей")
+        motion_form.addRow("Ширина анализа (px):", self.motion_width_input)
         right_panel.addWidget(motion_group)
 
         roi_group = QtWidgets.QGroupBox("Зона распознавания")
@@ -1009,6 +1240,8 @@ class MainWindow(QtWidgets.QMainWindow):
             channel = channels[index]
             self.channel_name_input.setText(channel.get("name", ""))
             self.channel_source_input.setText(channel.get("source", ""))
+            self.channel_substream_input.setText(channel.get("substream_source", ""))
+            self.preview_fps_input.setValue(int(channel.get("preview_fps", 10)))
             self.best_shots_input.setValue(int(channel.get("best_shots", self.settings.get_best_shots())))
             self.cooldown_input.setValue(int(channel.get("cooldown_seconds", self.settings.get_cooldown_seconds())))
             self.min_conf_input.setValue(float(channel.get("ocr_min_confidence", self.settings.get_min_confidence())))
@@ -1016,10 +1249,27 @@ class MainWindow(QtWidgets.QMainWindow):
                 max(0, self.detection_mode_input.findData(channel.get("detection_mode", "continuous")))
             )
             self.detector_stride_input.setValue(int(channel.get("detector_frame_stride", 2)))
+            stride_control = channel.get("stride_control") or {}
+            self.stride_auto_checkbox.setChecked(bool(stride_control.get("enabled", False)))
+            self.stride_min_input.setValue(int(stride_control.get("min_stride", 1)))
+            self.stride_max_input.setValue(int(stride_control.get("max_stride", 6)))
+            # toggled не приходит, если флажок уже в нужном состоянии.
+            stride_auto = self.stride_auto_checkbox.isChecked()
+            self.stride_min_input.setEnabled(stride_auto)
+            self.stride_max_input.setEnabled(stride_auto)
+            self.detector_stride_input.setEnabled(not stride_auto)
+            self.inference_priority_input.setCurrentIndex(
+                max(0, self.inference_priority_input.findData(channel.get("inference_priority", "normal")))
+            )
+            self.inference_weight_input.setValue(float(channel.get("inference_weight", 1.0)))
             self.motion_threshold_input.setValue(float(channel.get("motion_threshold", 0.01)))
             self.motion_stride_input.setValue(int(channel.get("motion_frame_stride", 1)))
             self.motion_activation_frames_input.setValue(int(channel.get("motion_activation_frames", 3)))
             self.motion_release_frames_input.setValue(int(channel.get("motion_release_frames", 6)))
+            self.motion_background_input.setCurrentIndex(
+                max(0, self.motion_background_input.findData(channel.get("motion_background", "mog2")))
+            )
+            self.motion_width_input.setValue(int(channel.get("motion_analysis_width", 320)))
 
             region = channel.get("region") or {"x": 0, "y": 0, "width": 100, "height": 100}
             self.roi_x_input.setValue(int(region.get("x", 0)))
@@ -1077,15 +1327,26 @@ class MainWindow(QtWidgets.QMainWindow):
         if 0 <= index < len(channels):
             channels[index]["name"] = self.channel_name_input.text()
             channels[index]["source"] = self.channel_source_input.text()
+            channels[index]["substream_source"] = self.channel_substream_input.text().strip()
+            channels[index]["preview_fps"] = int(self.preview_fps_input.value())
             channels[index]["best_shots"] = int(self.best_shots_input.value())
             channels[index]["cooldown_seconds"] = int(self.cooldown_input.value())
             channels[index]["ocr_min_confidence"] = float(self.min_conf_input.value())
             channels[index]["detection_mode"] = self.detection_mode_input.currentData()
             channels[index]["detector_frame_stride"] = int(self.detector_stride_input.value())
+            stride_control = dict(channels[index].get("stride_control") or {})
+            stride_control["enabled"] = self.stride_auto_checkbox.isChecked()
+            stride_control["min_stride"] = int(self.stride_min_input.value())
+            stride_control["max_stride"] = max(stride_control["min_stride"], int(self.stride_max_input.value()))
+            channels[index]["stride_control"] = stride_control
+            channels[index]["inference_priority"] = self.inference_priority_input.currentData()
+            channels[index]["inference_weight"] = float(self.inference_weight_input.value())
             channels[index]["motion_threshold"] = float(self.motion_threshold_input.value())
             channels[index]["motion_frame_stride"] = int(self.motion_stride_input.value())
             channels[index]["motion_activation_frames"] = int(self.motion_activation_frames_input.value())
             channels[index]["motion_release_frames"] = int(self.motion_release_frames_input.value())
+            channels[index]["motion_background"] = self.motion_background_input.currentData()
+            channels[index]["motion_analysis_width"] = int(self.motion_width_input.value())
 
             region = {
                 "x": int(self.roi_x_input.value()),
@@ -1150,6 +1411,21 @@ class MainWindow(QtWidgets.QMainWindow):
         self.preview.setPixmap(QtGui.QPixmap.fromImage(q_image))
 
     # ------------------ Жизненный цикл ------------------
+    def changeEvent(self, event: QtCore.QEvent) -> None:  # noqa: N802
+        super().changeEvent(event)
+        if event.type() == QtCore.QEvent.WindowStateChange:
+            self._schedule_preview_sync()
+
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:  # noqa: N802
         self._stop_workers()
+        self.event_image_loader.close()
+        stats = self.event_image_cache.stats
+        logger.info(
+            "Кэш кадров событий: попаданий=%d, промахов=%d, вытеснено=%d, %.1f МБ в %d событиях",
+            stats.hits,
+            stats.misses,
+            stats.evictions,
+            stats.bytes / (1024 * 1024),
+            stats.entries,
+        )
         event.accept()
@@ -1,23 +1,54 @@
 #!/usr/bin/env python3
 # /anpr/workers/channel_worker.py
 import asyncio
+import dataclasses
 import os
 import time
 import uuid
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
 
 import cv2
 from PyQt5 import QtCore, QtGui
 
+from anpr.capture.ffmpeg_source import FFmpegCapture, FFmpegCaptureConfig
+from anpr.capture.grabber import (
+    PURPOSE_DETECT,
+    PURPOSE_MOTION,
+    PURPOSE_PREVIEW,
+    PURPOSE_TRACK,
+    CapturedFrame,
+    DecodeSchedule,
+    DemandGrabber,
+    FrameGrabber,
+    RateMeter,
+    TrackGate,
+)
 from anpr.detection.motion_detector import MotionDetector, MotionDetectorConfig
-from anpr.pipeline.factory import build_components
+from anpr.pipeline.crop_quality import CropQualityConfig
+from anpr.pipeline.factory import build_components, get_inference_scheduler
+from anpr.pipeline.ocr_scheduler import OCRBudgetConfig
+from anpr.pipeline.stride_controller import StrideControlConfig, StrideController
+from anpr.workers.engine import STAGE_CAPTURE, STAGE_DETECT, STAGE_IO, STAGE_OCR, StageExecutors
+from anpr.workers.preview import LatestFrameSlot, PreviewControl, fit_preview
+from anpr.workers.screenshot_writer import ScreenshotWriter
 from logging_manager import get_logger
-from storage import AsyncEventDatabase
+from storage import EventDatabase
 
 logger = get_logger(__name__)
 
+STATS_LOG_INTERVAL_SECONDS = 60.0
+METRICS_INTERVAL_SECONDS = 1.0
+# Кадр основного потока, разошедшийся с кадром подпотока больше этого, с ним не сопоставляется.
+MAIN_FRAME_MAX_AGE_SECONDS = 0.5
+# Сколько последних кадров основного потока хранится для поиска ближайшего по времени.
+MAIN_FRAME_HISTORY = 4
+# Миниатюра кадра события: ширина и качество JPEG. Полные кадры UI читает со скриншотов.
+EVENT_THUMBNAIL_WIDTH = 160
+EVENT_THUMBNAIL_QUALITY = 80
+
 
 @dataclass
 class Region:
@@ -35,8 +66,8 @@ class Region:
         self.height = max(1, min(100 - self.y, int(self.height)))
         return self
 
-    def to_rect(self, frame_shape: Tuple[int, int, int]) -> Tuple[int, int, int, int]:
-        height, width, _ = frame_shape
+    def to_rect(self, frame_shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+        height, width = frame_shape[:2]
         x2_pct = min(100, self.x + self.width)
         y2_pct = min(100, self.y + self.height)
 
@@ -71,38 +102,125 @@ class ReconnectPolicy:
         )
 
 
+@dataclass
+class StageQueueConfig:
+    """Глубина очередей между стадиями канала: детектор, OCR и запись событий."""
+
+    detect: int = 2
+    ocr: int = 2
+    persist: int = 16
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "StageQueueConfig":
+        queue_conf = config or {}
+        return cls(
+            detect=max(1, int(queue_conf.get("detect", 2))),
+            ocr=max(1, int(queue_conf.get("ocr", 2))),
+            persist=max(1, int(queue_conf.get("persist", 16))),
+        )
+
+
+@dataclass
+class _DetectJob:
+    """Кадр для стадии детектора; ``run_detector=False`` — только экстраполяция треков."""
+
+    frame: cv2.Mat
+    roi_frame: cv2.Mat
+    roi_rect: Tuple[int, int, int, int]
+    run_detector: bool
+    regions: Optional[List[Tuple[int, int, int, int]]]
+    main_image: Optional[cv2.Mat]
+    main_shape: Optional[Tuple[int, int]]
+    frame_index: int
+
+
+class _MotionStopped:
+    """Маркер для стадии детектора: движение пропало, новых кадров с треками не будет.
+
+    Признак активных треков выставляет только стадия детектора, поэтому захват
+    не сбрасывает его сам, а ставит маркер в очередь после кадров, ещё ждущих детекции.
+    """
+
+
+@dataclass
+class _RecognizeJob:
+    """Кадр для OCR с боксами в его координатах."""
+
+    frame: cv2.Mat
+    detections: List[dict]
+    frame_index: int
+
+
 @dataclass
 class ChannelRuntimeConfig:
     """Нормализованная конфигурация канала."""
 
     name: str
     source: str
+    substream_source: str
+    substream_hold_seconds: float
+    substream_crop_margin: float
     best_shots: int
     cooldown_seconds: int
     min_confidence: float
     detector_frame_stride: int
+    stride_control: StrideControlConfig
     detection_mode: str
-    motion_threshold: float
-    motion_frame_stride: int
-    motion_activation_frames: int
-    motion_release_frames: int
+    capture_mode: str
+    capture_backend: str
+    ffmpeg: FFmpegCaptureConfig
+    preview_fps: float
+    motion: MotionDetectorConfig
+    motion_crop: bool
+    motion_crop_padding_cells: int
+    motion_crop_max_area: float
     region: Region
+    detector_backend: str
+    detector_input_size: int
+    detector_resize: str
+    ocr_backend: str
+    inference_weight: float
+    inference_priority: str
+    tracker: str
+    predict_skipped_frames: bool
+    ocr_budget: OCRBudgetConfig
+    crop_quality: CropQualityConfig
+    stage_queues: StageQueueConfig
 
     @classmethod
     def from_dict(cls, channel_conf: Dict[str, Any]) -> "ChannelRuntimeConfig":
         return cls(
             name=channel_conf.get("name", "Канал"),
             source=str(channel_conf.get("source", "0")),
+            substream_source=str(channel_conf.get("substream_source") or "").strip(),
+            substream_hold_seconds=max(0.0, float(channel_conf.get("substream_hold_seconds", 2.0))),
+            substream_crop_margin=min(1.0, max(0.0, float(channel_conf.get("substream_crop_margin", 0.15)))),
             best_shots=int(channel_conf.get("best_shots", 3)),
             cooldown_seconds=int(channel_conf.get("cooldown_seconds", 5)),
             min_confidence=float(channel_conf.get("ocr_min_confidence", 0.6)),
             detector_frame_stride=max(1, int(channel_conf.get("detector_frame_stride", 2))),
+            stride_control=StrideControlConfig.from_dict(channel_conf.get("stride_control")),
             detection_mode=channel_conf.get("detection_mode", "continuous"),
-            motion_threshold=float(channel_conf.get("motion_threshold", 0.01)),
-            motion_frame_stride=int(channel_conf.get("motion_frame_stride", 1)),
-            motion_activation_frames=int(channel_conf.get("motion_activation_frames", 3)),
-            motion_release_frames=int(channel_conf.get("motion_release_frames", 6)),
+            capture_mode=str(channel_conf.get("capture_mode") or "demand").strip().lower(),
+            capture_backend=str(channel_conf.get("capture_backend") or "opencv").strip().lower(),
+            ffmpeg=FFmpegCaptureConfig.from_dict(channel_conf.get("ffmpeg")),
+            preview_fps=max(0.0, float(channel_conf.get("preview_fps", 10))),
+            motion=MotionDetectorConfig.from_dict(channel_conf),
+            motion_crop=bool(channel_conf.get("motion_crop", True)),
+            motion_crop_padding_cells=max(0, int(channel_conf.get("motion_crop_padding_cells", 1))),
+            motion_crop_max_area=min(1.0, max(0.0, float(channel_conf.get("motion_crop_max_area", 0.6)))),
             region=Region(**(channel_conf.get("region") or {})).clamp(),
+            detector_backend=str(channel_conf.get("detector_backend") or ""),
+            detector_input_size=max(0, int(channel_conf.get("detector_input_size") or 0)),
+            detector_resize=str(channel_conf.get("detector_resize") or "letterbox").strip().lower(),
+            ocr_backend=str(channel_conf.get("ocr_backend") or ""),
+            inference_weight=max(0.01, float(channel_conf.get("inference_weight", 1.0))),
+            inference_priority=str(channel_conf.get("inference_priority") or "normal").strip().lower(),
+            tracker=str(channel_conf.get("tracker") or "native").strip().lower(),
+            predict_skipped_frames=bool(channel_conf.get("predict_skipped_frames", True)),
+            ocr_budget=OCRBudgetConfig.from_dict(channel_conf.get("ocr_budget")),
+            crop_quality=CropQualityConfig.from_dict(channel_conf.get("crop_quality")),
+            stage_queues=StageQueueConfig.from_dict(channel_conf.get("stage_queues")),
         )
 
 
@@ -118,13 +236,22 @@ class InferenceLimiter:
         self._counter = (self._counter + 1) % self.stride
         return should_run
 
+    def rearm(self) -> None:
+        """Следующий кадр снова идёт в детектор (кадр детектора не попал в очередь)."""
+
+        self._counter = 0
 
-class ChannelWorker(QtCore.QThread):
-    """Background worker that captures frames, runs ANPR pipeline and emits UI events."""
 
-    frame_ready = QtCore.pyqtSignal(str, QtGui.QImage)
+class ChannelWorker(QtCore.QObject):
+    """Channel coroutine that captures frames, runs ANPR pipeline and emits UI events.
+
+    Runs inside :class:`ChannelEngine` together with the other channels; blocking
+    calls go to the engine's per-stage executors.
+    """
+
     event_ready = QtCore.pyqtSignal(dict)
     status_ready = QtCore.pyqtSignal(str, str)
+    metrics_ready = QtCore.pyqtSignal(str, dict)
 
     def __init__(
         self,
@@ -132,39 +259,126 @@ class ChannelWorker(QtCore.QThread):
         db_path: str,
         screenshot_dir: str,
         reconnect_conf: Optional[Dict[str, Any]] = None,
+        inference_conf: Optional[Dict[str, Any]] = None,
         parent=None,
     ) -> None:
         super().__init__(parent)
         self.config = ChannelRuntimeConfig.from_dict(channel_conf)
         self.reconnect_policy = ReconnectPolicy.from_dict(reconnect_conf)
+        self.inference_conf = inference_conf or {}
         self.db_path = db_path
         self.screenshot_dir = screenshot_dir
         os.makedirs(self.screenshot_dir, exist_ok=True)
         self._running = True
+        self.crashed = False
+        self._executors: Optional[StageExecutors] = None
+        self._writer: Optional[ScreenshotWriter] = None
+        self._stage_queues: Dict[str, asyncio.Queue] = {}
+        self._stage_dropped = 0
+        self._substream_crops = 0
+        self._tracks_active = False
+        self.preview = PreviewControl()
+        # Кадры превью идут в GUI через слот последнего кадра, а не очередью сигналов.
+        self.frame_slot = LatestFrameSlot()
 
-        motion_config = MotionDetectorConfig(
-            threshold=self.config.motion_threshold,
-            frame_stride=self.config.motion_frame_stride,
-            activation_frames=self.config.motion_activation_frames,
-            release_frames=self.config.motion_release_frames,
-        )
+        # Автоподстройка меняет шаг детектора на ходу; без неё шаг берётся из настроек.
+        self._stride_controller: Optional[StrideController] = None
+        detector_stride = self.config.detector_frame_stride
+        if self.config.stride_control.enabled:
+            self._stride_controller = StrideController(self.config.stride_control, detector_stride)
+            detector_stride = self._stride_controller.stride
+
+        self._decode_schedule: Optional[DecodeSchedule] = None
+        motion_config = self.config.motion
+        if self.config.capture_mode == "demand":
+            # Шаги анализа движения и детектора соблюдает расписание декодирования.
+            self._decode_schedule = DecodeSchedule(
+                motion_stride=motion_config.frame_stride,
+                detector_stride=detector_stride,
+                preview_fps=self.config.preview_fps,
+                motion_mode=self.config.detection_mode == "motion",
+                decode_tracked_frames=self.config.predict_skipped_frames,
+            )
+            motion_config = dataclasses.replace(motion_config, frame_stride=1)
         self.motion_detector = MotionDetector(motion_config)
-        self._inference_limiter = InferenceLimiter(self.config.detector_frame_stride)
+        self._inference_limiter = InferenceLimiter(detector_stride)
+        # Двухпоточный канал: движение, трекинг и превью идут по подпотоку,
+        # основной поток декодируется только ради кропов номеров.
+        self._main_gate: Optional[TrackGate] = None
+        if self.config.substream_source:
+            self._main_gate = TrackGate(self.config.substream_hold_seconds)
 
-    def _open_capture(self, source: str) -> Optional[cv2.VideoCapture]:
-        capture = cv2.VideoCapture(int(source) if source.isnumeric() else source)
+    def _open_capture(self, source: str, ffmpeg_config: Optional[FFmpegCaptureConfig] = None):
+        if self.config.capture_backend == "ffmpeg" and not source.isnumeric():
+            capture = FFmpegCapture(source, ffmpeg_config or self.config.ffmpeg)
+        else:
+            capture = cv2.VideoCapture(int(source) if source.isnumeric() else source)
         if not capture.isOpened():
+            capture.release()
             return None
         return capture
 
-    async def _open_with_retries(self, source: str, channel_name: str) -> Optional[cv2.VideoCapture]:
-        """Подключает источник с учетом настроек переподключения."""
+    def _start_grabber(self, capture, source: str, schedule=None, name: Optional[str] = None) -> FrameGrabber:
+        # Локальный файл читается в темпе его FPS, иначе поток захвата обгонит реальное время.
+        # ffmpeg выдерживает темп сам (-re).
+        pace_fps = 0.0
+        if os.path.isfile(source) and not isinstance(capture, FFmpegCapture):
+            pace_fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        name = name or f"grabber-{self.config.name}"
+        schedule = schedule or self._decode_schedule
+        if schedule is not None:
+            return DemandGrabber(capture, schedule, name=name, pace_fps=pace_fps).start()
+        return FrameGrabber(capture, name=name, pace_fps=pace_fps).start()
+
+    async def _open_main_stream(self) -> Optional[FrameGrabber]:
+        """Подключает основной поток двухпоточного канала одной попыткой.
+
+        Без основного потока канал продолжает работу, а OCR получает кропы
+        подпотока. Пока треков нет, ffmpeg декодирует у основного потока только
+        ключевые кадры, OpenCV — только захватывает их без ``retrieve``.
+        """
+
+        source = self.config.source
+        ffmpeg_config = dataclasses.replace(
+            self.config.ffmpeg, width=0, height=0, pix_fmt="bgr24", idle_keyframes=True
+        )
+        capture = await self._executors.run(STAGE_CAPTURE, self._open_capture, source, ffmpeg_config)
+        if capture is None:
+            logger.warning("Канал %s: основной поток %s недоступен, кропы берутся из подпотока", self.config.name, source)
+            return None
+        if isinstance(capture, FFmpegCapture):
+            capture.set_idle(True)
+        return self._start_grabber(capture, source, self._main_gate, name=f"grabber-main-{self.config.name}")
+
+    @staticmethod
+    def _stream_shape(grabber: Optional[FrameGrabber]) -> Optional[Tuple[int, int]]:
+        """Размер кадра потока ``(высота, ширина)`` по свойствам источника, если он известен."""
+
+        if grabber is None:
+            return None
+        width = int(grabber.capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        height = int(grabber.capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+        return (height, width) if width > 0 and height > 0 else None
+
+    @staticmethod
+    def _nearest_main_frame(main_frames: Deque[CapturedFrame], timestamp: float) -> Optional[cv2.Mat]:
+        """Кадр основного потока, ближайший по времени захвата к кадру подпотока."""
+
+        if not main_frames:
+            return None
+        nearest = min(main_frames, key=lambda main_frame: abs(main_frame.timestamp - timestamp))
+        if abs(nearest.timestamp - timestamp) > MAIN_FRAME_MAX_AGE_SECONDS:
+            return None
+        return nearest.image
+
+    async def _open_with_retries(self, source: str, channel_name: str) -> Optional[FrameGrabber]:
+        """Подключает источник с учетом настроек переподключения и запускает поток захвата."""
 
         while self._running:
-            capture = await asyncio.to_thread(self._open_capture, source)
+            capture = await self._executors.run(STAGE_CAPTURE, self._open_capture, source)
             if capture is not None:
                 self.status_ready.emit(channel_name, "")
-                return capture
+                return self._start_grabber(capture, source)
 
             if not self.reconnect_policy.enabled:
                 self.status_ready.emit(channel_name, "Нет сигнала")
@@ -179,18 +393,65 @@ class ChannelWorker(QtCore.QThread):
 
     def _build_pipeline(self) -> Tuple[object, object]:
         return build_components(
-            self.config.best_shots, self.config.cooldown_seconds, self.config.min_confidence
+            self.config.best_shots,
+            self.config.cooldown_seconds,
+            self.config.min_confidence,
+            self.inference_conf,
+            detector_backend=self.config.detector_backend,
+            ocr_backend=self.config.ocr_backend,
+            tracker=self.config.tracker,
+            detector_input_size=self.config.detector_input_size,
+            detector_resize=self.config.detector_resize,
+            ocr_budget=self.config.ocr_budget,
+            crop_quality=self.config.crop_quality,
+            channel_name=self.config.name,
+            inference_weight=self.config.inference_weight,
+            inference_priority=self.config.inference_priority,
         )
 
     def _extract_region(self, frame: cv2.Mat) -> Tuple[cv2.Mat, Tuple[int, int, int, int]]:
         x1, y1, x2, y2 = self.config.region.to_rect(frame.shape)
         return frame[y1:y2, x1:x2], (x1, y1, x2, y2)
 
-    def _motion_detected(self, roi_frame: cv2.Mat) -> bool:
+    def _motion_detected(self, roi_frame: cv2.Mat, keyframes_only: bool = False) -> bool:
         if self.config.detection_mode != "motion":
             return True
 
-        return self.motion_detector.update(roi_frame)
+        return self.motion_detector.update(roi_frame, keyframes_only)
+
+    def _detector_regions(self, roi_frame: cv2.Mat) -> Optional[List[Tuple[int, int, int, int]]]:
+        """Области движения внутри ROI для детектора; ``None`` — детектировать весь ROI."""
+
+        if self.config.detection_mode != "motion" or not self.config.motion_crop:
+            return None
+        regions = self.motion_detector.motion_regions(roi_frame.shape, self.config.motion_crop_padding_cells)
+        if not regions:
+            return None
+        roi_area = float(roi_frame.shape[0] * roi_frame.shape[1])
+        covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+        if covered >= self.config.motion_crop_max_area * roi_area:
+            return None
+        return regions
+
+    def _update_stride(self, now: float, tracks_active: bool) -> None:
+        controller = self._stride_controller
+        if controller is None:
+            return
+        stride = controller.update(now, tracks_active)
+        if stride is None:
+            return
+        self._inference_limiter.stride = stride
+        if self._decode_schedule is not None:
+            self._decode_schedule.detector_stride = stride
+        logger.debug(
+            "Канал %s: шаг детектора %d (треки=%s, задержка %.0f мс, CPU %.0f%%, нижняя граница %d)",
+            self.config.name,
+            stride,
+            "да" if tracks_active else "нет",
+            controller.latency_ms,
+            controller.cpu_percent,
+            controller.floor,
+        )
 
     @staticmethod
     def _offset_detections(detections: list[dict], roi_rect: Tuple[int, int, int, int]) -> list[dict]:
@@ -205,17 +466,76 @@ class ChannelWorker(QtCore.QThread):
             adjusted.append(det_copy)
         return adjusted
 
+    def _to_main_stream(
+        self, detections: list[dict], substream_shape: Tuple[int, ...], main_shape: Tuple[int, ...]
+    ) -> list[dict]:
+        """Переводит боксы из координат подпотока в координаты основного потока.
+
+        Потоки не синхронизированы покадрово, поэтому бокс расширяется на
+        ``substream_crop_margin`` своего размера с каждой стороны.
+        """
+
+        scale_x = main_shape[1] / float(substream_shape[1])
+        scale_y = main_shape[0] / float(substream_shape[0])
+        margin = self.config.substream_crop_margin
+        height, width = main_shape[:2]
+        mapped: list[dict] = []
+        for det in detections:
+            x1, y1, x2, y2 = det["bbox"]
+            pad_x = (x2 - x1) * scale_x * margin
+            pad_y = (y2 - y1) * scale_y * margin
+            det_copy = det.copy()
+            det_copy["bbox"] = [
+                max(0, int(x1 * scale_x - pad_x)),
+                max(0, int(y1 * scale_y - pad_y)),
+                min(width, int(round(x2 * scale_x + pad_x))),
+                min(height, int(round(y2 * scale_y + pad_y))),
+            ]
+            mapped.append(det_copy)
+        return mapped
+
     @staticmethod
     def _to_qimage(frame: cv2.Mat) -> Optional[QtGui.QImage]:
         if frame is None or frame.size == 0:
             return None
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB if frame.ndim == 2 else cv2.COLOR_BGR2RGB)
         height, width, channels = rgb_frame.shape
         bytes_per_line = channels * width
         return QtGui.QImage(
             rgb_frame.data, width, height, bytes_per_line, QtGui.QImage.Format_RGB888
         ).copy()
 
+    def set_preview_target(self, width: int, height: int, visible: bool) -> None:
+        """Размер области видео плитки канала и её видимость; вызывается из потока GUI."""
+
+        self.preview.set_target(width, height, visible)
+
+    def _publish_frame(self, channel_name: str, frame: cv2.Mat) -> None:
+        """Передаёт в UI кадр превью, уже уменьшенный до размера плитки."""
+
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB if frame.ndim == 2 else cv2.COLOR_BGR2RGB)
+        height, width, channel = rgb_frame.shape
+        bytes_per_line = 3 * width
+        # Копируем буфер, чтобы предотвратить обращение Qt к уже освобожденной памяти
+        # во время перерисовок окна.
+        q_image = QtGui.QImage(
+            rgb_frame.data, width, height, bytes_per_line, QtGui.QImage.Format_RGB888
+        ).copy()
+        self.frame_slot.put(q_image)
+
+    @staticmethod
+    def _encode_thumbnail(frame: Optional[cv2.Mat]) -> Optional[bytes]:
+        """JPEG-миниатюра кадра события: легко проходит через сигнал и очередь процесса."""
+
+        if frame is None or frame.size == 0:
+            return None
+        height, width = frame.shape[:2]
+        if width > EVENT_THUMBNAIL_WIDTH:
+            size = (EVENT_THUMBNAIL_WIDTH, max(1, height * EVENT_THUMBNAIL_WIDTH // width))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, EVENT_THUMBNAIL_QUALITY])
+        return encoded.tobytes() if ok else None
+
     @staticmethod
     def _sanitize_for_filename(value: str) -> str:
         normalized = value.replace(os.sep, "_")
@@ -233,25 +553,32 @@ class ChannelWorker(QtCore.QThread):
             os.path.join(self.screenshot_dir, f"{base}_plate.jpg"),
         )
 
-    def _save_bgr_image(self, path: str, image: Optional[cv2.Mat]) -> Optional[str]:
-        if image is None or image.size == 0:
-            return None
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        try:
-            if cv2.imwrite(path, image):
-                return path
-        except Exception:  # noqa: BLE001
-            logger.exception("Не удалось сохранить скриншот по пути %s", path)
-        return None
+    def _store_event(self, storage: EventDatabase, event: Dict[str, Any], frame: cv2.Mat) -> Dict[str, Any]:
+        """Миниатюра и запись события в БД; выполняется в пуле ``io``, когда скриншоты уже на диске."""
+
+        event["thumbnail"] = self._encode_thumbnail(frame)
+        event["id"] = storage.insert_event(
+            channel=event["channel"],
+            plate=event["plate"],
+            confidence=event["confidence"],
+            source=event["source"],
+            timestamp=event["timestamp"],
+            frame_path=event.get("frame_path"),
+            plate_path=event.get("plate_path"),
+        )
+        return event
 
     async def _process_events(
         self,
-        storage: AsyncEventDatabase,
+        storage: EventDatabase,
         source: str,
         results: list[dict],
         channel_name: str,
         frame: cv2.Mat,
     ) -> None:
+        """Ставит скриншоты всех номеров кадра в очередь записи, затем пишет события по порядку."""
+
+        pending = []
         for res in results:
             if res.get("unreadable"):
                 logger.debug(
@@ -271,116 +598,442 @@ class ChannelWorker(QtCore.QThread):
                 x1, y1, x2, y2 = res.get("bbox", (0, 0, 0, 0))
                 plate_crop = frame[y1:y2, x1:x2] if frame is not None else None
                 frame_path, plate_path = self._build_screenshot_paths(channel_name, event["plate"])
-                event["frame_path"] = self._save_bgr_image(frame_path, frame)
-                event["plate_path"] = self._save_bgr_image(plate_path, plate_crop)
-                event["frame_image"] = self._to_qimage(frame)
-                event["plate_image"] = self._to_qimage(plate_crop) if plate_crop is not None else None
-                event["id"] = await storage.insert_event_async(
-                    channel=event["channel"],
-                    plate=event["plate"],
-                    confidence=event["confidence"],
-                    source=event["source"],
-                    timestamp=event["timestamp"],
-                    frame_path=event.get("frame_path"),
-                    plate_path=event.get("plate_path"),
-                )
-                self.event_ready.emit(event)
-                logger.info(
-                    "Канал %s: зафиксирован номер %s (conf=%.2f, track=%s)",
-                    event["channel"],
-                    event["plate"],
-                    event["confidence"],
-                    res.get("track_id", "-"),
+                # Через пул io: при политике block постановка в очередь может ждать места.
+                writes = await self._executors.run(
+                    STAGE_IO, self._writer.submit_event, frame_path, frame, plate_path, plate_crop
                 )
+                pending.append((event, writes, res.get("track_id", "-")))
+        for event, writes, track_id in pending:
+            event["frame_path"], event["plate_path"] = await asyncio.gather(
+                *(asyncio.wrap_future(write) for write in writes)
+            )
+            await self._executors.run(STAGE_IO, self._store_event, storage, event, frame)
+            self.event_ready.emit(event)
+            logger.info(
+                "Канал %s: зафиксирован номер %s (conf=%.2f, track=%s)",
+                event["channel"],
+                event["plate"],
+                event["confidence"],
+                track_id,
+            )
 
-    async def _loop(self) -> None:
-        pipeline, detector = await asyncio.to_thread(self._build_pipeline)
-        storage = AsyncEventDatabase(self.db_path)
+    def _log_channel_stats(self, pipeline, detector, channel_name: str) -> None:
+        if detector.roi_pixels:
+            logger.info(
+                "Канал %s: детектор обработал %.0f%% пикселей ROI",
+                channel_name,
+                100.0 * detector.detector_pixels / detector.roi_pixels,
+            )
+        stats = pipeline.ocr_stats
+        logger.info(
+            "Канал %s: OCR вызовов=%d, сэкономлено=%d (%.0f%%), ранних выдач=%d, перепроверок=%d",
+            channel_name,
+            stats.ocr_calls,
+            stats.ocr_skipped,
+            stats.saved_ratio * 100,
+            stats.early_emits,
+            stats.rechecks,
+        )
+        controller = self._stride_controller
+        if controller is not None:
+            logger.info(
+                "Канал %s: шаг детектора %d (границы %d..%d, нижняя по нагрузке %d), "
+                "задержка детектора %.0f мс, CPU %.0f%%, смен шага=%d",
+                channel_name,
+                controller.stride,
+                controller.config.min_stride,
+                controller.config.max_stride,
+                controller.floor,
+                controller.latency_ms,
+                controller.cpu_percent,
+                controller.changes,
+            )
+        share = getattr(detector, "share", None)
+        if share is not None and share.shed:
+            logger.info("Канал %s: планировщик инференса сбросил запросов: %d", channel_name, share.shed)
+        if self._stage_dropped:
+            logger.info(
+                "Канал %s: кадров не принято детектором из-за заполненной очереди: %d",
+                channel_name,
+                self._stage_dropped,
+            )
+        crops = pipeline.crop_stats
+        logger.info(
+            "Канал %s: кропов на OCR=%d, пропущено=%d (низкое качество=%d, не лучшие=%d)",
+            channel_name,
+            crops.processed,
+            crops.skipped,
+            crops.rejected,
+            crops.not_best,
+        )
 
-        source = self.config.source
+    def _emit_metrics(
+        self,
+        channel_name: str,
+        grabber: FrameGrabber,
+        processed: RateMeter,
+        frame_age: float,
+        main_grabber: Optional[FrameGrabber] = None,
+        detector=None,
+    ) -> None:
+        metrics = {
+            "capture_fps": grabber.capture_rate.rate,
+            "processed_fps": processed.rate,
+            "frame_age_ms": frame_age * 1000.0,
+            "dropped_frames": grabber.dropped,
+            "decoded_ratio": grabber.decoded / grabber.captured if grabber.captured else 0.0,
+            "detector_stride": self._inference_limiter.stride,
+            "stage_dropped": self._stage_dropped,
+        }
+        for stage, stage_queue in self._stage_queues.items():
+            metrics[f"{stage}_queue"] = stage_queue.qsize()
+        if main_grabber is not None:
+            metrics["main_decoded_ratio"] = (
+                main_grabber.decoded / main_grabber.captured if main_grabber.captured else 0.0
+            )
+        scheduler = get_inference_scheduler()
+        share = getattr(detector, "share", None)
+        if scheduler is not None and share is not None:
+            metrics.update(scheduler.snapshot())
+            metrics["channel_shed"] = share.shed
+        if self._writer is not None:
+            metrics.update(self._writer.snapshot())
+        self.metrics_ready.emit(channel_name, metrics)
+
+    def _set_tracks_active(self, active: bool) -> None:
+        self._tracks_active = active
+        if self._decode_schedule is not None:
+            self._decode_schedule.tracks_active = active
+        if self._main_gate is not None:
+            self._main_gate.set_tracking(active)
+
+    async def _capture_stage(
+        self, detect_queue: "asyncio.Queue[Optional[Union[_DetectJob, _MotionStopped]]]", pipeline, detector
+    ) -> None:
+        """Захват, движение, превью и переподключение; кадры для детектора уходят в ``detect_queue``.
+
+        Если детектор не успевает и очередь заполнена, кадр в неё не ставится:
+        захват и превью не ждут медленные стадии. Маркер остановки движения
+        по той же причине ставится без ожидания: при полной очереди попытка
+        повторяется на следующих кадрах.
+        """
+
+        # В двухпоточном канале цикл читает подпоток, основной поток — только для кропов.
+        source = self.config.substream_source or self.config.source
         channel_name = self.config.name
-        capture = await self._open_with_retries(source, self.config.name)
-        if capture is None:
+        grabber = await self._open_with_retries(source, self.config.name)
+        if grabber is None:
             logger.warning("Не удалось открыть источник %s для канала %s", source, self.config)
+            await detect_queue.put(None)
             return
+        main_gate = self._main_gate
+        main_grabber = await self._open_main_stream() if main_gate is not None else None
+        main_frames: Deque[CapturedFrame] = deque(maxlen=MAIN_FRAME_HISTORY)
+        main_shape = self._stream_shape(main_grabber)
+        last_main_retry_ts = time.monotonic()
         logger.info("Канал %s запущен (источник=%s)", channel_name, source)
+        if main_gate is not None:
+            logger.info("Канал %s: основной поток %s используется для кропов номеров", channel_name, self.config.source)
         waiting_for_motion = False
+        motion_stop_pending = False
         last_frame_ts = time.monotonic()
         last_reconnect_ts = last_frame_ts
-        while self._running:
-            now = time.monotonic()
-            if (
-                self.reconnect_policy.periodic_enabled
-                and self.reconnect_policy.periodic_reconnect_seconds > 0
-                and now - last_reconnect_ts >= self.reconnect_policy.periodic_reconnect_seconds
-            ):
-                self.status_ready.emit(channel_name, "Плановое переподключение...")
-                capture.release()
-                capture = await self._open_with_retries(source, channel_name)
-                if capture is None:
-                    logger.warning("Переподключение не удалось для канала %s", channel_name)
-                    break
-                last_reconnect_ts = time.monotonic()
-                last_frame_ts = last_reconnect_ts
-                continue
+        last_stats_ts = last_frame_ts
+        last_metrics_ts = last_frame_ts
+        processed_rate = RateMeter()
+        frame_index = 0
+        last_preview_ts = 0.0
+        frame_age = 0.0
+        try:
+            while self._running:
+                now = time.monotonic()
+                if now - last_stats_ts >= STATS_LOG_INTERVAL_SECONDS:
+                    self._log_channel_stats(pipeline, detector, channel_name)
+                    last_stats_ts = now
+                if now - last_metrics_ts >= METRICS_INTERVAL_SECONDS:
+                    self._emit_metrics(channel_name, grabber, processed_rate, frame_age, main_grabber, detector)
+                    last_metrics_ts = now
+                if (
+                    self.reconnect_policy.periodic_enabled
+                    and self.reconnect_policy.periodic_reconnect_seconds > 0
+                    and now - last_reconnect_ts >= self.reconnect_policy.periodic_reconnect_seconds
+                ):
+                    self.status_ready.emit(channel_name, "Плановое переподключение...")
+                    await self._executors.run(STAGE_CAPTURE, grabber.release)
+                    grabber = await self._open_with_retries(source, channel_name)
+                    if grabber is None:
+                        logger.warning("Переподключение не удалось для канала %s", channel_name)
+                        break
+                    if main_gate is not None:
+                        if main_grabber is not None:
+                            await self._executors.run(STAGE_CAPTURE, main_grabber.release)
+                        main_grabber = await self._open_main_stream()
+                        main_frames.clear()
+                        main_shape = self._stream_shape(main_grabber) or main_shape
+                    last_reconnect_ts = time.monotonic()
+                    last_frame_ts = last_reconnect_ts
+                    continue
+
+                captured = await self._executors.run(STAGE_CAPTURE, grabber.read, 0.5)
+                if captured is None:
+                    if grabber.last_read_failed and not self.reconnect_policy.enabled:
+                        self.status_ready.emit(channel_name, "Поток остановлен")
+                        logger.warning("Поток остановлен для канала %s", channel_name)
+                        break
 
-            ret, frame = await asyncio.to_thread(capture.read)
-            if not ret or frame is None:
-                if not self.reconnect_policy.enabled:
-                    self.status_ready.emit(channel_name, "Поток остановлен")
-                    logger.warning("Поток остановлен для канала %s", channel_name)
-                    break
+                    if time.monotonic() - last_frame_ts < self.reconnect_policy.frame_timeout_seconds:
+                        continue
 
-                if time.monotonic() - last_frame_ts < self.reconnect_policy.frame_timeout_seconds:
-                    await asyncio.sleep(0.05)
+                    self.status_ready.emit(channel_name, "Потеря сигнала, переподключение...")
+                    logger.warning("Потеря сигнала на канале %s, выполняем переподключение", channel_name)
+                    await self._executors.run(STAGE_CAPTURE, grabber.release)
+                    grabber = await self._open_with_retries(source, channel_name)
+                    if grabber is None:
+                        logger.warning("Переподключение не удалось для канала %s", channel_name)
+                        break
+                    last_reconnect_ts = time.monotonic()
+                    last_frame_ts = last_reconnect_ts
                     continue
 
-                self.status_ready.emit(channel_name, "Потеря сигнала, переподключение...")
-                logger.warning("Потеря сигнала на канале %s, выполняем переподключение", channel_name)
-                capture.release()
-                capture = await self._open_with_retries(source, channel_name)
-                if capture is None:
-                    logger.warning("Переподключение не удалось для канала %s", channel_name)
-                    break
-                last_reconnect_ts = time.monotonic()
-                last_frame_ts = last_reconnect_ts
-                continue
+                last_frame_ts = time.monotonic()
+                frame = captured.image
+                frame_age = last_frame_ts - captured.timestamp
+                processed_rate.tick()
+                frame_index += 1
+                purposes = captured.purposes
+                schedule = self._decode_schedule
 
-            last_frame_ts = time.monotonic()
+                roi_frame, roi_rect = self._extract_region(frame)
+                if purposes is None or PURPOSE_MOTION in purposes:
+                    keyframes_only = isinstance(grabber.capture, FFmpegCapture) and grabber.capture.idle
+                    motion_detected = await self._executors.run(
+                        STAGE_CAPTURE, self._motion_detected, roi_frame, keyframes_only
+                    )
+                else:
+                    motion_detected = self.config.detection_mode != "motion" or self.motion_detector.active
+                if schedule is not None:
+                    schedule.motion_active = motion_detected
+                if self.config.detection_mode == "motion" and isinstance(grabber.capture, FFmpegCapture):
+                    # Пока движения нет, ffmpeg может декодировать только ключевые кадры.
+                    grabber.capture.set_idle(not motion_detected)
+                if main_gate is not None:
+                    if main_grabber is not None:
+                        fresh = main_grabber.read(0.0)
+                        if fresh is not None:
+                            main_frames.append(fresh)
+                            main_shape = fresh.image.shape[:2]
+                        if isinstance(main_grabber.capture, FFmpegCapture):
+                            main_grabber.capture.set_idle(not main_gate.is_open(now))
+                    if (
+                        main_gate.is_open(now)
+                        and (main_grabber is None or main_grabber.last_read_failed)
+                        and now - last_main_retry_ts >= max(1.0, self.reconnect_policy.retry_interval_seconds)
+                    ):
+                        last_main_retry_ts = now
+                        if main_grabber is not None:
+                            await self._executors.run(STAGE_CAPTURE, main_grabber.release)
+                        main_grabber = await self._open_main_stream()
+                        main_shape = self._stream_shape(main_grabber) or main_shape
 
-            roi_frame, roi_rect = self._extract_region(frame)
-            motion_detected = self._motion_detected(roi_frame)
+                if not motion_detected:
+                    if not waiting_for_motion and self.config.detection_mode == "motion":
+                        self.status_ready.emit(channel_name, "Ожидание движения")
+                    if not waiting_for_motion:
+                        motion_stop_pending = True
+                    if motion_stop_pending and not detect_queue.full():
+                        detect_queue.put_nowait(_MotionStopped())
+                        motion_stop_pending = False
+                    waiting_for_motion = True
+                else:
+                    if waiting_for_motion:
+                        self.status_ready.emit(channel_name, "Движение обнаружено")
+                    waiting_for_motion = False
+                    # Движение вернулось раньше, чем маркер попал в очередь: треки снова ведёт детектор.
+                    motion_stop_pending = False
+                    if purposes is None:
+                        run_detector = self._inference_limiter.allow()
+                        run_prediction = self.config.predict_skipped_frames
+                    else:
+                        run_detector = PURPOSE_DETECT in purposes
+                        run_prediction = PURPOSE_TRACK in purposes
+                    if run_detector or run_prediction:
+                        main_image = self._nearest_main_frame(main_frames, captured.timestamp)
+                        job = _DetectJob(
+                            frame=frame,
+                            roi_frame=roi_frame,
+                            roi_rect=roi_rect,
+                            run_detector=run_detector,
+                            # Области движения снимаются сейчас: к моменту детекции анализ уйдёт вперёд.
+                            regions=self._detector_regions(roi_frame) if run_detector else None,
+                            main_image=main_image,
+                            main_shape=main_shape,
+                            frame_index=frame_index,
+                        )
+                        if detect_queue.full():
+                            self._stage_dropped += 1
+                            if run_detector:
+                                # Иначе детектор пропустил бы целое окно шага, а не один кадр.
+                                if purposes is None:
+                                    self._inference_limiter.rearm()
+                                elif schedule is not None:
+                                    schedule.rearm_detector()
+                        else:
+                            detect_queue.put_nowait(job)
 
-            if not motion_detected:
-                if not waiting_for_motion and self.config.detection_mode == "motion":
-                    self.status_ready.emit(channel_name, "Ожидание движения")
-                waiting_for_motion = True
+                self._update_stride(now, self._tracks_active)
+
+                preview_target = self.preview.target()
+                if self._decode_schedule is not None:
+                    self._decode_schedule.preview_enabled = preview_target.visible
+                if not preview_target.visible:
+                    continue
+                if purposes is None:
+                    show_preview = not self.config.preview_fps or now - last_preview_ts >= 1.0 / self.config.preview_fps
+                else:
+                    show_preview = PURPOSE_PREVIEW in purposes
+                if not show_preview:
+                    continue
+                last_preview_ts = now
+                self._publish_frame(channel_name, fit_preview(frame, preview_target))
+        finally:
+            if grabber is not None:
+                logger.info("Канал %s: пропущено кадров захвата: %d", channel_name, grabber.dropped)
+                await self._executors.run(STAGE_CAPTURE, grabber.release)
+            if main_grabber is not None:
+                logger.info(
+                    "Канал %s: основной поток декодирован для %d из %d кадров, кадров OCR из подпотока: %d",
+                    channel_name,
+                    main_grabber.decoded,
+                    main_grabber.captured,
+                    self._substream_crops,
+                )
+                await self._executors.run(STAGE_CAPTURE, main_grabber.release)
+        await detect_queue.put(None)
+
+    async def _detect_stage(
+        self,
+        detector,
+        inbox: "asyncio.Queue[Optional[Union[_DetectJob, _MotionStopped]]]",
+        outbox: "asyncio.Queue[Optional[_RecognizeJob]]",
+    ) -> None:
+        """Детектор и трекер; кадры обрабатываются строго в порядке захвата."""
+
+        while True:
+            job = await inbox.get()
+            if job is None:
+                await outbox.put(None)
+                return
+            if isinstance(job, _MotionStopped):
+                self._set_tracks_active(False)
+                continue
+            if job.run_detector:
+                started = time.monotonic()
+                if job.regions is None:
+                    detections = await self._executors.run(STAGE_DETECT, detector.track, job.roi_frame)
+                else:
+                    detections = await self._executors.run(
+                        STAGE_DETECT, detector.track_regions, job.roi_frame, job.regions
+                    )
+                if self._stride_controller is not None:
+                    self._stride_controller.observe_latency(time.monotonic() - started)
             else:
-                if waiting_for_motion:
-                    self.status_ready.emit(channel_name, "Движение обнаружено")
-                waiting_for_motion = False
-                if self._inference_limiter.allow():
-                    detections = await asyncio.to_thread(detector.track, roi_frame)
-                    detections = self._offset_detections(detections, roi_rect)
-                    results = await asyncio.to_thread(pipeline.process_frame, frame, detections)
-                    await self._process_events(storage, source, results, channel_name, frame)
-
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            height, width, channel = rgb_frame.shape
-            bytes_per_line = 3 * width
-            # Копируем буфер, чтобы предотвратить обращение Qt к уже освобожденной памяти
-            # во время перерисовок окна.
-            q_image = QtGui.QImage(
-                rgb_frame.data, width, height, bytes_per_line, QtGui.QImage.Format_RGB888
-            ).copy()
-            self.frame_ready.emit(channel_name, q_image)
-
-        capture.release()
-
-    def run(self) -> None:
+                # Детектор пропущен: OCR получает экстраполированные трекером боксы,
+                # поэтому быстрые машины не теряются при большом detector_frame_stride.
+                detections = detector.predict_tracks(job.roi_frame.shape)
+            self._set_tracks_active(bool(detections))
+            if not detections:
+                continue
+            detections = self._offset_detections(detections, job.roi_rect)
+            ocr_frame = job.frame
+            if job.main_image is not None:
+                ocr_frame = job.main_image
+            elif job.main_shape is not None:
+                # Кадра основного потока рядом нет (декодер только открылся после появления
+                # трека): OCR получает подпоток, увеличенный до основного, чтобы все боксы
+                # трека оставались в одних координатах.
+                self._substream_crops += 1
+                height, width = job.main_shape
+                ocr_frame = await self._executors.run(STAGE_DETECT, cv2.resize, job.frame, (width, height))
+            if ocr_frame is not job.frame:
+                detections = self._to_main_stream(detections, job.frame.shape, ocr_frame.shape)
+            # Очередь OCR не теряет кадры с треками: при заполнении детектор ждёт.
+            await outbox.put(_RecognizeJob(ocr_frame, detections, job.frame_index))
+
+    async def _recognize_stage(
+        self,
+        pipeline,
+        inbox: "asyncio.Queue[Optional[_RecognizeJob]]",
+        outbox: "asyncio.Queue[Optional[Tuple[list, cv2.Mat]]]",
+    ) -> None:
+        """OCR и агрегация по трекам в порядке кадров."""
+
+        while True:
+            job = await inbox.get()
+            if job is None:
+                await outbox.put(None)
+                return
+            results = await self._executors.run(
+                STAGE_OCR, pipeline.process_frame, job.frame, job.detections, job.frame_index
+            )
+            if results:
+                await outbox.put((results, job.frame))
+
+    async def _persist_stage(self, storage: EventDatabase, inbox: "asyncio.Queue[Optional[Tuple[list, cv2.Mat]]]") -> None:
+        """Скриншоты, запись в БД и сигналы событий в порядке их выдачи OCR."""
+
+        while True:
+            job = await inbox.get()
+            if job is None:
+                return
+            results, frame = job
+            await self._process_events(storage, self.config.source, results, self.config.name, frame)
+
+    @staticmethod
+    async def _run_stages(*stages) -> None:
+        """Запускает стадии канала; ошибка любой стадии останавливает остальные и пробрасывается."""
+
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in tasks:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    async def _loop(self) -> None:
+        pipeline, detector = await self._executors.run(STAGE_IO, self._build_pipeline)
+        storage = await self._executors.run(STAGE_IO, EventDatabase, self.db_path)
+
+        depths = self.config.stage_queues
+        detect_queue: "asyncio.Queue[Optional[Union[_DetectJob, _MotionStopped]]]" = asyncio.Queue(depths.detect)
+        recognize_queue: "asyncio.Queue[Optional[_RecognizeJob]]" = asyncio.Queue(depths.ocr)
+        persist_queue: "asyncio.Queue[Optional[Tuple[list, cv2.Mat]]]" = asyncio.Queue(depths.persist)
+        self._stage_queues = {"detect": detect_queue, "ocr": recognize_queue, "persist": persist_queue}
+        try:
+            # У каждой стадии один потребитель, поэтому кадры, треки и события
+            # проходят стадии в порядке захвата.
+            await self._run_stages(
+                self._capture_stage(detect_queue, pipeline, detector),
+                self._detect_stage(detector, detect_queue, recognize_queue),
+                self._recognize_stage(pipeline, recognize_queue, persist_queue),
+                self._persist_stage(storage, persist_queue),
+            )
+        finally:
+            self._log_channel_stats(pipeline, detector, self.config.name)
+
+    async def run_async(self, executors: StageExecutors, writer: ScreenshotWriter) -> None:
+        """Корутина канала; выполняется в цикле :class:`ChannelEngine`."""
+
+        self._executors = executors
+        self._writer = writer
         try:
-            asyncio.run(self._loop())
+            await self._loop()
         except Exception as exc:  # noqa: BLE001
+            self.crashed = True
             self.status_ready.emit(self.config.name, f"Ошибка: {exc}")
             logger.exception("Канал %s аварийно остановлен", self.config.name)
 
@@ -0,0 +1,194 @@
+# /anpr/workers/engine.py
+"""Общий цикл asyncio для всех каналов процесса.
+
+Корутины каналов (:meth:`ChannelWorker.run_async`) выполняются в одном цикле
+событий в потоке :class:`ChannelEngine`. Блокирующие вызовы каждой стадии
+выполняются в отдельном пуле потоков заданного размера: ``capture`` (чтение
+кадра, анализ движения, подключение источников), ``detect`` (детектор и трекер),
+``ocr`` (кропы и распознавание), ``io`` (БД, загрузка моделей). Скриншоты
+событий сжимает и пишет общий для каналов :class:`ScreenshotWriter`.
+Поэтому число потоков процесса известно заранее и не растёт с нагрузкой.
+Потоки torch и OpenCV распределяет план ядер (:mod:`anpr.inference.resources`).
+
+Сигналы каналов доходят до GUI через Qt: объекты :class:`ChannelWorker` живут
+в потоке GUI, поэтому сигналы, испущенные из потока движка, ставятся в очередь
+событий GUI.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, TypeVar
+
+import cv2
+from PyQt5 import QtCore
+
+from anpr.inference.resources import ResourceBudgetConfig, ResourcePlan, activate_plan, plan_threads
+from anpr.workers.screenshot_writer import ScreenshotWriter, ScreenshotWriterConfig
+from logging_manager import get_logger
+
+if TYPE_CHECKING:
+    from anpr.workers.channel_worker import ChannelWorker
+
+logger = get_logger(__name__)
+
+STAGE_CAPTURE = "capture"
+STAGE_DETECT = "detect"
+STAGE_OCR = "ocr"
+STAGE_IO = "io"
+STAGES = (STAGE_CAPTURE, STAGE_DETECT, STAGE_OCR, STAGE_IO)
+
+ENGINE_STOP_TIMEOUT_MS = 3000
+
+T = TypeVar("T")
+
+
+@dataclass
+class EngineConfig:
+    """Размеры пулов стадий и число потоков torch/OpenCV (раздел ``runtime``).
+
+    Нулевой размер пула ``capture``/``detect``/``ocr`` означает «по одному потоку
+    на канал»: каждый канал держит в стадии не больше одного вызова, а модели
+    работают в потоках пакетной обработки. Потоки torch и OpenCV задаёт план ядер
+    ``resources``; ненулевые ``torch_threads``/``opencv_threads`` переопределяют его.
+    Без плана torch получает половину ядер (детектор и OCR считают одновременно),
+    OpenCV — долю ядер на канал.
+    """
+
+    capture_threads: int = 0
+    detect_threads: int = 0
+    ocr_threads: int = 0
+    io_threads: int = 2
+    torch_threads: int = 0
+    opencv_threads: int = 0
+    resources: ResourceBudgetConfig = field(default_factory=ResourceBudgetConfig)
+    screenshot_writer: ScreenshotWriterConfig = field(default_factory=ScreenshotWriterConfig)
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "EngineConfig":
+        runtime_conf = config or {}
+        executors = runtime_conf.get("executors") or {}
+        return cls(
+            capture_threads=max(0, int(executors.get("capture", 0))),
+            detect_threads=max(0, int(executors.get("detect", 0))),
+            ocr_threads=max(0, int(executors.get("ocr", 0))),
+            io_threads=max(1, int(executors.get("io", 2))),
+            torch_threads=max(0, int(runtime_conf.get("torch_threads", 0))),
+            opencv_threads=max(0, int(runtime_conf.get("opencv_threads", 0))),
+            resources=ResourceBudgetConfig.from_dict(runtime_conf.get("resources")),
+            screenshot_writer=ScreenshotWriterConfig.from_dict(runtime_conf.get("screenshot_writer")),
+        )
+
+    def executor_sizes(self, channels: int) -> Dict[str, int]:
+        channels = max(1, channels)
+        return {
+            STAGE_CAPTURE: self.capture_threads or channels,
+            STAGE_DETECT: self.detect_threads or channels,
+            STAGE_OCR: self.ocr_threads or channels,
+            STAGE_IO: self.io_threads,
+        }
+
+    def thread_limits(self, channels: int) -> Dict[str, int]:
+        cores = os.cpu_count() or 1
+        return {
+            "torch": self.torch_threads or max(1, cores // 2),
+            "opencv": self.opencv_threads or max(1, cores // max(1, channels)),
+        }
+
+
+def limit_threads(torch_threads: int, opencv_threads: int) -> None:
+    """Ограничивает внутренние пулы torch и OpenCV процесса."""
+
+    cv2.setNumThreads(opencv_threads)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(torch_threads)
+
+
+class StageExecutors:
+    """Пулы потоков стадий канала."""
+
+    def __init__(self, sizes: Dict[str, int]) -> None:
+        self.sizes = dict(sizes)
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"anpr-{stage}")
+            for stage, size in self.sizes.items()
+        }
+
+    async def run(self, stage: str, func: Callable[..., T], *args: Any) -> T:
+        """Выполняет блокирующий ``func(*args)`` в пуле стадии ``stage``."""
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executors[stage], func, *args)
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+
+
+class ChannelEngine(QtCore.QThread):
+    """Поток с единым циклом asyncio для набора каналов.
+
+    Интерфейс ``start``/``stop``/``wait`` совпадает с прежними потоками каналов,
+    поэтому главное окно и процессы каналов запускают движок так же.
+    """
+
+    def __init__(
+        self,
+        workers: List["ChannelWorker"],
+        config: Optional[EngineConfig] = None,
+        cores: Optional[List[int]] = None,
+        parent=None,
+    ) -> None:
+        """``cores`` — ядра процесса каналов; по умолчанию план строится на всём бюджете."""
+
+        super().__init__(parent)
+        self.workers = list(workers)
+        self.config = config or EngineConfig()
+        self.sizes = self.config.executor_sizes(len(self.workers))
+        self.plan: Optional[ResourcePlan] = None
+        if self.config.resources.enabled:
+            self.plan = plan_threads(
+                len(self.workers),
+                self.config.resources,
+                cores=cores,
+                torch_threads=self.config.torch_threads,
+                opencv_threads=self.config.opencv_threads,
+            )
+            activate_plan(self.plan)
+            limits_text = self.plan.describe()
+        else:
+            limits = self.config.thread_limits(len(self.workers))
+            limit_threads(limits["torch"], limits["opencv"])
+            limits_text = f"torch={limits['torch']}, OpenCV={limits['opencv']}"
+        logger.info(
+            "Движок каналов: каналов=%d, потоки стадий %s; %s",
+            len(self.workers),
+            ", ".join(f"{stage}={self.sizes[stage]}" for stage in STAGES),
+            limits_text,
+        )
+
+    @property
+    def crashed(self) -> bool:
+        return any(worker.crashed for worker in self.workers)
+
+    async def _main(self) -> None:
+        executors = StageExecutors(self.sizes)
+        writer = ScreenshotWriter(self.config.screenshot_writer)
+        try:
+            await asyncio.gather(*(worker.run_async(executors, writer) for worker in self.workers))
+        finally:
+            executors.shutdown()
+            writer.close()
+
+    def run(self) -> None:
+        asyncio.run(self._main())
+
+    def stop(self) -> None:
+        for worker in self.workers:
+            worker.stop()
@@ -0,0 +1,116 @@
+# /anpr/workers/frame_ring.py
+"""Кольцо кадров превью в разделяемой памяти между процессом канала и GUI.
+
+Процесс канала пишет кадр в очередной слот и публикует его номер в заголовке,
+GUI читает только последний опубликованный кадр, пропущенные при этом кадры
+считаются в ``overwritten``. Кадры не сериализуются:
+копирование одно — из слота в ``QImage``. Слот защищён номером кадра (seqlock):
+если за время чтения писатель успел перезаписать слот, кадр отбрасывается.
+"""
+
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# Заголовок: номер последнего кадра, затем по слоту (номер кадра, высота, ширина, каналы).
+_GLOBAL_FIELDS = 1
+_SLOT_FIELDS = 4
+_FIELD = np.dtype(np.int64)
+
+
+class SharedFrameRing:
+    """Кольцо из ``slots`` кадров размером не больше ``max_width``×``max_height``.
+
+    Большие кадры уменьшаются с сохранением пропорций при записи.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, max_width: int, max_height: int, owner: bool) -> None:
+        self._shm = shm
+        self.slots = slots
+        self.max_width = max_width
+        self.max_height = max_height
+        self._owner = owner
+        header_size = (_GLOBAL_FIELDS + slots * _SLOT_FIELDS) * _FIELD.itemsize
+        self._header = np.ndarray((_GLOBAL_FIELDS + slots * _SLOT_FIELDS,), dtype=_FIELD, buffer=shm.buf)
+        slot_bytes = max_width * max_height * 3
+        self._pixels = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=shm.buf, offset=header_size)
+        self._last_read = 0
+        self.overwritten = 0
+
+    @classmethod
+    def create(cls, slots: int = 3, max_width: int = 960, max_height: int = 540) -> "SharedFrameRing":
+        slots = max(2, slots)
+        size = (_GLOBAL_FIELDS + slots * _SLOT_FIELDS) * _FIELD.itemsize + slots * max_width * max_height * 3
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), slots, max_width, max_height, owner=True)
+        ring._header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, slots: int, max_width: int, max_height: int) -> "SharedFrameRing":
+        return cls(shared_memory.SharedMemory(name=name), slots, max_width, max_height, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _slot_header(self, slot: int) -> np.ndarray:
+        start = _GLOBAL_FIELDS + slot * _SLOT_FIELDS
+        return self._header[start : start + _SLOT_FIELDS]
+
+    def _fit(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.max_width / float(width), self.max_height / float(height))
+        if scale >= 1.0:
+            return frame
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def write(self, frame: np.ndarray) -> None:
+        """Записывает кадр BGR или серый в следующий слот и публикует его."""
+
+        frame = self._fit(frame)
+        height, width = frame.shape[:2]
+        channels = 1 if frame.ndim == 2 else frame.shape[2]
+        seq = int(self._header[0]) + 1
+        slot = seq % self.slots
+        header = self._slot_header(slot)
+        # Пока слот пишется, номер в нём не совпадает ни с одним опубликованным.
+        header[0] = -seq
+        target = self._pixels[slot, : height * width * channels].reshape(frame.shape)
+        np.copyto(target, frame)
+        header[1:] = (height, width, channels)
+        header[0] = seq
+        self._header[0] = seq
+
+    def read_latest(self) -> Optional[np.ndarray]:
+        """Копия последнего кадра, если он новее прочитанного ранее, иначе ``None``."""
+
+        seq = int(self._header[0])
+        if seq <= self._last_read:
+            return None
+        slot = seq % self.slots
+        header = self._slot_header(slot)
+        if int(header[0]) != seq:
+            return None
+        height, width, channels = (int(value) for value in header[1:])
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        frame = self._pixels[slot, : height * width * channels].reshape(shape).copy()
+        if int(header[0]) != seq:
+            # Писатель обогнал чтение на целое кольцо: кадр мог порваться.
+            return None
+        if self._last_read:
+            self.overwritten += max(0, seq - self._last_read - 1)
+        self._last_read = seq
+        return frame
+
+    def close(self) -> None:
+        # Представления numpy держат буфер; без их освобождения close() падает с BufferError.
+        del self._header
+        del self._pixels
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
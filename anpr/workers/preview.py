@@ -0,0 +1,112 @@
+# /anpr/workers/preview.py
+"""Размер и видимость плитки превью, которые GUI сообщает каналу.
+
+GUI записывает размер области видео плитки и признак видимости в
+:class:`PreviewControl` канала. Рабочий цикл читает их на каждом кадре
+превью: кадр скрытого канала не декодируется и не отправляется, а видимый
+уменьшается до размера плитки ещё в потоке канала, до перевода в RGB и
+``QImage``. В режиме процессов значения лежат в разделяемом массиве, который
+процесс канала получает при запуске.
+
+Готовый кадр канал кладёт в :class:`LatestFrameSlot`, а не в очередь сигналов
+Qt: новый кадр заменяет непоказанный, GUI забирает по таймеру только последний.
+Пока поток GUI занят, на канал приходится не больше одного ждущего кадра.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+# Расхождение с размером плитки (в пикселях), при котором GUI уже не масштабирует кадр.
+TILE_SIZE_TOLERANCE = 2
+
+
+@dataclass(frozen=True)
+class PreviewTarget:
+    """Размер области видео плитки; нулевой размер — плитка ещё не разложена."""
+
+    width: int = 0
+    height: int = 0
+    visible: bool = True
+
+
+class PreviewControl:
+    """Цель превью одного канала: пишет поток GUI, читает рабочий цикл канала.
+
+    Три целых (ширина, высота, видимость) без блокировки: разорванное чтение
+    даёт один кадр неверного размера, который GUI всё равно отмасштабирует.
+    """
+
+    def __init__(self, values=None) -> None:
+        self._values = values if values is not None else [0, 0, 1]
+
+    @classmethod
+    def shared(cls, context) -> "PreviewControl":
+        """Цель в разделяемой памяти для процесса канала (``context`` — контекст ``multiprocessing``)."""
+
+        return cls(context.RawArray("i", [0, 0, 1]))
+
+    def set_target(self, width: int, height: int, visible: bool) -> None:
+        self._values[0] = max(0, int(width))
+        self._values[1] = max(0, int(height))
+        self._values[2] = 1 if visible else 0
+
+    def target(self) -> PreviewTarget:
+        width, height, visible = self._values[:3]
+        return PreviewTarget(int(width), int(height), bool(visible))
+
+
+class LatestFrameSlot:
+    """Слот последнего кадра превью канала: пишет канал, забирает таймер GUI.
+
+    ``overwritten`` — сколько кадров заменено новыми, не дождавшись показа.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._frame: Optional[Any] = None
+        self.published = 0
+        self.taken = 0
+        self.overwritten = 0
+
+    def put(self, frame: Any) -> None:
+        with self._lock:
+            if self._frame is not None:
+                self.overwritten += 1
+            self._frame = frame
+            self.published += 1
+
+    def take(self) -> Optional[Any]:
+        """Последний кадр, если он ещё не показан, иначе ``None``."""
+
+        with self._lock:
+            frame, self._frame = self._frame, None
+            if frame is not None:
+                self.taken += 1
+            return frame
+
+
+def fit_preview(frame: np.ndarray, target: Optional[PreviewTarget]) -> np.ndarray:
+    """Уменьшает кадр до размера плитки с сохранением пропорций; увеличение оставлено GUI."""
+
+    if target is None or target.width <= 0 or target.height <= 0:
+        return frame
+    height, width = frame.shape[:2]
+    scale = min(target.width / float(width), target.height / float(height))
+    if scale >= 1.0:
+        return frame
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+def fits_tile(image_width: int, image_height: int, tile_width: int, tile_height: int) -> bool:
+    """Кадр уже вписан в плитку: не больше её и касается её по одной из сторон."""
+
+    if image_width > tile_width or image_height > tile_height:
+        return False
+    return image_width >= tile_width - TILE_SIZE_TOLERANCE or image_height >= tile_height - TILE_SIZE_TOLERANCE
@@ -0,0 +1,427 @@
+# /anpr/workers/process_runtime.py
+"""Запуск каналов в отдельных процессах.
+
+Каждая группа из ``channels_per_process`` каналов работает в своём процессе со
+своим GIL, моделями и :class:`ChannelEngine`. Кадры превью идут в GUI через
+:class:`SharedFrameRing`, события, статусы и метрики — короткими кортежами через
+очередь процесса, записи логов — через отдельную очередь ``logging``. Супервизор
+в GUI перезапускает процесс, завершившийся с ошибкой, с растущей задержкой; очереди
+упавшего процесса не читаются (сообщение могло оборваться посередине) и
+создаются заново.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import cv2
+from PyQt5 import QtCore, QtGui
+
+from anpr.inference.resources import ResourceBudgetConfig, format_cores, plan_processes
+from anpr.inference.scheduler import ChannelShare, InferenceSchedulerConfig
+from anpr.workers.channel_worker import ChannelWorker
+from anpr.workers.engine import ENGINE_STOP_TIMEOUT_MS, ChannelEngine, EngineConfig
+from anpr.workers.frame_ring import SharedFrameRing
+from anpr.workers.preview import LatestFrameSlot, PreviewControl
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+RUNTIME_THREADS = "threads"
+RUNTIME_PROCESSES = "processes"
+
+POLL_INTERVAL_MS = 20
+STOP_TIMEOUT_MS = 5000
+# Процесс, проработавший дольше, считается стабильным: задержка перезапуска сбрасывается.
+STABLE_RUN_SECONDS = 60.0
+
+
+@dataclass
+class ProcessRuntimeConfig:
+    """Настройки раздела ``runtime``."""
+
+    mode: str = RUNTIME_THREADS
+    channels_per_process: int = 1
+    restart_delay_seconds: float = 2.0
+    max_restart_delay_seconds: float = 30.0
+    threads_per_process: int = 0
+    ring_slots: int = 3
+    preview_max_width: int = 960
+    preview_max_height: int = 540
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "ProcessRuntimeConfig":
+        runtime_conf = config or {}
+        mode = str(runtime_conf.get("mode") or RUNTIME_THREADS).strip().lower()
+        return cls(
+            mode=mode if mode in (RUNTIME_THREADS, RUNTIME_PROCESSES) else RUNTIME_THREADS,
+            channels_per_process=max(1, int(runtime_conf.get("channels_per_process", 1))),
+            restart_delay_seconds=max(0.1, float(runtime_conf.get("restart_delay_seconds", 2.0))),
+            max_restart_delay_seconds=max(0.1, float(runtime_conf.get("max_restart_delay_seconds", 30.0))),
+            threads_per_process=max(0, int(runtime_conf.get("threads_per_process", 0))),
+            ring_slots=max(2, int(runtime_conf.get("ring_slots", 3))),
+            preview_max_width=max(64, int(runtime_conf.get("preview_max_width", 960))),
+            preview_max_height=max(64, int(runtime_conf.get("preview_max_height", 540))),
+        )
+
+
+class ProcessChannelWorker(ChannelWorker):
+    """:class:`ChannelWorker` внутри процесса канала: кадры — в кольцо, сигналы — в очередь."""
+
+    def __init__(
+        self, channel_conf: Dict, ring: SharedFrameRing, preview: PreviewControl, messages, *args, **kwargs
+    ) -> None:
+        super().__init__(channel_conf, *args, **kwargs)
+        self.ring = ring
+        # Размер плитки и видимость пишет супервизор в GUI.
+        self.preview = preview
+        # Прямое соединение: в процессе канала нет цикла событий Qt.
+        direct = QtCore.Qt.DirectConnection
+        self.event_ready.connect(lambda event: messages.put(("event", event)), direct)
+        self.status_ready.connect(lambda name, text: messages.put(("status", name, text)), direct)
+        self.metrics_ready.connect(lambda name, metrics: messages.put(("metrics", name, metrics)), direct)
+
+    def _publish_frame(self, channel_name: str, frame: cv2.Mat) -> None:
+        self.ring.write(frame)
+
+
+def run_channel_process(
+    channel_confs: List[Dict[str, Any]],
+    rings: Dict[str, str],
+    previews: Dict[str, PreviewControl],
+    runtime_conf: Dict[str, Any],
+    db_path: str,
+    screenshot_dir: str,
+    reconnect_conf: Optional[Dict[str, Any]],
+    inference_conf: Optional[Dict[str, Any]],
+    messages,
+    log_records,
+    log_level: int,
+    stop_event,
+    threads: int,
+    cores: List[int],
+) -> None:
+    """Точка входа процесса канала; код выхода 1 — хотя бы один канал упал.
+
+    ``cores`` — ядра процесса из плана супервизора (пусто — план выключен).
+    """
+
+    root_logger = logging.getLogger()
+    root_logger.handlers.clear()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_records))
+    root_logger.setLevel(log_level)
+
+    config = ProcessRuntimeConfig.from_dict(runtime_conf)
+    engine_config = EngineConfig.from_dict(runtime_conf)
+    if engine_config.resources.enabled:
+        if cores and engine_config.resources.pin_affinity and hasattr(os, "sched_setaffinity"):
+            # До загрузки моделей: пулы OpenMP и OpenCV наследуют привязку процесса.
+            try:
+                os.sched_setaffinity(0, cores)
+            except OSError as exc:
+                logger.warning("Процесс %d: не удалось привязать к ядрам %s: %s", os.getpid(), cores, exc)
+        # Резерв ядер под GUI уже вычтен супервизором: ядра процесса целиком отданы инференсу.
+        engine_config = dataclasses.replace(
+            engine_config,
+            resources=dataclasses.replace(engine_config.resources, reserve_cores=0),
+            torch_threads=config.threads_per_process,
+        )
+    else:
+        engine_config = dataclasses.replace(engine_config, torch_threads=threads, opencv_threads=threads)
+    workers: List[ProcessChannelWorker] = []
+    attached: List[SharedFrameRing] = []
+    for channel_conf in channel_confs:
+        name = channel_conf.get("name", "Канал")
+        ring = SharedFrameRing.attach(rings[name], config.ring_slots, config.preview_max_width, config.preview_max_height)
+        attached.append(ring)
+        worker = ProcessChannelWorker(
+            channel_conf, ring, previews[name], messages, db_path, screenshot_dir, reconnect_conf, inference_conf
+        )
+        workers.append(worker)
+    engine = ChannelEngine(workers, engine_config, cores=cores or None)
+    engine.start()
+    logger.info("Процесс %d: запущено каналов %d, потоков %d", os.getpid(), len(workers), threads)
+
+    while not stop_event.wait(0.5):
+        if engine.isFinished():
+            break
+    engine.stop()
+    engine.wait(ENGINE_STOP_TIMEOUT_MS)
+    for ring in attached:
+        ring.close()
+    crashed = engine.crashed
+    # Записи логов и сообщения должны уйти до выхода процесса.
+    messages.close()
+    messages.join_thread()
+    log_records.close()
+    log_records.join_thread()
+    raise SystemExit(1 if crashed else 0)
+
+
+@dataclass
+class _ChannelProcess:
+    """Группа каналов одного процесса и состояние её перезапусков."""
+
+    channel_confs: List[Dict[str, Any]]
+    process: Optional[multiprocessing.process.BaseProcess] = None
+    messages: Any = None
+    log_listener: Optional[logging.handlers.QueueListener] = None
+    started_at: float = 0.0
+    restart_delay: float = 0.0
+    restart_at: float = 0.0
+    restarts: int = 0
+    names: List[str] = field(default_factory=list)
+    cores: List[int] = field(default_factory=list)
+
+
+class RingFrameSlot(LatestFrameSlot):
+    """Слот последнего кадра поверх кольца процесса канала.
+
+    Кольцо уже хранит только свежие кадры, поэтому :meth:`take` читает его
+    напрямую, в момент показа, а перезаписанными считаются пропущенные номера кадров.
+    """
+
+    def __init__(self, ring: SharedFrameRing) -> None:
+        super().__init__()
+        self.ring = ring
+
+    def take(self) -> Optional[QtGui.QImage]:
+        frame = self.ring.read_latest()
+        self.overwritten = self.ring.overwritten
+        if frame is None:
+            return None
+        self.taken += 1
+        return ChannelWorker._to_qimage(frame)
+
+
+class ChannelProcessSupervisor(QtCore.QObject):
+    """Запускает процессы каналов и транслирует их сообщения в сигналы Qt.
+
+    Сигналы совпадают с сигналами :class:`ChannelWorker`, а ``stop``/``wait`` — с
+    его методами, поэтому главное окно подключает супервизор так же, как потоки.
+    Кадры превью GUI забирает сам через ``frame_slots``.
+    """
+
+    event_ready = QtCore.pyqtSignal(dict)
+    status_ready = QtCore.pyqtSignal(str, str)
+    metrics_ready = QtCore.pyqtSignal(str, dict)
+
+    def __init__(
+        self,
+        channel_confs: List[Dict[str, Any]],
+        db_path: str,
+        screenshot_dir: str,
+        reconnect_conf: Optional[Dict[str, Any]] = None,
+        inference_conf: Optional[Dict[str, Any]] = None,
+        runtime_conf: Optional[Dict[str, Any]] = None,
+        parent=None,
+    ) -> None:
+        super().__init__(parent)
+        self.runtime_conf = runtime_conf or {}
+        self.config = ProcessRuntimeConfig.from_dict(self.runtime_conf)
+        self.db_path = db_path
+        self.screenshot_dir = screenshot_dir
+        self.reconnect_conf = reconnect_conf
+        self.inference_conf = inference_conf
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._rings: Dict[str, SharedFrameRing] = {}
+        # Цели превью переживают перезапуск процесса: новый процесс получает последний размер плитки.
+        self._previews: Dict[str, PreviewControl] = {}
+        self.frame_slots: Dict[str, RingFrameSlot] = {}
+        step = self.config.channels_per_process
+        self._groups = [
+            _ChannelProcess(channel_confs[i : i + step], names=[conf.get("name", "Канал") for conf in channel_confs[i : i + step]])
+            for i in range(0, len(channel_confs), step)
+        ]
+        self._threads = self.config.threads_per_process or max(1, (os.cpu_count() or 1) // max(1, len(self._groups)))
+        self._warn_split_scheduler(channel_confs)
+        budget = ResourceBudgetConfig.from_dict(self.runtime_conf.get("resources"))
+        if budget.enabled and self._groups:
+            assignments = plan_processes(
+                [group.names for group in self._groups], budget, self.config.threads_per_process
+            )
+            for group, assignment in zip(self._groups, assignments):
+                group.cores = assignment.cores
+                logger.info(
+                    "План CPU: процесс каналов %s — ядра %s, потоков torch до %d%s",
+                    ", ".join(assignment.names),
+                    format_cores(assignment.cores),
+                    assignment.threads,
+                    " (с привязкой)" if budget.pin_affinity else "",
+                )
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(POLL_INTERVAL_MS)
+        self._timer.timeout.connect(self._poll)
+
+    def start(self) -> None:
+        for group in self._groups:
+            for name in group.names:
+                self._rings[name] = SharedFrameRing.create(
+                    self.config.ring_slots, self.config.preview_max_width, self.config.preview_max_height
+                )
+                self._previews[name] = PreviewControl.shared(self._context)
+                self.frame_slots[name] = RingFrameSlot(self._rings[name])
+            self._spawn(group)
+        self._timer.start()
+        logger.info(
+            "Каналы запущены в %d процессах (каналов на процесс: %d, потоков на процесс: %d)",
+            len(self._groups),
+            self.config.channels_per_process,
+            self._threads,
+        )
+
+    def _spawn(self, group: _ChannelProcess) -> None:
+        group.messages = self._context.Queue()
+        log_records = self._context.Queue()
+        group.log_listener = logging.handlers.QueueListener(
+            log_records, *logging.getLogger().handlers, respect_handler_level=True
+        )
+        group.log_listener.start()
+        group.process = self._context.Process(
+            target=run_channel_process,
+            args=(
+                group.channel_confs,
+                {name: self._rings[name].name for name in group.names},
+                {name: self._previews[name] for name in group.names},
+                self.runtime_conf,
+                self.db_path,
+                self.screenshot_dir,
+                self.reconnect_conf,
+                self.inference_conf,
+                group.messages,
+                log_records,
+                logging.getLogger().level,
+                self._stop_event,
+                self._threads,
+                group.cores,
+            ),
+            name=f"anpr-{'-'.join(group.names)}",
+            daemon=True,
+        )
+        group.process.start()
+        group.started_at = time.monotonic()
+        group.restart_at = 0.0
+
+    def _warn_split_scheduler(self, channel_confs: List[Dict[str, Any]]) -> None:
+        """Приоритеты и веса каналов действуют только внутри одного процесса каналов."""
+
+        scheduler_conf = InferenceSchedulerConfig.from_dict((self.inference_conf or {}).get("scheduler"))
+        if not scheduler_conf.enabled or len(self._groups) < 2:
+            return
+        shares = [
+            ChannelShare.from_channel(conf.get("name", "Канал"), conf.get("inference_weight"), conf.get("inference_priority"))
+            for conf in channel_confs
+        ]
+        if any(share.high or share.weight != 1.0 for share in shares):
+            logger.warning(
+                "Приоритеты и веса инференса действуют только между каналами одного процесса "
+                "(каналов на процесс: %d, процессов: %d)",
+                self.config.channels_per_process,
+                len(self._groups),
+            )
+
+    def set_preview_target(self, channel_name: str, width: int, height: int, visible: bool) -> None:
+        """Передаёт процессу канала размер плитки и её видимость."""
+
+        preview = self._previews.get(channel_name)
+        if preview is not None:
+            preview.set_target(width, height, visible)
+
+    def _poll(self) -> None:
+        for group in self._groups:
+            if group.messages is not None:
+                self._drain_messages(group.messages)
+        self._supervise()
+
+    def _drain_messages(self, messages, limit: int = 500) -> None:
+        for _ in range(limit):
+            try:
+                message = messages.get_nowait()
+            except queue.Empty:
+                return
+            kind = message[0]
+            if kind == "event":
+                self.event_ready.emit(message[1])
+            elif kind == "status":
+                self.status_ready.emit(message[1], message[2])
+            elif kind == "metrics":
+                self.metrics_ready.emit(message[1], message[2])
+
+    def _supervise(self) -> None:
+        if self._stop_event.is_set():
+            return
+        now = time.monotonic()
+        for group in self._groups:
+            process = group.process
+            if process is None:
+                continue
+            if group.restart_at:
+                if now >= group.restart_at:
+                    group.restarts += 1
+                    logger.warning("Перезапуск процесса каналов %s (попытка %d)", ", ".join(group.names), group.restarts)
+                    self._spawn(group)
+                continue
+            if process.is_alive() or process.exitcode == 0:
+                continue
+            # Упавший процесс мог оборвать запись в очередь: её больше не читаем.
+            group.messages = None
+            group.log_listener.enqueue_sentinel()
+            group.log_listener = None
+            if now - group.started_at >= STABLE_RUN_SECONDS:
+                group.restart_delay = 0.0
+            group.restart_delay = min(
+                self.config.max_restart_delay_seconds,
+                group.restart_delay * 2 if group.restart_delay else self.config.restart_delay_seconds,
+            )
+            group.restart_at = now + group.restart_delay
+            logger.error(
+                "Процесс каналов %s завершился с кодом %s, перезапуск через %.1f с",
+                ", ".join(group.names),
+                process.exitcode,
+                group.restart_delay,
+            )
+            for name in group.names:
+                self.status_ready.emit(name, f"Сбой процесса, перезапуск через {group.restart_delay:.1f}с")
+
+    def stop(self) -> None:
+        self._timer.stop()
+        self._stop_event.set()
+
+    def wait(self, msecs: int = STOP_TIMEOUT_MS) -> bool:
+        """Ждёт завершения процессов, зависшие завершает принудительно."""
+
+        deadline = time.monotonic() + msecs / 1000.0
+        for group in self._groups:
+            if group.process is not None:
+                group.process.join(max(0.0, deadline - time.monotonic()))
+        stopped = True
+        for group in self._groups:
+            if group.process is not None and group.process.is_alive():
+                logger.warning("Процесс каналов %s не завершился, останавливаем принудительно", ", ".join(group.names))
+                group.process.terminate()
+                group.process.join(1.0)
+                stopped = False
+        for group in self._groups:
+            if group.messages is not None and stopped:
+                self._drain_messages(group.messages)
+            group.messages = None
+            if group.log_listener is not None:
+                if stopped:
+                    group.log_listener.stop()
+                else:
+                    group.log_listener.enqueue_sentinel()
+                group.log_listener = None
+        self.frame_slots = {}
+        for ring in self._rings.values():
+            ring.close()
+        self._rings = {}
+        return stopped
@@ -0,0 +1,248 @@
+# /anpr/workers/screenshot_writer.py
+"""Фоновая запись скриншотов событий.
+
+:class:`ScreenshotWriter` принимает задания «сжать в JPEG и сохранить» от всех
+каналов движка. Каждое задание возвращает :class:`~concurrent.futures.Future`
+с путём к файлу или ``None``, если файл не записан. Так строка события
+попадает в БД только после того, как файлы уже на диске. Очередь ограничена
+``max_queue``. При переполнении политика ``drop_frame`` не пишет полный кадр
+события, а кроп номера ставит в резерв ещё на ``plate_reserve`` заданий; когда
+занят и резерв, сбрасывается и кроп. Очередь никогда не длиннее
+``max_queue + plate_reserve``. Политика ``block`` заставляет отправителя ждать
+места (стадия записи канала притормаживает, и конвейер канала ждёт её, как при
+полной очереди ``persist``).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from logging_manager import get_logger
+
+logger = get_logger(__name__)
+
+KIND_FRAME = "frame"
+KIND_PLATE = "plate"
+
+OVERFLOW_DROP_FRAME = "drop_frame"
+OVERFLOW_BLOCK = "block"
+_OVERFLOW_POLICIES = (OVERFLOW_DROP_FRAME, OVERFLOW_BLOCK)
+
+STATS_LOG_INTERVAL_SECONDS = 60.0
+
+
+@dataclass
+class ScreenshotWriterConfig:
+    """Параметры раздела ``runtime.screenshot_writer``.
+
+    ``frame_max_width`` уменьшает полный кадр события перед сжатием (0 — исходный
+    размер); кроп номера сохраняется как есть. ``plate_reserve`` — сколько
+    кропов номера политика ``drop_frame`` ставит в очередь сверх ``max_queue``.
+    """
+
+    threads: int = 2
+    max_queue: int = 32
+    plate_reserve: int = 8
+    jpeg_quality: int = 90
+    frame_max_width: int = 0
+    overflow: str = OVERFLOW_DROP_FRAME
+
+    @classmethod
+    def from_dict(cls, config: Optional[Dict[str, Any]]) -> "ScreenshotWriterConfig":
+        writer_conf = config or {}
+        overflow = str(writer_conf.get("overflow") or OVERFLOW_DROP_FRAME).strip().lower()
+        return cls(
+            threads=max(1, int(writer_conf.get("threads", 2))),
+            max_queue=max(1, int(writer_conf.get("max_queue", 32))),
+            plate_reserve=max(0, int(writer_conf.get("plate_reserve", 8))),
+            jpeg_quality=min(100, max(1, int(writer_conf.get("jpeg_quality", 90)))),
+            frame_max_width=max(0, int(writer_conf.get("frame_max_width", 0))),
+            overflow=overflow if overflow in _OVERFLOW_POLICIES else OVERFLOW_DROP_FRAME,
+        )
+
+
+@dataclass
+class ScreenshotWriterStats:
+    """Счётчики записи: задания, сброшенные кадры и кропы, очередь и задержка (от постановки до записи).
+
+    ``reserved`` — кропы номера, поставленные в резерв сверх ``max_queue``.
+    """
+
+    submitted: int = 0
+    written: int = 0
+    failed: int = 0
+    dropped: int = 0
+    dropped_plates: int = 0
+    reserved: int = 0
+    backlog: int = 0
+    max_backlog: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+
+    @property
+    def mean_latency_ms(self) -> float:
+        done = self.written + self.failed
+        return self.latency_total / done * 1000 if done else 0.0
+
+
+@dataclass
+class _WriteJob:
+    path: str
+    image: np.ndarray
+    kind: str
+    future: Future
+    enqueued_at: float
+
+
+class ScreenshotWriter:
+    """Пул потоков записи скриншотов с ограниченной очередью."""
+
+    def __init__(self, config: ScreenshotWriterConfig) -> None:
+        self.config = config
+        self.stats = ScreenshotWriterStats()
+        self._jobs: Deque[_WriteJob] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._last_log = time.monotonic()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"anpr-screenshots-{index}", daemon=True)
+            for index in range(config.threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(
+            "Запись скриншотов: потоков=%d, очередь=%d (+%d для кропов), JPEG %d, ширина кадра %s, переполнение=%s",
+            config.threads,
+            config.max_queue,
+            config.plate_reserve,
+            config.jpeg_quality,
+            config.frame_max_width or "исходная",
+            config.overflow,
+        )
+
+    def submit(self, path: str, image: Optional[np.ndarray], kind: str = KIND_FRAME) -> "Future[Optional[str]]":
+        """Ставит изображение в очередь записи; future вернёт путь или ``None``.
+
+        При политике ``block`` и полной очереди вызов ждёт места, поэтому из
+        цикла asyncio его вызывают через пул потоков.
+        """
+
+        future: "Future[Optional[str]]" = Future()
+        if image is None or image.size == 0:
+            future.set_result(None)
+            return future
+        with self._condition:
+            self.stats.submitted += 1
+            if self.config.overflow == OVERFLOW_BLOCK:
+                while len(self._jobs) >= self.config.max_queue and not self._closed:
+                    self._condition.wait()
+            elif len(self._jobs) >= self.config.max_queue:
+                # Полный кадр — контекст события; кроп номера важнее и занимает резерв.
+                if kind == KIND_FRAME:
+                    self.stats.dropped += 1
+                    future.set_result(None)
+                    return future
+                if len(self._jobs) >= self.config.max_queue + self.config.plate_reserve:
+                    self.stats.dropped_plates += 1
+                    future.set_result(None)
+                    return future
+                self.stats.reserved += 1
+            if self._closed:
+                future.set_result(None)
+                return future
+            self._jobs.append(_WriteJob(path, image, kind, future, time.monotonic()))
+            self.stats.backlog = len(self._jobs)
+            self.stats.max_backlog = max(self.stats.max_backlog, self.stats.backlog)
+            self._condition.notify_all()
+        return future
+
+    def submit_event(
+        self, frame_path: str, frame: Optional[np.ndarray], plate_path: str, plate_crop: Optional[np.ndarray]
+    ) -> Tuple["Future[Optional[str]]", "Future[Optional[str]]"]:
+        """Кадр и кроп номера одного события."""
+
+        return self.submit(frame_path, frame, KIND_FRAME), self.submit(plate_path, plate_crop, KIND_PLATE)
+
+    def _encode(self, job: _WriteJob) -> bool:
+        image = job.image
+        max_width = self.config.frame_max_width
+        if job.kind == KIND_FRAME and max_width and image.shape[1] > max_width:
+            height, width = image.shape[:2]
+            image = cv2.resize(image, (max_width, max(1, height * max_width // width)), interpolation=cv2.INTER_AREA)
+        os.makedirs(os.path.dirname(job.path), exist_ok=True)
+        return bool(cv2.imwrite(job.path, image, [cv2.IMWRITE_JPEG_QUALITY, self.config.jpeg_quality]))
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._jobs and not self._closed:
+                    self._condition.wait()
+                if not self._jobs:
+                    return
+                job = self._jobs.popleft()
+                self.stats.backlog = len(self._jobs)
+                self._condition.notify_all()
+            try:
+                written = self._encode(job)
+            except Exception:  # noqa: BLE001
+                logger.exception("Не удалось сохранить скриншот по пути %s", job.path)
+                written = False
+            latency = time.monotonic() - job.enqueued_at
+            with self._condition:
+                if written:
+                    self.stats.written += 1
+                else:
+                    self.stats.failed += 1
+                self.stats.latency_total += latency
+                self.stats.latency_max = max(self.stats.latency_max, latency)
+                now = time.monotonic()
+                log_stats = now - self._last_log >= STATS_LOG_INTERVAL_SECONDS
+                if log_stats:
+                    self._last_log = now
+            job.future.set_result(job.path if written else None)
+            if log_stats:
+                self.log_stats()
+
+    def log_stats(self) -> None:
+        stats = self.stats
+        logger.info(
+            "Запись скриншотов: записано=%d, ошибок=%d, сброшено кадров=%d, кропов=%d, кропов в резерве=%d, "
+            "очередь=%d (макс. %d), задержка %.1f мс (макс. %.1f мс)",
+            stats.written,
+            stats.failed,
+            stats.dropped,
+            stats.dropped_plates,
+            stats.reserved,
+            stats.backlog,
+            stats.max_backlog,
+            stats.mean_latency_ms,
+            stats.latency_max * 1000,
+        )
+
+    def close(self) -> None:
+        """Дописывает очередь и останавливает потоки."""
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self.log_stats()
+
+    def snapshot(self) -> Dict[str, float]:
+        """Очередь, сброшенные задания и средняя задержка записи для метрик канала."""
+
+        return {
+            "screenshot_backlog": self.stats.backlog,
+            "screenshot_dropped": self.stats.dropped + self.stats.dropped_plates,
+            "screenshot_latency_ms": self.stats.mean_latency_ms,
+        }
@@ -0,0 +1,98 @@
+# /anpr_export.py
+"""Экспорт моделей для ONNX Runtime / OpenVINO и проверка паритета с PyTorch.
+
+Примеры::
+
+    python anpr_export.py --target all --format onnx --check
+    python anpr_export.py --target ocr --format openvino --check --samples data/plates
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+from typing import List
+
+import cv2
+import numpy as np
+
+from anpr.config import ModelConfig
+from anpr.inference.backends import BACKEND_ONNXRUNTIME, BACKEND_OPENVINO
+from anpr.inference.export import (
+    check_detector_parity,
+    check_ocr_parity,
+    export_detector,
+    export_ocr_onnx,
+    export_ocr_openvino,
+)
+from logging_manager import LoggingManager, get_logger
+
+logger = get_logger(__name__)
+
+
+def _load_samples(path: str | None, limit: int) -> List[np.ndarray]:
+    """Читает изображения из папки или кадры из видеофайла."""
+
+    if not path:
+        return []
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.png")))
+        images = [cv2.imread(file) for file in files[:limit]]
+        return [image for image in images if image is not None]
+
+    capture = cv2.VideoCapture(path)
+    frames: List[np.ndarray] = []
+    while len(frames) < limit:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def _synthetic_crops(count: int) -> List[np.ndarray]:
+    rng = np.random.default_rng(0)
+    return [
+        cv2.resize(rng.integers(0, 256, (10, 40, 3), dtype=np.uint8), (160, 40), interpolation=cv2.INTER_CUBIC)
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Экспорт детектора и OCR для ONNX Runtime / OpenVINO.")
+    parser.add_argument("--target", choices=("detector", "ocr", "all"), default="all")
+    parser.add_argument("--format", choices=("onnx", "openvino"), default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640, help="Размер входа детектора при экспорте.")
+    parser.add_argument("--check", action="store_true", help="Сравнить экспортированные модели с PyTorch.")
+    parser.add_argument(
+        "--samples",
+        help="Папка с изображениями или видеофайл для проверки паритета (кадры для детектора, кропы для OCR).",
+    )
+    parser.add_argument("--limit", type=int, default=32, help="Максимум образцов для проверки.")
+    args = parser.parse_args()
+
+    LoggingManager()
+    backend = BACKEND_ONNXRUNTIME if args.format == "onnx" else BACKEND_OPENVINO
+    samples = _load_samples(args.samples, args.limit)
+
+    if args.target in ("detector", "all"):
+        path = export_detector(args.format, ModelConfig.YOLO_MODEL_PATH, args.imgsz)
+        print(f"Детектор: {path}")
+        if args.check:
+            if samples:
+                print(f"  паритет детектора: {check_detector_parity(backend, samples).summary()}")
+            else:
+                print("  паритет детектора: пропущен, укажите --samples с кадрами")
+
+    if args.target in ("ocr", "all"):
+        path = export_ocr_onnx() if args.format == "onnx" else export_ocr_openvino()
+        print(f"OCR: {path}")
+        if args.check:
+            crops = samples or _synthetic_crops(args.limit)
+            print(f"  паритет OCR: {check_ocr_parity(backend, crops).summary()}")
+
+
+if __name__ == "__main__":
+    main()
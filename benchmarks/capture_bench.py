@@ -0,0 +1,98 @@
+# /benchmarks/capture_bench.py
+"""Бенчмарк источников кадров на одном ролике.
+
+Сравнивает ``cv2.VideoCapture`` с :class:`FFmpegCapture` в нескольких режимах
+(исходный размер, масштабирование в декодере, ``gray``, только ключевые кадры).
+Ролик читается без ``-re`` так быстро, как позволяет декодер; для каждого режима
+печатаются кадры в секунду и процессорное время на кадр — своего процесса и
+дочернего процесса ffmpeg.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.capture_bench --video clip.mp4 --width 640
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Callable, Optional, Tuple
+
+import cv2
+import psutil
+
+from anpr.capture.ffmpeg_source import FFmpegCapture, FFmpegCaptureConfig
+
+
+def _run(capture, limit: int) -> Tuple[int, float, float, float]:
+    """Читает до ``limit`` кадров: ``(кадры, секунды, CPU своего процесса, CPU ffmpeg)``."""
+
+    pid: Optional[int] = getattr(capture, "pid", None)
+    child = psutil.Process(pid) if pid else None
+    own_start = sum(os.times()[:2])
+    child_start = sum(child.cpu_times()[:2]) if child else 0.0
+    child_cpu = 0.0
+    frames = 0
+    start = time.perf_counter()
+    while frames < limit:
+        if child is not None:
+            # Процесс ffmpeg завершится на конце файла, время снимается заранее.
+            child_cpu = sum(child.cpu_times()[:2]) - child_start
+        ret, frame = capture.read()
+        if not ret or frame is None:
+            break
+        frames += 1
+    elapsed = time.perf_counter() - start
+    own_cpu = sum(os.times()[:2]) - own_start
+    capture.release()
+    return frames, elapsed, own_cpu, child_cpu
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Скорость и загрузка CPU при чтении ролика разными источниками.")
+    parser.add_argument("--video", required=True, help="Записанный ролик с камеры.")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="Путь к исполняемому файлу ffmpeg.")
+    parser.add_argument("--width", type=int, default=640, help="Ширина для масштабирования в декодере.")
+    parser.add_argument("--frames", type=int, default=1000, help="Сколько кадров читать в каждом режиме.")
+    args = parser.parse_args()
+
+    def ffmpeg(**options) -> Callable[[], FFmpegCapture]:
+        config = FFmpegCaptureConfig(ffmpeg_path=args.ffmpeg, realtime=False, **options)
+
+        def factory() -> FFmpegCapture:
+            capture = FFmpegCapture(args.video, config)
+            if config.idle_keyframes:
+                # Первый grab перезапускает ffmpeg в режиме ожидания (-skip_frame nokey).
+                capture.set_idle(True)
+                capture.grab()
+            return capture
+
+        return factory
+
+    modes = [
+        ("opencv", lambda: cv2.VideoCapture(args.video)),
+        ("ffmpeg bgr24", ffmpeg()),
+        (f"ffmpeg {args.width}px", ffmpeg(width=args.width)),
+        (f"ffmpeg {args.width}px gray", ffmpeg(width=args.width, pix_fmt="gray")),
+        ("ffmpeg keyframes", ffmpeg(idle_keyframes=True)),
+    ]
+
+    print(f"{'режим':<24}{'кадров':>8}{'кадр/с':>10}{'CPU мс/кадр':>14}{'ffmpeg мс/кадр':>16}")
+    for name, factory in modes:
+        capture = factory()
+        if not capture.isOpened():
+            print(f"{name:<24}не открылся")
+            continue
+        frames, elapsed, own_cpu, child_cpu = _run(capture, args.frames)
+        if not frames:
+            print(f"{name:<24}нет кадров")
+            continue
+        print(
+            f"{name:<24}{frames:>8d}{frames / elapsed:>10.1f}"
+            f"{own_cpu / frames * 1000:>14.2f}{child_cpu / frames * 1000:>16.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
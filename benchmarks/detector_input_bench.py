@@ -0,0 +1,102 @@
+# /benchmarks/detector_input_bench.py
+"""Бенчмарк размера входа детектора на записанном ролике.
+
+Для каждого ``detector_input_size`` кадр уменьшается так же, как в
+:class:`ChannelDetector`, прогоняется через YOLO, а боксы возвращаются в
+координаты исходного кадра. Полнота считается относительно прогона без
+уменьшения (текущее поведение канала) при совпадении боксов по IoU.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.detector_input_bench --video clip.mp4 --sizes 320 480 640
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+from anpr.config import ModelConfig
+from anpr.detection.tracking import iou_matrix
+from anpr.detection.yolo_detector import (
+    RESIZE_LETTERBOX,
+    RESIZE_STRETCH,
+    YOLODetector,
+    resize_for_detector,
+    restore_boxes,
+)
+
+
+def _read_frames(path: str, limit: int, step: int) -> List[np.ndarray]:
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Не удалось открыть {path}")
+    frames: List[np.ndarray] = []
+    index = 0
+    while len(frames) < limit:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        if index % step == 0:
+            frames.append(frame)
+        index += 1
+    capture.release()
+    if not frames:
+        raise IOError(f"В {path} нет кадров")
+    return frames
+
+
+def _confident(raw: np.ndarray) -> np.ndarray:
+    return raw[raw[:, 4] >= ModelConfig.DETECTION_CONFIDENCE_THRESHOLD]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Задержка и полнота детектора при разных detector_input_size.")
+    parser.add_argument("--video", required=True, help="Записанный ролик с камеры.")
+    parser.add_argument("--model", default=ModelConfig.YOLO_MODEL_PATH)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[320, 416, 512, 640])
+    parser.add_argument("--mode", choices=(RESIZE_LETTERBOX, RESIZE_STRETCH), default=RESIZE_LETTERBOX)
+    parser.add_argument("--frames", type=int, default=200, help="Сколько кадров взять из ролика.")
+    parser.add_argument("--step", type=int, default=1, help="Брать каждый N-й кадр.")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU для совпадения с эталонным боксом.")
+    args = parser.parse_args()
+
+    frames = _read_frames(args.video, args.frames, max(1, args.step))
+    detector = YOLODetector(args.model, ModelConfig.DEVICE)
+    detector.predict_raw(frames[:1])
+
+    start = time.perf_counter()
+    reference = [_confident(detector.predict_raw([frame])[0]) for frame in frames]
+    reference_ms = (time.perf_counter() - start) / len(frames) * 1000
+    reference_boxes = sum(len(boxes) for boxes in reference)
+
+    height, width = frames[0].shape[:2]
+    print(f"Кадров: {len(frames)} ({width}x{height}), эталонных боксов: {reference_boxes}")
+    print(f"{'вход':<12}{'мс/кадр':>10}{'ускорение':>12}{'полнота':>10}{'лишние':>10}")
+    print(f"{'исходный':<12}{reference_ms:>10.1f}{1.0:>12.2f}{1.0:>10.3f}{0:>10d}")
+
+    for size in args.sizes:
+        detector.predict_raw([resize_for_detector(frames[0], size, args.mode)[0]], size)
+        matched = extra = 0
+        elapsed = 0.0
+        for frame, expected in zip(frames, reference):
+            start = time.perf_counter()
+            image, transform = resize_for_detector(frame, size, args.mode)
+            raw = restore_boxes(detector.predict_raw([image], size)[0], transform, frame.shape)
+            elapsed += time.perf_counter() - start
+
+            found = _confident(raw)
+            hits = (iou_matrix(expected, found) >= args.iou).any(axis=1) if len(found) else np.zeros(len(expected), bool)
+            matched += int(hits.sum())
+            extra += max(0, len(found) - int(hits.sum()))
+        latency_ms = elapsed / len(frames) * 1000
+        recall = matched / reference_boxes if reference_boxes else 1.0
+        print(f"{size:<12}{latency_ms:>10.1f}{reference_ms / latency_ms:>12.2f}{recall:>10.3f}{extra:>10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# /benchmarks/ocr_preprocess_bench.py
+"""Микро-бенчмарк подготовки кропов к CRNN.
+
+Сравнивает прежний torchvision-transform (``ToPILImage -> Grayscale -> Resize ->
+ToTensor -> Normalize``) с :class:`OCRPreprocessor` по времени на кроп и по
+максимальному расхождению входного тензора.
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.ocr_preprocess_bench --crops path/to/plate_crops
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import time
+from typing import Callable, List
+
+import cv2
+import numpy as np
+import torch
+from torchvision import transforms
+
+from anpr.config import ModelConfig
+from anpr.recognition.preprocessing import OCRPreprocessor
+
+
+def _load_crops(directory: str | None, count: int, seed: int) -> List[np.ndarray]:
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, "*.jpg")) + glob.glob(os.path.join(directory, "*.png")))
+        crops = [image for image in (cv2.imread(path) for path in paths) if image is not None]
+        if not crops:
+            raise IOError(f"В папке {directory} нет изображений")
+        return crops
+
+    # Синтетические кропы разных размеров: гладкий шум, похожий по спектру на реальные номера.
+    rng = np.random.default_rng(seed)
+    crops = []
+    for _ in range(count):
+        height = int(rng.integers(16, 120))
+        width = int(height * rng.uniform(3.0, 5.0))
+        base = rng.integers(0, 256, (max(2, height // 4), max(2, width // 4), 3), dtype=np.uint8)
+        crops.append(cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC))
+    return crops
+
+
+def _legacy_transform() -> Callable[[np.ndarray], torch.Tensor]:
+    return transforms.Compose(
+        [
+            transforms.ToPILImage(),
+            transforms.Grayscale(),
+            transforms.Resize((ModelConfig.OCR_IMG_HEIGHT, ModelConfig.OCR_IMG_WIDTH)),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.5], std=[0.5]),
+        ]
+    )
+
+
+def _time_per_crop(func: Callable[[], object], crops: int, repeats: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / (repeats * crops) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение препроцессинга OCR: torchvision vs OCRPreprocessor.")
+    parser.add_argument("--crops", help="Папка с кропами номеров (jpg/png). По умолчанию синтетика.")
+    parser.add_argument("--count", type=int, default=64, help="Количество синтетических кропов.")
+    parser.add_argument("--repeats", type=int, default=50, help="Число повторов замера.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    crops = _load_crops(args.crops, args.count, args.seed)
+    legacy = _legacy_transform()
+    reference = torch.stack([legacy(crop) for crop in crops]).numpy()
+
+    legacy_us = _time_per_crop(lambda: torch.stack([legacy(crop) for crop in crops]), len(crops), args.repeats)
+    print(f"Кропов: {len(crops)}")
+    print(f"{'режим':<18}{'мкс/кроп':>10}{'ускорение':>12}{'max |Δ|':>12}{'mean |Δ|':>12}")
+    print(f"{'torchvision':<18}{legacy_us:>10.1f}{1.0:>12.2f}{0.0:>12.4f}{0.0:>12.4f}")
+
+    for interpolation in ("pil", "area", "linear"):
+        preprocessor = OCRPreprocessor(capacity=len(crops), interpolation=interpolation)
+        batch = preprocessor.fill(crops)
+        diff = np.abs(batch - reference)
+        elapsed_us = _time_per_crop(lambda: preprocessor.fill(crops), len(crops), args.repeats)
+        print(
+            f"{interpolation:<18}{elapsed_us:>10.1f}{legacy_us / elapsed_us:>12.2f}"
+            f"{float(diff.max()):>12.4f}{float(diff.mean()):>12.4f}"
+        )
+
+    gray_crops = [OCRPreprocessor.to_gray(crop) for crop in crops]
+    preprocessor = OCRPreprocessor(capacity=len(crops))
+    elapsed_us = _time_per_crop(lambda: preprocessor.fill(gray_crops), len(crops), args.repeats)
+    print(f"{'pil (серый вход)':<18}{elapsed_us:>10.1f}{legacy_us / elapsed_us:>12.2f}{'':>12}{'':>12}")
+
+
+if __name__ == "__main__":
+    main()
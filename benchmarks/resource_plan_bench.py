@@ -0,0 +1,167 @@
+# /benchmarks/resource_plan_bench.py
+"""Бенчмарк плана ядер CPU против потоков torch/OpenCV по умолчанию.
+
+Каждый режим запускается в отдельном процессе, потому что пулы потоков torch
+настраиваются один раз на процесс. ``--channels`` клиентских потоков, как каналы
+движка, отправляют кадры ролика в общий :class:`DetectorService`, а кропы
+найденных боксов — в :class:`BatchedRecognizer`. Режим ``defaults`` оставляет
+число потоков torch и OpenCV на усмотрение библиотек. Режим ``plan`` применяет
+:func:`plan_threads` тем же путём, что и :class:`ChannelEngine`. Для каждого
+режима печатаются кадры в секунду, задержка кадра (среднее и p95) и
+процессорное время на кадр (user/system).
+
+Запуск из корня репозитория::
+
+    python -m benchmarks.resource_plan_bench --video clip.mp4 --channels 4 --seconds 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from functools import partial
+from typing import Dict, List
+
+import numpy as np
+
+from anpr.config import ModelConfig
+from anpr.detection.detector_service import DetectorService, DetectorServiceConfig
+from anpr.detection.yolo_detector import YOLODetector
+from anpr.inference.resources import (
+    ROLE_DETECTOR,
+    ROLE_OCR,
+    ResourceBudgetConfig,
+    activate_plan,
+    available_cores,
+    enter_role,
+    plan_threads,
+    role_threads,
+)
+from anpr.recognition.crnn_recognizer import CRNNRecognizer
+from anpr.recognition.ocr_batcher import BatchedRecognizer, OCRBatchConfig
+from benchmarks.detector_input_bench import _read_frames
+
+MODE_DEFAULTS = "defaults"
+MODE_PLAN = "plan"
+
+
+def _plate_crops(frame: np.ndarray, boxes: np.ndarray) -> List[np.ndarray]:
+    """Кропы боксов детектора; без боксов — полоса в центре кадра, чтобы OCR работал на каждом кадре."""
+
+    crops = []
+    for x1, y1, x2, y2 in boxes[:, :4].astype(int):
+        crop = frame[max(0, y1) : max(0, y2), max(0, x1) : max(0, x2)]
+        if crop.size:
+            crops.append(crop)
+    if not crops:
+        height, width = frame.shape[:2]
+        crops.append(frame[height * 2 // 5 : height * 3 // 5, width // 3 : width * 2 // 3])
+    return crops
+
+
+def _run_mode(mode: str, args: argparse.Namespace, results) -> None:
+    """Один режим в своём процессе; результат — словарь в ``results``."""
+
+    frames = _read_frames(args.video, args.frames, 1)
+    thread_init = {ROLE_DETECTOR: None, ROLE_OCR: None}
+    description = "потоки по умолчанию"
+    if mode == MODE_PLAN:
+        budget = ResourceBudgetConfig(cores=args.cores, pin_affinity=args.pin)
+        plan = plan_threads(args.channels, budget)
+        activate_plan(plan)
+        thread_init = {role: partial(enter_role, role) for role in thread_init}
+        description = plan.describe()
+
+    detector = DetectorService(
+        YOLODetector(ModelConfig.YOLO_MODEL_PATH, ModelConfig.DEVICE),
+        DetectorServiceConfig(),
+        thread_init=thread_init[ROLE_DETECTOR],
+    )
+    recognizer = BatchedRecognizer(
+        CRNNRecognizer(ModelConfig.OCR_MODEL_PATH, ModelConfig.DEVICE, num_threads=role_threads(ROLE_OCR)),
+        OCRBatchConfig(),
+        thread_init=thread_init[ROLE_OCR],
+    )
+    # Прогрев: загрузка весов и первые пакеты не входят в замер.
+    recognizer.recognize_batch(_plate_crops(frames[0], detector.predict(frames[0])))
+
+    deadline = time.perf_counter() + args.seconds
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def client(offset: int) -> None:
+        index = offset
+        local: List[float] = []
+        while time.perf_counter() < deadline:
+            frame = frames[index % len(frames)]
+            index += 1
+            start = time.perf_counter()
+            boxes = detector.predict(frame)
+            recognizer.recognize_batch(_plate_crops(frame, boxes))
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    cpu_start = os.times()
+    start = time.perf_counter()
+    clients = [
+        threading.Thread(target=client, args=(i * len(frames) // args.channels,)) for i in range(args.channels)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cpu_end = os.times()
+    detector.close()
+    recognizer.close()
+
+    processed = max(1, len(latencies))
+    results[mode] = {
+        "description": description,
+        "fps": len(latencies) / elapsed,
+        "mean_ms": float(np.mean(latencies)) * 1000 if latencies else 0.0,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else 0.0,
+        "user_ms": (cpu_end.user - cpu_start.user) / processed * 1000,
+        "system_ms": (cpu_end.system - cpu_start.system) / processed * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пропускная способность и CPU с планом ядер и без него.")
+    parser.add_argument("--video", required=True, help="Записанный ролик с камеры.")
+    parser.add_argument("--channels", type=int, default=4, help="Сколько каналов имитировать.")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Длительность замера каждого режима.")
+    parser.add_argument("--frames", type=int, default=200, help="Сколько кадров взять из ролика.")
+    parser.add_argument("--cores", type=int, default=0, help="Бюджет ядер плана (0 — все доступные).")
+    parser.add_argument("--pin", action="store_true", help="Привязывать потоки ролей к ядрам.")
+    parser.add_argument("--modes", nargs="+", choices=(MODE_DEFAULTS, MODE_PLAN), default=[MODE_DEFAULTS, MODE_PLAN])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    manager = context.Manager()
+    results: Dict[str, Dict] = manager.dict()
+    for mode in args.modes:
+        process = context.Process(target=_run_mode, args=(mode, args, results))
+        process.start()
+        process.join()
+        if mode not in results:
+            raise SystemExit(f"Режим {mode} завершился с кодом {process.exitcode}")
+
+    print(f"Каналов: {args.channels}, ядер доступно: {len(available_cores())}")
+    print(f"{'режим':<12}{'кадр/с':>10}{'мс ср.':>10}{'мс p95':>10}{'user мс/к':>12}{'sys мс/к':>12}")
+    for mode in args.modes:
+        row = results[mode]
+        print(
+            f"{mode:<12}{row['fps']:>10.1f}{row['mean_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+            f"{row['user_ms']:>12.1f}{row['system_ms']:>12.1f}"
+        )
+    for mode in args.modes:
+        print(f"{mode}: {results[mode]['description']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # /settings_manager.py
+import copy
 import json
 import os
 from typing import Any, Dict, List
@@ -20,16 +21,44 @@ class SettingsManager:
                     "id": 1,
                     "name": "Канал 1",
                     "source": "0",
+                    "substream_source": "",
+                    "substream_hold_seconds": 2.0,
+                    "substream_crop_margin": 0.15,
                     "best_shots": 3,
                     "cooldown_seconds": 5,
                     "ocr_min_confidence": 0.6,
                     "region": {"x": 0, "y": 0, "width": 100, "height": 100},
                     "detection_mode": "continuous",
+                    "capture_mode": "demand",
+                    "capture_backend": "opencv",
+                    "ffmpeg": self._ffmpeg_defaults(),
+                    "preview_fps": 10,
                     "detector_frame_stride": 2,
+                    "stride_control": self._stride_control_defaults(),
+                    "inference_priority": "normal",
+                    "inference_weight": 1.0,
                     "motion_threshold": 0.01,
                     "motion_frame_stride": 1,
                     "motion_activation_frames": 3,
                     "motion_release_frames": 6,
+                    "motion_analysis_width": 320,
+                    "motion_background": "mog2",
+                    "motion_grid_rows": 6,
+                    "motion_grid_cols": 8,
+                    "motion_cell_min_area": 0.05,
+                    "motion_masked_cells": [],
+                    "motion_crop": True,
+                    "motion_crop_padding_cells": 1,
+                    "motion_crop_max_area": 0.6,
+                    "detector_backend": "",
+                    "detector_input_size": 0,
+                    "detector_resize": "letterbox",
+                    "ocr_backend": "",
+                    "tracker": "native",
+                    "predict_skipped_frames": True,
+                    "ocr_budget": self._ocr_budget_defaults(),
+                    "crop_quality": self._crop_quality_defaults(),
+                    "stage_queues": self._stage_queue_defaults(),
                 },
             ],
             "reconnect": {
@@ -45,6 +74,9 @@ class SettingsManager:
                 "database_file": "anpr.db",
                 "screenshots_dir": "data/screenshots",
             },
+            "inference": self._inference_defaults(),
+            "runtime": self._runtime_defaults(),
+            "ui": self._ui_defaults(),
             "tracking": {
                 "best_shots": 3,
                 "cooldown_seconds": 5,
@@ -83,6 +115,15 @@ class SettingsManager:
         if self._fill_storage_defaults(data, storage_defaults):
             changed = True
 
+        if self._fill_section_defaults(data, "inference", self._inference_defaults()):
+            changed = True
+
+        if self._fill_section_defaults(data, "runtime", self._runtime_defaults()):
+            changed = True
+
+        if self._fill_section_defaults(data, "ui", self._ui_defaults()):
+            changed = True
+
         if changed:
             self._save(data)
         return data
@@ -93,13 +134,96 @@ class SettingsManager:
             "best_shots": int(tracking_defaults.get("best_shots", 3)),
             "cooldown_seconds": int(tracking_defaults.get("cooldown_seconds", 5)),
             "ocr_min_confidence": float(tracking_defaults.get("ocr_min_confidence", 0.6)),
+            "substream_source": "",
+            "substream_hold_seconds": 2.0,
+            "substream_crop_margin": 0.15,
             "region": {"x": 0, "y": 0, "width": 100, "height": 100},
             "detection_mode": "continuous",
+            "capture_mode": "demand",
+            "capture_backend": "opencv",
+            "ffmpeg": SettingsManager._ffmpeg_defaults(),
+            "preview_fps": 10,
             "detector_frame_stride": 2,
+            "stride_control": SettingsManager._stride_control_defaults(),
+            "inference_priority": "normal",
+            "inference_weight": 1.0,
             "motion_threshold": 0.01,
             "motion_frame_stride": 1,
             "motion_activation_frames": 3,
             "motion_release_frames": 6,
+            "motion_analysis_width": 320,
+            "motion_background": "mog2",
+            "motion_grid_rows": 6,
+            "motion_grid_cols": 8,
+            "motion_cell_min_area": 0.05,
+            "motion_masked_cells": [],
+            "motion_crop": True,
+            "motion_crop_padding_cells": 1,
+            "motion_crop_max_area": 0.6,
+            "detector_backend": "",
+            "detector_input_size": 0,
+            "detector_resize": "letterbox",
+            "ocr_backend": "",
+            "tracker": "native",
+            "predict_skipped_frames": True,
+            "ocr_budget": SettingsManager._ocr_budget_defaults(),
+            "crop_quality": SettingsManager._crop_quality_defaults(),
+            "stage_queues": SettingsManager._stage_queue_defaults(),
+        }
+
+    @staticmethod
+    def _crop_quality_defaults() -> Dict[str, Any]:
+        return {
+            "enabled": False,
+            "top_n": 5,
+            "min_width": 40,
+            "min_height": 10,
+            "min_sharpness": 15.0,
+            "min_contrast": 12.0,
+            "min_aspect": 1.5,
+            "max_aspect": 8.0,
+            "target_aspect": 4.6,
+            "sharpness_ref": 150.0,
+            "contrast_ref": 60.0,
+            "height_ref": 32,
+        }
+
+    @staticmethod
+    def _ffmpeg_defaults() -> Dict[str, Any]:
+        return {
+            "path": "ffmpeg",
+            "width": 0,
+            "height": 0,
+            "pix_fmt": "bgr24",
+            "idle_keyframes": False,
+            "idle_delay_seconds": 10.0,
+            "rtsp_transport": "tcp",
+            "buffers": 4,
+        }
+
+    @staticmethod
+    def _ocr_budget_defaults() -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "early_consensus": 3,
+            "recheck_interval_frames": 25,
+            "recheck_iou": 0.5,
+        }
+
+    @staticmethod
+    def _stage_queue_defaults() -> Dict[str, Any]:
+        return {"detect": 2, "ocr": 2, "persist": 16}
+
+    @staticmethod
+    def _stride_control_defaults() -> Dict[str, Any]:
+        return {
+            "enabled": False,
+            "min_stride": 1,
+            "max_stride": 6,
+            "target_latency_ms": 120,
+            "cpu_high_percent": 85,
+            "cpu_low_percent": 60,
+            "adjust_interval_seconds": 2.0,
         }
 
     @staticmethod
@@ -121,16 +245,88 @@ class SettingsManager:
             "screenshots_dir": "data/screenshots",
         }
 
-    def _fill_channel_defaults(self, channel: Dict[str, Any], tracking_defaults: Dict[str, Any]) -> bool:
-        defaults = self._channel_defaults(tracking_defaults)
+    @staticmethod
+    def _inference_defaults() -> Dict[str, Any]:
+        return {
+            "backend": {
+                "detector": "torch",
+                "ocr": "torch",
+            },
+            "detector": {
+                "max_batch_size": 8,
+                "max_wait_ms": 10,
+            },
+            "ocr": {
+                "max_batch_size": 16,
+                "max_wait_ms": 5,
+            },
+            "scheduler": {
+                "enabled": True,
+                "latency_budget_ms": 250,
+                "max_queue": 32,
+            },
+        }
+
+    @staticmethod
+    def _ui_defaults() -> Dict[str, Any]:
+        return {
+            "event_image_cache_mb": 128,
+        }
+
+    @staticmethod
+    def _runtime_defaults() -> Dict[str, Any]:
+        return {
+            "mode": "threads",
+            "channels_per_process": 1,
+            "restart_delay_seconds": 2.0,
+            "max_restart_delay_seconds": 30.0,
+            "threads_per_process": 0,
+            "ring_slots": 3,
+            "preview_max_width": 960,
+            "preview_max_height": 540,
+            "executors": {"capture": 0, "detect": 0, "ocr": 0, "io": 2},
+            "torch_threads": 0,
+            "opencv_threads": 0,
+            "resources": {
+                "enabled": True,
+                "cores": 0,
+                "reserve_cores": 1,
+                "detector_share": 0.75,
+                "pin_affinity": False,
+                "interop_threads": 1,
+            },
+            "screenshot_writer": {
+                "threads": 2,
+                "max_queue": 32,
+                "plate_reserve": 8,
+                "jpeg_quality": 90,
+                "frame_max_width": 0,
+                "overflow": "drop_frame",
+            },
+        }
+
+    @classmethod
+    def _fill_nested_defaults(cls, target: Dict[str, Any], defaults: Dict[str, Any]) -> bool:
         changed = False
-        for key, value in defaults.items():
-            if key not in channel:
-                # Сохраняем только отсутствующие ключи, не перезаписывая пользовательские значения.
-                channel[key] = value
+        for key, default_value in defaults.items():
+            if key not in target:
+                target[key] = copy.deepcopy(default_value)
                 changed = True
+            elif isinstance(default_value, dict) and isinstance(target[key], dict):
+                if cls._fill_nested_defaults(target[key], default_value):
+                    changed = True
         return changed
 
+    def _fill_section_defaults(self, data: Dict[str, Any], section: str, defaults: Dict[str, Any]) -> bool:
+        if not isinstance(data.get(section), dict):
+            data[section] = defaults
+            return True
+        return self._fill_nested_defaults(data[section], defaults)
+
+    def _fill_channel_defaults(self, channel: Dict[str, Any], tracking_defaults: Dict[str, Any]) -> bool:
+        # Сохраняем только отсутствующие ключи, не перезаписывая пользовательские значения.
+        return self._fill_nested_defaults(channel, self._channel_defaults(tracking_defaults))
+
     def _fill_reconnect_defaults(self, data: Dict[str, Any], defaults: Dict[str, Any]) -> bool:
         if "reconnect" not in data:
             data["reconnect"] = defaults
@@ -267,6 +463,21 @@ class SettingsManager:
         self.settings["tracking"] = tracking
         self._save(self.settings)
 
+    def get_inference_config(self) -> Dict[str, Any]:
+        if self._fill_section_defaults(self.settings, "inference", self._inference_defaults()):
+            self._save(self.settings)
+        return self.settings.get("inference", {})
+
+    def get_runtime_config(self) -> Dict[str, Any]:
+        if self._fill_section_defaults(self.settings, "runtime", self._runtime_defaults()):
+            self._save(self.settings)
+        return self.settings.get("runtime", {})
+
+    def get_ui_config(self) -> Dict[str, Any]:
+        if self._fill_section_defaults(self.settings, "ui", self._ui_defaults()):
+            self._save(self.settings)
+        return self.settings.get("ui", {})
+
     def get_logging_config(self) -> Dict[str, Any]:
         return self.settings.get("logging", {})
 